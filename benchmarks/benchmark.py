@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+"""Benchmarks of bwinterface using a stand-in for the "bw" CLI that serves synthetic vaults."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+basedir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(basedir, '..', 'src'))
+import bwinterface
+
+
+fakebw = os.path.join(basedir, 'fakebw.py')
+
+
+def make_uuid(rng):
+    """Creates a reproducible random UUID"""
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generate_vault(directory, items, organizations=5, collections=50, folders=20, seed=1):
+    """Writes a synthetic vault for the stand-in "bw" CLI into the given directory"""
+    rng = random.Random(seed)
+    orgs = [ { 'object': 'organization', 'id': make_uuid(rng), 'name': f'Organization {i}', 'status': 2, 'type': 0, 'enabled': True } for i in range(organizations) ]
+    cols = [ { 'object': 'collection', 'id': make_uuid(rng), 'organizationId': orgs[i % organizations]['id'], 'name': f'Collection {i:04d}', 'externalId': None } for i in range(collections) ]
+    flds = [ { 'object': 'folder', 'id': make_uuid(rng), 'name': f'Folder {i:03d}' } for i in range(folders) ]
+    cols_by_org = dict()
+    for collection in cols:
+        cols_by_org.setdefault(collection['organizationId'], list()).append(collection['id'])
+    data = list()
+    for i in range(items):
+        organizationid = None if i % 10 == 9 else orgs[i % organizations]['id']
+        collectionids = [ rng.choice(cols_by_org[organizationid]) ] if organizationid in cols_by_org else []
+        folderid = rng.choice(flds)['id'] if flds and (i % 3 == 0) else None
+        data.append({
+            'passwordHistory': None, 'revisionDate': '2024-01-01T00:00:00.000Z', 'creationDate': '2024-01-01T00:00:00.000Z', 'deletedDate': None,
+            'object': 'item', 'id': make_uuid(rng), 'organizationId': organizationid, 'folderId': folderid, 'type': 1, 'reprompt': 0,
+            'name': f'Item {i:06d}', 'notes': f'Notes of item {i}' if i % 4 == 0 else None, 'favorite': False,
+            'login': { 'fido2Credentials': [], 'uris': [ { 'match': None, 'uri': f'https://host{i % 1000:03d}.example.com/login' } ],
+                       'username': f'user{i:06d}', 'password': '%032x' % rng.getrandbits(128), 'totp': None, 'passwordRevisionDate': None },
+            'collectionIds': collectionids,
+        })
+    os.makedirs(directory, exist_ok=True)
+    for name, content in [ ('organizations', orgs), ('collections', cols), ('folders', flds), ('items', data) ]:
+        with open(os.path.join(directory, name + '.json'), 'w') as f:
+            json.dump(content, f, separators=(',', ':'))
+
+
+def prepare_vault(workdir, items, organizations, collections, folders):
+    """Provides the directory of a synthetic vault with the given size (generated once per size)"""
+    directory = os.path.join(workdir, f'vault-{items}-{organizations}-{collections}-{folders}')
+    if not os.path.exists(os.path.join(directory, 'items.json')):
+        generate_vault(directory, items, organizations=organizations, collections=collections, folders=folders)
+    return directory
+
+
+class Context():
+    """Data used by the scenarios"""
+
+    def __init__(self, directory, edits, creates):
+        """Initialize instance"""
+        with open(os.path.join(directory, 'items.json'), 'r') as f:
+            items = json.load(f)
+        with open(os.path.join(directory, 'collections.json'), 'r') as f:
+            collections = json.load(f)
+        rng = random.Random(2)
+        self.itemids = [ item['id'] for item in rng.sample(items, min(edits, len(items))) ]
+        self.collections = [ collection['name'] for collection in collections ]
+        self.organization = 'Organization 0'
+        self.collection = self.collections[0]
+        self.creates = creates
+
+
+def warm_items(bw, ctx):
+    """Fills the item cache"""
+    bw.invalidate_item_cache()
+    bw.get_items_asdictbyid()
+
+
+def warm_collections(bw, ctx):
+    """Fills the organization and collection caches"""
+    bw.get_collectionid(ctx.collection)
+
+
+def invalidate_items(bw, ctx):
+    """Empties the item cache"""
+    bw.invalidate_item_cache()
+
+
+def invalidate_collections(bw, ctx):
+    """Empties the collection cache"""
+    bw.invalidate_collection_cache()
+
+
+def edit_items(bw, ctx, use_cache):
+    """Edits the sample items"""
+    for itemid in ctx.itemids:
+        result = bw.edit_item(itemid, username='changed', use_cache=use_cache)
+        assert result.rc == 0, result.err
+
+
+def create_items(bw, ctx):
+    """Creates items in a loop"""
+    for i in range(ctx.creates):
+        result = bw.create_item(f'New item {i}', 'newuser', 'secret', organization=ctx.organization, collection=ctx.collection)
+        assert result.rc == 0, result.err
+
+
+def generate_passwords(bw, ctx):
+    """Generates passwords in a loop"""
+    for i in range(ctx.creates):
+        assert bw.generate_password(length=20, special=True) is not None
+
+
+def delete_items(bw, ctx):
+    """Deletes the sample items"""
+    for itemid in ctx.itemids:
+        result = bw.delete_item(itemid)
+        assert result.rc == 0, result.err
+
+
+def refill_items(bw, ctx):
+    """Empties and refills the item cache"""
+    bw.invalidate_item_cache()
+    bw.get_items_asdictbyid()
+
+# Each scenario: name, options for the instance, setup before each run (not measured), measured function
+scenarios = [
+    ('get_items_asdict', dict(), invalidate_items, lambda bw, ctx: bw.get_items_asdict()),
+    ('get_items_asdict streamed', dict(stream_items=True), invalidate_items, lambda bw, ctx: bw.get_items_asdict()),
+    ('get_items_asdictbyid cached', dict(), warm_items, lambda bw, ctx: bw.get_items_asdictbyid()),
+    ('edit_item cached', dict(), warm_items, lambda bw, ctx: edit_items(bw, ctx, use_cache=True)),
+    ('edit_item uncached', dict(), invalidate_items, lambda bw, ctx: edit_items(bw, ctx, use_cache=False)),
+    ('get_collectionid uncached', dict(), invalidate_collections, lambda bw, ctx: bw.get_collectionid(ctx.collection)),
+    ('get_collectionid cached', dict(), warm_collections, lambda bw, ctx: [ bw.get_collectionid(name) for name in ctx.collections ]),
+    ('create_item loop', dict(), warm_collections, create_items),
+    ('invalidate_item_cache refill', dict(), warm_items, refill_items),
+    ('delete_item cached', dict(), warm_items, delete_items),
+    ('generate_password loop', dict(), lambda bw, ctx: None, generate_passwords),
+    ('generate_passwords batch', dict(), lambda bw, ctx: None, lambda bw, ctx: bw.generate_passwords(ctx.creates, length=20, special=True)),
+]
+
+
+def run_scenario(ctx, options, setup, function, repeat):
+    """Runs a scenario; returns timings, number of "bw" commands and peak memory allocated by Python"""
+    metrics = bwinterface.CommandMetrics()
+    bw = bwinterface.BWInterface(bw_cli=fakebw, print_bwcommands=False, metrics=metrics, **options)
+    timings = list()
+    for i in range(repeat):
+        setup(bw, ctx)
+        metrics.reset()
+        start = time.perf_counter()
+        function(bw, ctx)
+        timings.append(time.perf_counter() - start)
+        commands = sum(stats['calls'] for stats in metrics.snapshot()['commands'].values())
+    # Memory is measured in a separate run as tracing slows down execution
+    setup(bw, ctx)
+    tracemalloc.start()
+    try:
+        function(bw, ctx)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return { 'median': statistics.median(timings), 'min': min(timings), 'commands': commands, 'peak_bytes': peak }
+
+
+def run(args):
+    """Runs the selected scenarios for all vault sizes"""
+    workdir = args.workdir or os.path.join(tempfile.gettempdir(), 'bwinterface-benchmark')
+    os.environ['BWI_FAKEBW_DELAY'] = str(args.delay)
+    results = list()
+    for size in args.sizes:
+        directory = prepare_vault(workdir, size, args.organizations, args.collections, args.folders)
+        os.environ['BWI_FAKEBW_VAULT'] = directory
+        ctx = Context(directory, args.edits, args.creates)
+        for name, options, setup, function in scenarios:
+            if args.scenario and not any(pattern in name for pattern in args.scenario):
+                continue
+            result = run_scenario(ctx, options, setup, function, args.repeat)
+            result.update(size=size, scenario=name)
+            results.append(result)
+            print(f'{size:>8} {name:<30} {result["median"] * 1000:>10.1f} ms {result["min"] * 1000:>10.1f} ms {result["commands"]:>6} {result["peak_bytes"] / 2**20:>9.1f} MiB', flush=True)
+    return results
+
+
+def compare(results, baseline):
+    """Prints the ratio of each result to the corresponding result of a previous run"""
+    previous = { (result['size'], result['scenario']): result for result in baseline['results'] }
+    print()
+    print(f'{"items":>8} {"scenario":<30} {"time":>8} {"memory":>8}')
+    for result in results:
+        before = previous.get((result['size'], result['scenario']))
+        if before is None:
+            continue
+        time_ratio = result['median'] / before['median'] if before['median'] else float('nan')
+        memory_ratio = result['peak_bytes'] / before['peak_bytes'] if before['peak_bytes'] else float('nan')
+        print(f'{result["size"]:>8} {result["scenario"]:<30} {time_ratio:>7.2f}x {memory_ratio:>7.2f}x')
+
+
+def main():
+    """Parses the command line and runs the benchmarks"""
+    parser = argparse.ArgumentParser(description='Benchmark bwinterface against synthetic vaults')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='numbers of items in the vaults')
+    parser.add_argument('--organizations', type=int, default=5, help='number of organizations')
+    parser.add_argument('--collections', type=int, default=50, help='number of collections (spread over the organizations)')
+    parser.add_argument('--folders', type=int, default=20, help='number of folders')
+    parser.add_argument('--repeat', type=int, default=3, help='number of measured runs per scenario')
+    parser.add_argument('--edits', type=int, default=10, help='number of items edited/deleted per run')
+    parser.add_argument('--creates', type=int, default=10, help='number of items created per run')
+    parser.add_argument('--delay', type=float, default=0, help='simulated startup time of "bw" in seconds')
+    parser.add_argument('--scenario', nargs='+', help='only run scenarios containing one of these strings')
+    parser.add_argument('--workdir', help='directory for the generated vaults (default: in the temp directory)')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='compare with the results of a previous run written using --json')
+    args = parser.parse_args()
+    print(f'{"items":>8} {"scenario":<30} {"median":>13} {"min":>13} {"bw":>6} {"peak":>13}')
+    results = run(args)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({ 'python': platform.python_version(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'arguments': vars(args), 'results': results }, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
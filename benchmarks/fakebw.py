@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+import base64
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+"""Stand-in for the "bw" CLI answering commands from a synthetic vault (see benchmark.py)."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+# The vault is read from the directory given in this environment variable; changes are acknowledged but not stored
+vault_dir = os.environ.get('BWI_FAKEBW_VAULT', '.')
+# Simulated startup time of the real CLI in seconds
+startup_delay = float(os.environ.get('BWI_FAKEBW_DELAY', '0'))
+
+
+def load(name):
+    """Reads a part of the vault"""
+    with open(os.path.join(vault_dir, name + '.json'), 'r') as f:
+        return json.load(f)
+
+
+def output(data):
+    """Writes the data to stdout in the notation of "bw" """
+    sys.stdout.write(json.dumps(data, separators=(',', ':')))
+    sys.stdout.flush()
+
+
+def fail(message):
+    """Writes an error message to stderr and exits with an error code"""
+    sys.stderr.write(message)
+    sys.exit(1)
+
+
+def last_sync():
+    """Time of the last simulated sync"""
+    try:
+        with open(os.path.join(vault_dir, 'lastsync'), 'r') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return '2024-01-01T00:00:00.000Z'
+
+
+def matches_id(value, filterid):
+    """Checks whether an identifier matches the provided filter"""
+    if filterid is None:
+        return True
+    if filterid == 'null':
+        return value is None
+    if filterid == 'notnull':
+        return value is not None
+    return value == filterid
+
+
+def matches_item(item, options):
+    """Checks whether an item matches the filter options"""
+    if not matches_id(item.get('organizationId'), options.get('organizationid')):
+        return False
+    if not matches_id(item.get('folderId'), options.get('folderid')):
+        return False
+    collectionid = options.get('collectionid')
+    if collectionid is not None:
+        collectionids = item.get('collectionIds') or []
+        if collectionid == 'null':
+            if collectionids:
+                return False
+        elif collectionid == 'notnull':
+            if not collectionids:
+                return False
+        elif collectionid not in collectionids:
+            return False
+    search = options.get('search')
+    if search is not None:
+        search = search.lower()
+        login = item.get('login') or dict()
+        texts = [ item.get('name'), login.get('username') ] + [ uri.get('uri') for uri in login.get('uris') or [] ]
+        if not any(search in text.lower() for text in texts if text):
+            return False
+    return True
+
+
+def decode(words):
+    """Decodes the base64-encoded JSON data of create/edit commands (read from stdin if not given as argument like "bw" does)"""
+    data = words[-1] if words else sys.stdin.read().strip()
+    if not data:
+        fail('No data provided.')
+    return json.loads(base64.b64decode(data).decode('utf-8'))
+
+
+def get_item(key):
+    """Finds an item by identifier or search term"""
+    items = load('items')
+    for item in items:
+        if item.get('id') == key:
+            return item
+    found = [ item for item in items if matches_item(item, { 'search': key }) ]
+    if len(found) == 1:
+        return found[0]
+    fail('More than one result was found.' if found else 'Not found.')
+
+
+def main(args):
+    """Executes the command given by the arguments"""
+    time.sleep(startup_delay)
+    options = dict()
+    words = list()
+    pos = 0
+    while pos < len(args):
+        arg = args[pos]
+        if arg in ['--raw', '--pretty', '--permanent', '--nointeraction', '--response', '--quiet']:
+            pass
+        elif arg.startswith('--'):
+            pos += 1
+            options[arg[2:]] = args[pos] if pos < len(args) else None
+        else:
+            words.append(arg)
+        pos += 1
+    command = ' '.join(words[:2])
+    if words[:1] == ['status']:
+        output({ 'serverUrl': None, 'lastSync': last_sync(), 'userEmail': 'benchmark@example.com', 'userId': str(uuid.UUID(int=0)), 'status': 'unlocked' })
+    elif words[:1] == ['sync']:
+        now = time.time()
+        with open(os.path.join(vault_dir, 'lastsync'), 'w') as f:
+            f.write(time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(now)) + f'.{int(now * 1000) % 1000:03d}Z')
+        sys.stdout.write('Syncing complete.')
+    elif command == 'list organizations':
+        output(load('organizations'))
+    elif command == 'list folders':
+        output(load('folders'))
+    elif command == 'list collections':
+        output([ collection for collection in load('collections') if matches_id(collection.get('organizationId'), options.get('organizationid')) ])
+    elif command == 'list items':
+        output([ item for item in load('items') if matches_item(item, options) ])
+    elif command == 'get item':
+        output(get_item(words[2]))
+    elif command == 'get notes':
+        sys.stdout.write(get_item(words[2]).get('notes') or '')
+    elif command == 'create item':
+        data = decode(words[2:])
+        data.update(object='item', id=str(uuid.uuid4()), revisionDate='2024-01-01T00:00:00.000Z')
+        output(data)
+    elif command == 'edit item':
+        data = decode(words[3:])
+        data.update(id=words[2], revisionDate='2024-01-01T00:00:00.000Z')
+        output(data)
+    elif command == 'create org-collection':
+        data = decode(words[2:])
+        data.update(object='org-collection', id=str(uuid.uuid4()))
+        output(data)
+    elif command == 'get attachment':
+        item = get_item(options.get('itemid'))
+        attachment = [ entry for entry in item.get('attachments') or [] if words[2] in [ entry.get('id'), entry.get('fileName') ] ]
+        if not attachment:
+            fail('Attachment not found.')
+        with open(options['output'], 'wb') as f:
+            f.write(os.urandom(int(attachment[0].get('size') or 0)))
+        sys.stdout.write(f'Saved {options["output"]}')
+    elif command == 'create attachment':
+        item = get_item(options.get('itemid'))
+        path = options['file']
+        item.setdefault('attachments', []).append({ 'id': uuid.uuid4().hex[:20], 'fileName': os.path.basename(path), 'size': str(os.path.getsize(path)) })
+        output(item)
+    elif words[:1] == ['delete']:
+        pass
+    elif words[:1] == ['generate']:
+        sys.stdout.write('%014x' % random.getrandbits(56))
+    elif words[:1] == ['import']:
+        sys.stdout.write('Imported')
+    elif words[:1] == ['export']:
+        organizationid = options.get('organizationid')
+        if organizationid is None:
+            output({ 'encrypted': False, 'folders': load('folders'), 'items': [ item for item in load('items') if item.get('organizationId') is None ] })
+        else:
+            collections = [ collection for collection in load('collections') if collection.get('organizationId') == organizationid ]
+            output({ 'encrypted': False, 'collections': collections, 'items': [ item for item in load('items') if item.get('organizationId') == organizationid ] })
+    else:
+        fail(f'Command not supported by the benchmark stand-in: {" ".join(args)}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -26,6 +26,11 @@ setup_kwargs = {
         'Intended Audience :: Information Technology'
     ],
     'python_requires': '>=3.7',
+    'entry_points': {
+        'console_scripts': [
+            'bwinterface = bwinterface.daemon:main',
+        ],
+    },
     'keywords': 'Bitwarden Vaultwarden wrapper interface',
     'project_urls': {
         'Repository': 'https://www.github.com/towalink/bwinterface',
@@ -1 +1,17 @@
 from .bwinterface import *
+from .bwserve import *
+from .asyncbwinterface import *
+from .snapshotstore import *
+from .scopedcache import *
+from .itemindex import *
+from .jsonstream import *
+from .metrics import *
+from .appdatapool import *
+from .sessionstore import *
+from .models import *
+from .searchindex import *
+from .totp import *
+from .passwordgenerator import *
+from .nameresolver import *
+from .secretrefs import *
+from .daemon import *
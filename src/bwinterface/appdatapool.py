@@ -0,0 +1,98 @@
+import contextlib
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+
+"""Copies of the application data directory of "bw" so that read-only commands can run concurrently."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class AppDataPool():
+    """Pool of worker copies of the "bw" application data directory (data.json); each copy is used by one command at a time"""
+
+    def __init__(self, workers=4, appdata_dir=None, basedir=None):
+        """Initialize instance (appdata_dir: directory to copy, default as used by "bw"; basedir: where to put the copies)"""
+        self.workers = workers
+        self.appdata_dir = appdata_dir if appdata_dir is not None else self.default_appdata_dir()
+        self.basedir = basedir
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._workdir = None
+        self._free = None
+        self._generations = dict()
+
+    @staticmethod
+    def default_appdata_dir():
+        """Application data directory used by "bw" if none is configured"""
+        if os.environ.get('BITWARDENCLI_APPDATA_DIR'):
+            return os.environ['BITWARDENCLI_APPDATA_DIR']
+        if sys.platform == 'darwin':
+            return os.path.expanduser('~/Library/Application Support/Bitwarden CLI')
+        if sys.platform == 'win32':
+            return os.path.join(os.environ.get('APPDATA', ''), 'Bitwarden CLI')
+        return os.path.join(os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config'), 'Bitwarden CLI')
+
+    def start(self):
+        """Creates the (still empty) worker directories"""
+        with self._lock:
+            if self._workdir is not None:
+                return
+            # mkdtemp creates the directory accessible for the owner only
+            self._workdir = tempfile.mkdtemp(prefix='bwinterface-appdata-', dir=self.basedir)
+            self._free = queue.Queue()
+            for i in range(self.workers):
+                path = os.path.join(self._workdir, f'worker{i}')
+                self._generations[path] = -1
+                self._free.put(path)
+
+    def invalidate(self):
+        """Marks all copies as outdated, e.g. after a change or sync of the vault; they are copied again on next use"""
+        with self._lock:
+            self.generation += 1
+
+    def copy(self, path):
+        """Replaces the worker directory by a fresh copy of the application data directory"""
+        shutil.rmtree(path, ignore_errors=True)
+        shutil.copytree(self.appdata_dir, path)
+
+    def acquire(self):
+        """Waits for a free worker directory and returns its path (up to date)"""
+        self.start()
+        path = self._free.get()
+        try:
+            generation = self.generation
+            if self._generations[path] != generation:
+                self.copy(path)
+                self._generations[path] = generation
+        except BaseException:
+            self._free.put(path)
+            raise
+        return path
+
+    def release(self, path):
+        """Returns the worker directory to the pool"""
+        self._free.put(path)
+
+    @contextlib.contextmanager
+    def worker(self):
+        """Context manager providing a worker directory"""
+        path = self.acquire()
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def close(self):
+        """Removes all copies (must not be in use)"""
+        with self._lock:
+            if self._workdir is not None:
+                shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+            self._free = None
+            self._generations = dict()
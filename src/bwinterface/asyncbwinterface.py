@@ -0,0 +1,202 @@
+import asyncio
+import functools
+import inspect
+import json
+import os
+import tempfile
+import time
+
+from .bwinterface import BWInterface
+from .jsonstream import JSONArrayParser
+
+"""An asyncio variant of the Python wrapper around the "bw" (Bitwarden) CLI tool."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class AsyncBWInterface(BWInterface):
+    """Like BWInterface but with awaitable methods; at most 'max_concurrency' "bw" commands run at the same time"""
+
+    _semaphore = None
+    # The snapshot cannot be loaded within the constructor; await 'load_snapshot' instead
+    snapshot_on_init = False
+
+    def __init__(self, bw_cli='/opt/bitwarden/bw', print_bwcommands=True, print_resultdata=False, print_indent=0, sparse_output=False, suppress_output=True, suppress_errors=False, transport=None, snapshot_store=None, cache_size=16, cache_ttl=None, stream_items=False, metrics=None, worker_pool=None, session_store=None, session_ttl=60, use_models=False, password_generator=None, max_concurrency=4):
+        """Initialize instance"""
+        super().__init__(bw_cli=bw_cli, print_bwcommands=print_bwcommands, print_resultdata=print_resultdata, print_indent=print_indent, sparse_output=sparse_output, suppress_output=suppress_output, suppress_errors=suppress_errors, transport=transport, snapshot_store=snapshot_store, cache_size=cache_size, cache_ttl=cache_ttl, stream_items=stream_items, metrics=metrics, worker_pool=worker_pool, session_store=session_store, session_ttl=session_ttl, use_models=use_models, password_generator=password_generator)
+        self.max_concurrency = max_concurrency
+
+    @property
+    def semaphore(self):
+        """Semaphore limiting the number of concurrently executed commands (created within the running event loop)"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def call_operation(self, operation):
+        """Calls the operation (callable without arguments) and awaits its result if needed"""
+        value = operation()
+        if inspect.isawaitable(value):
+            value = await value
+        return value
+
+    async def run_steps(self, steps):
+        """Runs a method written as generator (see 'command_steps') by calling and awaiting the operations it yields; returns its result"""
+        value = None
+        error = None
+        while True:
+            try:
+                operation = steps.throw(error) if error is not None else steps.send(value)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                value = await self.call_operation(operation)
+                error = None
+            except Exception as e:
+                value = None
+                error = e
+
+    async def run_concurrently(self, operations, max_workers=None):
+        """Runs the operations (callables without arguments) concurrently as tasks (at most 'max_workers' at a time in addition to 'max_concurrency'); returns the list of results"""
+        semaphore = asyncio.Semaphore(max_workers) if max_workers is not None else None
+        async def run(operation):
+            if semaphore is None:
+                return await self.call_operation(operation)
+            async with semaphore:
+                return await self.call_operation(operation)
+        return await asyncio.gather(*[ run(operation) for operation in operations ])
+
+    async def run_transport(self, command, env=None, datadict=None):
+        """Executes the prepared command using the transport in a thread; returns (rc, out, err) or None if the transport does not support the command"""
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(self.transport.run, command, env=env, datadict=datadict))
+
+    async def acquire_worker(self):
+        """Waits for a worker copy of the application data directory without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.worker_pool.acquire)
+
+    async def stream_elements(self, command):
+        """Elements of the JSON array output by a bw command (string or argument list), parsed while reading the output (as list)"""
+        return [ element async for element in self.iter_command(command) ]
+
+    async def run_process(self, command, env=None, stats=None, input=None):
+        """Execute a command (string or argument list) and return result; 'input' (bytes) is passed via stdin (process start time and output sizes are put into 'stats' if provided)"""
+        args = self.command_args(command)
+        if env is not None:
+            newenv = os.environ.copy()
+            newenv.update(env)
+        else:
+            newenv = None
+        async with self.semaphore:
+            start = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(*args, env=newenv, stdin=asyncio.subprocess.PIPE if input is not None else None, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            spawn_time = time.perf_counter() - start
+            stdout, stderr = await process.communicate(input=input)
+        if stats is not None:
+            stats.update(spawn_time=spawn_time, stdout_bytes=len(stdout), stderr_bytes=len(stderr))
+        out = stdout.decode('utf8')
+        err = stderr.decode('utf8')
+        self.print_output(out, err)
+        return process.returncode, out, err
+
+    async def stream_process(self, command, env=None, chunk_size=65536, stats=None):
+        """Execute a command (string or argument list) and yield its output in chunks of bytes; raises RuntimeError if the command fails"""
+        args = self.command_args(command)
+        if env is not None:
+            newenv = os.environ.copy()
+            newenv.update(env)
+        else:
+            newenv = None
+        async with self.semaphore:
+            # stderr goes to a file so that a full pipe cannot block the process while stdout is read
+            with tempfile.TemporaryFile() as errfile:
+                start = time.perf_counter()
+                process = await asyncio.create_subprocess_exec(*args, env=newenv, stdout=asyncio.subprocess.PIPE, stderr=errfile)
+                if stats is not None:
+                    stats.update(spawn_time=time.perf_counter() - start, stdout_bytes=0)
+                complete = False
+                try:
+                    while True:
+                        chunk = await process.stdout.read(chunk_size)
+                        if not chunk:
+                            break
+                        if stats is not None:
+                            stats['stdout_bytes'] += len(chunk)
+                        yield chunk
+                    complete = True
+                finally:
+                    if not complete:
+                        process.terminate()
+                    rc = await process.wait()
+                errfile.seek(0)
+                err = errfile.read().decode('utf8')
+        if stats is not None:
+            stats.update(stderr_bytes=len(err), rc=rc)
+        self.print_output('', err)
+        if rc != 0:
+            raise RuntimeError(err.strip() or f'bw command failed with return code {rc}')
+
+    async def iter_command(self, command, env=None):
+        """Execute a bw command (string or argument list) outputting a JSON array and yield its elements one at a time while reading the output"""
+        start = time.perf_counter()
+        subcommand = self.command_args(command)
+        command, env = self.prepare_args(subcommand, env=env)
+        stats = dict()
+        if self.transport is not None:
+            result = await self.run_transport(command, env=env)
+            if result is not None:
+                rc, out, err = result
+                self.print_output('', err)
+                if self.metrics is not None:
+                    self.record_command(subcommand, start, stats, rc, out, err)
+                if rc != 0:
+                    raise RuntimeError(err.strip() or f'bw command failed with return code {rc}')
+                for element in json.loads(out):
+                    yield element
+                return
+        parser = JSONArrayParser()
+        appdata_dir = await self.acquire_worker() if self.worker_pool is not None else None
+        try:
+            async for chunk in self.stream_process(command, env=self.worker_env(env, appdata_dir), stats=stats):
+                for element in parser.feed(chunk):
+                    yield element
+            for element in parser.feed(b'', final=True):
+                yield element
+        finally:
+            if appdata_dir is not None:
+                self.worker_pool.release(appdata_dir)
+            if (self.metrics is not None) and ('rc' in stats):
+                self.record_command(subcommand, start, stats, stats['rc'], '', '')
+
+    async def iter_items(self, organization=None, collection=None, folder=None):
+        """Yields items one at a time while reading the output of bw, optionally filtered"""
+        filterids = await self.get_filterids(organization, collection, folder)
+        if self._vault is not None:
+            for item in self.vault_items(filterids):
+                yield item
+            return
+        async for item in self.iter_command('list items' + self.items_filter(*filterids)):
+            yield item
+
+    async def execute(self, command, env=None, datadict=None, nojson=False, sparse_output=None, pretty=None):
+        """Execute a bw command (string or argument list without path of "bw") and return result; JSON data is passed via stdin"""
+        start = time.perf_counter()
+        subcommand = self.command_args(command)
+        command, env = self.prepare_args(subcommand, env=env, datadict=datadict, sparse_output=sparse_output, pretty=pretty)
+        key = self.coalescing_key(subcommand, command, env=env, datadict=datadict, nojson=nojson)
+        if key is None:
+            return await self.execute_prepared(subcommand, command, env=env, datadict=datadict, nojson=nojson, start=start)
+        # Single flight: identical read-only commands running at the same time share the result of the first one
+        task = self._inflight.get(key)
+        if task is not None:
+            self.record_coalesced(subcommand)
+        else:
+            task = asyncio.ensure_future(self.execute_prepared(subcommand, command, env=env, datadict=datadict, nojson=nojson, start=start))
+            self._inflight[key] = task
+            task.add_done_callback(lambda task: self._inflight.pop(key, None))
+        # Cancelling one caller does not cancel the command for the others
+        return await asyncio.shield(task)
@@ -1,12 +1,27 @@
 import base64
 from collections import namedtuple
+import concurrent.futures
 import copy
+import functools
 import json
 import os
 import shlex
 import subprocess
+import tempfile
+import threading
+import time
 import uuid
 
+from .itemindex import ItemIndex
+from .jsonstream import JSONArrayParser
+from .models import Collection, Item, Model, Organization, json_default
+from .nameresolver import NameResolver
+from .passwordgenerator import PasswordGenerator
+from .scopedcache import ScopedCache
+from .searchindex import SearchIndex
+from .secretrefs import find_references, item_value, parse_reference, reference_pattern
+from .totp import TOTP
+
 """A Python wrapper around the "bw" (Bitwarden) CLI tool."""
 
 # Bitwarden CLI documentation: https://bitwarden.com/help/cli/
@@ -16,117 +31,672 @@ __license__ = "MIT"
 __email__ = "towalink.bwinterface@henrici.name"
 
 
+def command_steps(method):
+    """Decorator for methods written as generators that yield operations (callables without arguments) and receive their results; calls are run by 'run_steps' of the instance"""
+    # BWInterface calls the operations directly, AsyncBWInterface awaits them; this way the logic of the methods is shared
+    @functools.wraps(method)
+    def run(self, *args, **kwargs):
+        return self.run_steps(method(self, *args, **kwargs))
+    return run
+
+
 class BWInterface():
 
     result_tuple = namedtuple('bwresult', ['rc', 'out', 'err', 'data'])
     session = None
     _organizations = None
-    _collections_asdictbyid = None
-    _collections_asdictbyname = None
-    _collections_organization = None
-    _items_asdictbyid = None
-    _items_asdictbyname = None
-    _items_organization = None
-    
-    def __init__(self, bw_cli='/opt/bitwarden/bw', print_bwcommands=True, print_resultdata=False, print_indent=0, sparse_output=False, suppress_output=True, suppress_errors=False):
+    _folders = None
+    _collection_cache = None
+    _item_cache = None
+    _vault = None
+    _lock = None
+    _session_status = None
+    # Commands that don't change the local data of "bw"
+    readonly_commands = ['list', 'get', 'export', 'generate', 'status']
+    # Read-only commands whose concurrent identical executions share one result ("generate" is excluded as each call needs a new value)
+    coalesced_commands = ['list', 'get', 'export', 'status']
+    # Arguments of 'create_item' supported per item by 'create_items_bulk' (organization and collection apply to the whole import)
+    import_arguments = ['name', 'username', 'password', 'folder', 'totp', 'uris', 'type', 'notes', 'favorite', 'fields', 'otherfields']
+    # Whether a snapshot is loaded when instantiating (AsyncBWInterface can't do so as loading needs to be awaited)
+    snapshot_on_init = True
+
+    def __init__(self, bw_cli='/opt/bitwarden/bw', print_bwcommands=True, print_resultdata=False, print_indent=0, sparse_output=False, suppress_output=True, suppress_errors=False, transport=None, snapshot_store=None, cache_size=16, cache_ttl=None, stream_items=False, metrics=None, worker_pool=None, session_store=None, session_ttl=60, use_models=False, password_generator=None):
         """Initialize instance"""
+        # Cache mutations are done holding the lock so that the instance can be shared by threads
+        self._lock = threading.RLock()
+        # Futures of the commands in flight by coalescing key; a separate lock as callers of 'execute' may hold the instance lock
+        self._inflight = dict()
+        self._inflight_lock = threading.Lock()
+        # Collections and items are cached per scope, i.e. per combination of filters
+        self._collection_cache = ScopedCache(maxsize=cache_size, ttl=cache_ttl)
+        self._item_cache = ScopedCache(maxsize=cache_size, ttl=cache_ttl)
+        # Names of organizations, collections and folders across all scopes
+        self._names = NameResolver()
         self.bw_cli = bw_cli
+        self.transport = transport
+        if (transport is not None) and (transport.bw_cli is None):
+            transport.bw_cli = bw_cli
         self.print_bwcommands = print_bwcommands
         self.print_resultdata = print_resultdata
         self.print_indent = print_indent
         self.sparse_output = sparse_output
         self.suppress_output = suppress_output
         self.suppress_errors = suppress_errors
+        self.stream_items = stream_items
+        self.use_models = use_models
+        self.password_generator = password_generator if password_generator is not None else PasswordGenerator()
+        self.metrics = metrics
+        self.worker_pool = worker_pool
+        self.session_store = session_store
+        self.session_ttl = session_ttl
+        if session_store is not None:
+            self.restore_session()
+        self.snapshot_store = snapshot_store
+        if (snapshot_store is not None) and self.snapshot_on_init:
+            self.load_snapshot()
 
     def invalidate_organization_cache(self):
         """Clears the organization cache"""
-        self._organizations = None
+        with self._lock:
+            self._organizations = None
+
+    def invalidate_folder_cache(self):
+        """Clears the folder cache"""
+        with self._lock:
+            self._folders = None
 
     def invalidate_collection_cache(self):
         """Clears the collection cache"""
-        self._collections_asdictbyid = None
-        self._collections_asdictbyname = None
-        self._collections_organization = None
+        with self._lock:
+            self._collection_cache.clear()
+            self._names.clear_collections()
 
     def invalidate_item_cache(self):
         """Clears the item cache"""
-        self._items_asdictbyid = None
-        self._items_asdictbyname = None
-        self._items_organization = None
-
-    def update_collection_cache(self, data, organization):
-        """Updates the collection cache with the new or updated collection in case organization matches"""
-        if self._collections_organization == organization:
-            assert data.get('object') == 'org-collection'
-            if self._collections_asdictbyid is not None:
-                self._collections_asdictbyid[data.get('id')] = data
-            if self._collections_asdictbyname is not None:
-                self._collections_asdictbyname[data.get('name')] = data
-
-    def update_item_cache(self, data, organization):
-        """Updates the item cache with the new or updated item in case organization matches"""
-        if self._items_organization == organization:
-            assert data.get('object') == 'item'
-            if self._items_asdictbyid is not None:
-                self._items_asdictbyid[data.get('id')] = data
-            if self._items_asdictbyname is not None:
-                self._items_asdictbyname[data.get('name')] = data
-
-    def run_process(self, command, env=None):
-        """Execute a command and return result"""
-        args = shlex.split(command)
+        with self._lock:
+            self._item_cache.clear()
+
+    def cache_stats(self):
+        """Dictionary of sizes and hit/miss counters of the collection and item caches"""
+        return { 'collections': self._collection_cache.stats(), 'items': self._item_cache.stats() }
+
+    def matches_filterid(self, filterid, value):
+        """Checks whether an identifier (or list of identifiers) matches a resolved filter identifier"""
+        if filterid is None:
+            return True
+        if isinstance(value, list):
+            if filterid == 'null':
+                return len(value) == 0
+            if filterid == 'notnull':
+                return len(value) > 0
+            return filterid in value
+        if filterid == 'null':
+            return value is None
+        if filterid == 'notnull':
+            return value is not None
+        return value == filterid
+
+    def in_scope(self, data, filterids):
+        """Checks whether an object belongs to the scope given by resolved filter identifiers (organization, collection, folder)"""
+        organizationid, collectionid, folderid = filterids
+        return self.matches_filterid(organizationid, data.get('organizationId')) and self.matches_filterid(collectionid, data.get('collectionIds') or []) and self.matches_filterid(folderid, data.get('folderId'))
+
+    def update_cache_entry(self, entry, data, belongs):
+        """Updates the dictionaries of a cache entry with the new or updated object; removes it in case it does not belong there"""
+        objectid = data.get('id')
+        old = entry['byid'].get(objectid)
+        if (old is not None) and (entry['byname'].get(old.get('name')) is old):
+            del entry['byname'][old.get('name')]
+        if belongs:
+            entry['byid'][objectid] = data
+            entry['byname'][data.get('name')] = data
+        elif old is not None:
+            del entry['byid'][objectid]
+            self.restore_name_entry(entry, old.get('name'))
+        for index in [ entry.get('index'), entry.get('search') ]:
+            if index is not None:
+                if belongs:
+                    index.add(data)
+                else:
+                    index.remove(objectid)
+
+    def restore_name_entry(self, entry, name):
+        """Lets the name point to another object with the same name after the previous one has been removed"""
+        if name in entry['byname']:
+            return
+        if entry.get('index') is not None:
+            candidates = [ item for item in entry['index'].find_by_name(name) if item.get('id') in entry['byid'] ]
+        else:
+            candidates = [ item for item in entry['byid'].values() if item.get('name') == name ]
+        if candidates:
+            entry['byname'][name] = candidates[-1]
+
+    def as_model(self, model, data):
+        """Converts the dictionary into an instance of the given model class if 'use_models' is set"""
+        return model.from_dict(data) if self.use_models else data
+
+    def copy_object(self, data):
+        """Copy of a cached object that may be changed without affecting the cache"""
+        # Models are copied on write, i.e. unchanged values are shared
+        return data.copy() if isinstance(data, Model) else copy.deepcopy(data)
+
+    def update_collection_cache(self, data, organization=None):
+        """Updates all cached scopes with the new or updated collection (organization is determined from the data)"""
+        assert data.get('object') == 'org-collection'
+        data = self.as_model(Collection, data)
+        with self._lock:
+            self._names.add_collection(data)
+            if self._vault is not None:
+                self._vault['collections'][data.get('id')] = data
+            for key, entry in self._collection_cache.items():
+                if entry['filterids'] is None:
+                    self._collection_cache.pop(key)
+                else:
+                    self.update_cache_entry(entry, data, self.in_scope(data, entry['filterids']))
+
+    def remove_from_collection_cache(self, collectionid):
+        """Removes the (deleted) collection from all cached scopes, the name maps and the loaded vault"""
+        with self._lock:
+            self._names.remove_collection(collectionid)
+            if self._vault is not None:
+                self._vault['collections'].pop(collectionid, None)
+                # The items are kept but no longer assigned to the collection
+                for item in [ item for item in self._vault['items'].values() if collectionid in (item.get('collectionIds') or []) ]:
+                    data = self.copy_object(item)
+                    data['collectionIds'] = [ objectid for objectid in item.get('collectionIds') if objectid != collectionid ]
+                    self.update_item_cache(data)
+            for key, entry in self._collection_cache.items():
+                data = entry['byid'].get(collectionid)
+                if data is not None:
+                    self.update_cache_entry(entry, data, False)
+
+    def update_item_cache(self, data, organization=None):
+        """Updates all cached scopes with the new or updated item (scopes are determined from the data)"""
+        assert data.get('object') == 'item'
+        data = self.as_model(Item, data)
+        with self._lock:
+            if self._vault is not None:
+                self._vault['items'][data.get('id')] = data
+            for key, entry in self._item_cache.items():
+                if entry['filterids'] is None:
+                    self._item_cache.pop(key)
+                else:
+                    self.update_cache_entry(entry, data, self.in_scope(data, entry['filterids']))
+
+    def remove_from_item_cache(self, itemid):
+        """Removes the (deleted) item from all cached scopes and indexes"""
+        with self._lock:
+            if self._vault is not None:
+                self._vault['items'].pop(itemid, None)
+            for key, entry in self._item_cache.items():
+                data = entry['byid'].get(itemid)
+                if data is not None:
+                    self.update_cache_entry(entry, data, False)
+
+    def cached_organizationid(self):
+        """Organization filter common to all cached item scopes (None if items of all organizations are cached)"""
+        if self._vault is not None:
+            return None
+        organizationids = set(entry['filterids'][0] for key, entry in self._item_cache.items() if entry['filterids'] is not None)
+        return organizationids.pop() if len(organizationids) == 1 else None
+
+    def apply_item_delta(self, items, organizationid=None):
+        """Updates caches and indexes based on a new listing of the organization's items; returns the added, changed and removed items"""
+        with self._lock:
+            entries = [ entry for key, entry in self._item_cache.items() if entry['filterids'] is not None ]
+            known = dict(self._vault['items']) if self._vault is not None else dict()
+            for entry in entries:
+                known.update(entry['byid'])
+            delta = { 'added': [], 'changed': [], 'removed': [] }
+            listed = set()
+            for item in items:
+                itemid = item.get('id')
+                listed.add(itemid)
+                old = known.get(itemid)
+                if old is None:
+                    if (self._vault is not None) or any(self.in_scope(item, entry['filterids']) for entry in entries):
+                        delta['added'].append(item)
+                elif old.get('revisionDate') != item.get('revisionDate'):
+                    delta['changed'].append(item)
+            for itemid, old in known.items():
+                if (itemid not in listed) and self.matches_filterid(organizationid, old.get('organizationId')):
+                    delta['removed'].append(old)
+            for item in delta['added'] + delta['changed']:
+                self.update_item_cache(item)
+            for item in delta['removed']:
+                self.remove_from_item_cache(item.get('id'))
+            return delta
+
+    def get_cache_state(self):
+        """Contents of the caches as JSON-serializable dictionary"""
+        with self._lock:
+            return {
+                'organizations': self._organizations,
+                'folders': self._folders,
+                'vault': { 'collections': list(self._vault['collections'].values()), 'items': list(self._vault['items'].values()) } if self._vault is not None else None,
+                'collections': [ { 'organization': key, 'filterids': entry['filterids'], 'collections': list(entry['byid'].values()) } for key, entry in self._collection_cache.items() ],
+                'items': [ { 'organization': key[0], 'collection': key[1], 'folder': key[2], 'filterids': entry['filterids'], 'items': list(entry['byid'].values()) } for key, entry in self._item_cache.items() ],
+            }
+
+    def set_cache_state(self, state):
+        """Restores the caches from a dictionary provided by 'get_cache_state'"""
+        with self._lock:
+            self._organizations = [ self.as_model(Organization, organization) for organization in state['organizations'] ] if state.get('organizations') is not None else None
+            self._folders = state.get('folders')
+            if state.get('vault') is not None:
+                self._vault = { 'collections': { item.get('id'): item for item in state['vault']['collections'] }, 'items': { item.get('id'): item for item in state['vault']['items'] } }
+            else:
+                self._vault = None
+            self.invalidate_collection_cache()
+            for scope in state.get('collections', []):
+                filterids = tuple(scope['filterids']) if scope.get('filterids') is not None else None
+                self.cache_collections(scope['collections'], organization=scope.get('organization'), filterids=filterids)
+            self.invalidate_item_cache()
+            for scope in state.get('items', []):
+                filterids = tuple(scope['filterids']) if scope.get('filterids') is not None else None
+                self.cache_items(scope['items'], organization=scope.get('organization'), collection=scope.get('collection'), folder=scope.get('folder'), filterids=filterids)
+
+    def get_session(self):
+        """Session used for bw commands (from 'unlock' or the BW_SESSION environment variable)"""
+        return self.session if self.session is not None else os.environ.get('BW_SESSION')
+
+    def restore_session(self):
+        """Takes over session and status from the session store (the session is not checked); returns success"""
+        data = self.session_store.load()
+        if (data is None) or not data.get('session'):
+            return False
+        self.session = data['session']
+        self._session_status = (data.get('status'), data.get('checked', 0))
+        return True
+
+    def cached_session_status(self):
+        """Last known status ('unauthenticated', 'locked', 'unlocked') if checked within 'session_ttl' seconds (None otherwise)"""
+        if (self._session_status is None) or not self.session_ttl:
+            return None
+        status, checked = self._session_status
+        if time.time() - checked > self.session_ttl:
+            return None
+        return status
+
+    def record_session_status(self, status):
+        """Remembers the status; the session is stored while unlocked and forgotten otherwise"""
+        self._session_status = (status, time.time())
+        if status != 'unlocked':
+            self.session = None
+        if self.session_store is not None:
+            if (status == 'unlocked') and (self.session is not None):
+                self.session_store.save({ 'session': self.session, 'status': status, 'checked': self._session_status[1] })
+            else:
+                self.session_store.delete()
+
+    @command_steps
+    def load_snapshot(self):
+        """Restores the caches from the snapshot store in case the vault has not been synced since; returns success"""
+        session = self.get_session()
+        if (self.snapshot_store is None) or (session is None):
+            return False
+        state = self.snapshot_store.load(session)
+        if state is None:
+            return False
+        result = yield self.get_status
+        if (result.rc != 0) or (result.data.get('status') != 'unlocked') or (result.data.get('lastSync') != state.get('lastSync')):
+            return False
+        self.set_cache_state(state.get('caches', dict()))
+        return True
+
+    @command_steps
+    def save_snapshot(self):
+        """Writes the caches to the snapshot store together with the time of the last sync; returns success"""
+        session = self.get_session()
+        if (self.snapshot_store is None) or (session is None):
+            return False
+        result = yield self.get_status
+        if (result.rc != 0) or (result.data.get('status') != 'unlocked'):
+            return False
+        self.snapshot_store.save(session, { 'lastSync': result.data.get('lastSync'), 'caches': self.get_cache_state() })
+        return True
+
+    def fill_vault(self, exports):
+        """Enters vault mode using the data of the provided unencrypted JSON exports"""
+        with self._lock:
+            vault = { 'collections': dict(), 'items': dict() }
+            folders = list()
+            for export in exports:
+                folders.extend(export.get('folders') or [])
+                for collection in export.get('collections') or []:
+                    collection.setdefault('object', 'collection')
+                    vault['collections'][collection.get('id')] = self.as_model(Collection, collection)
+                for item in export.get('items') or []:
+                    item.setdefault('object', 'item')
+                    item.setdefault('collectionIds', [])
+                    vault['items'][item.get('id')] = self.as_model(Item, item)
+            self._vault = vault
+            self._folders = folders
+            self.invalidate_collection_cache()
+            self.invalidate_item_cache()
+
+    @command_steps
+    def load_vault(self, organizations=None):
+        """Loads the vault using "bw export" (personal vault and one per organization, concurrently); reads are answered from it afterwards"""
+        self.unload_vault()
+        result = yield self.get_organizations
+        if result.rc != 0:
+            return result
+        organizationids = list()
+        if organizations is None:
+            organizationids = [ organization.get('id') for organization in self._organizations ]
+        else:
+            for organization in organizations:
+                organizationids.append((yield functools.partial(self.get_organizationid, organization)))
+        commands = [ ['export'] + (['--organizationid', organizationid] if organizationid is not None else []) + ['--format', 'json', '--raw'] for organizationid in [ None ] + organizationids ]
+        results = yield functools.partial(self.execute_many, commands)
+        for result in results:
+            if (result.rc != 0) or not isinstance(result.data, dict):
+                return result
+        self.fill_vault([ result.data for result in results ])
+        return results[-1]
+
+    def unload_vault(self):
+        """Leaves vault mode, i.e. reads are done using "bw" again"""
+        with self._lock:
+            self._vault = None
+            self.invalidate_folder_cache()
+            self.invalidate_collection_cache()
+            self.invalidate_item_cache()
+
+    @command_steps
+    def refresh_vault_items(self, organizationid=None):
+        """Lists the items of the organization (of all organizations if None) using "bw" and applies the changes to the loaded vault and the caches"""
+        result = yield functools.partial(self.execute, 'list items' + self.items_filter(organizationid))
+        if result.rc == 0:
+            self.apply_item_delta(result.data, organizationid=organizationid)
+        return result
+
+    def vault_result(self, data):
+        """Result tuple for data provided from the loaded vault"""
+        return self.result_tuple(0, '', '', data)
+
+    def vault_collections(self, organizationid=None):
+        """List of collections of the loaded vault, optionally filtered by resolved organization identifier"""
+        return [ collection for collection in self._vault['collections'].values() if self.matches_filterid(organizationid, collection.get('organizationId')) ]
+
+    def vault_items(self, filterids):
+        """List of items of the loaded vault in the scope given by resolved filter identifiers"""
+        if filterids == (None, None, None):
+            return list(self._vault['items'].values())
+        return [ item for item in self._vault['items'].values() if self.in_scope(item, filterids) ]
+
+    @staticmethod
+    def command_args(command):
+        """Argument list of a command given as string (split like a shell does) or as list of arguments"""
+        return shlex.split(command) if isinstance(command, str) else list(command)
+
+    @staticmethod
+    def command_line(args):
+        """Command as string with the arguments quoted like a shell needs them"""
+        return ' '.join(shlex.quote(arg) for arg in args)
+
+    def run_process(self, command, env=None, stats=None, input=None):
+        """Execute a command (string or argument list) and return result; 'input' (bytes) is passed via stdin (process start time and output sizes are put into 'stats' if provided)"""
+        args = self.command_args(command)
         if env is not None:
             newenv = os.environ.copy()
             newenv.update(env)
         else:
             newenv=None
-        cpe = subprocess.run(args, env=newenv, capture_output=True)
-        out = cpe.stdout.decode('utf8')
-        err = cpe.stderr.decode('utf8')
+        start = time.perf_counter()
+        process = subprocess.Popen(args, env=newenv, stdin=subprocess.PIPE if input is not None else None, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        spawn_time = time.perf_counter() - start
+        stdout, stderr = process.communicate(input=input)
+        if stats is not None:
+            stats.update(spawn_time=spawn_time, stdout_bytes=len(stdout), stderr_bytes=len(stderr))
+        out = stdout.decode('utf8')
+        err = stderr.decode('utf8')
+        self.print_output(out, err)
+        return process.returncode, out, err
+
+    def record_cache(self, accessor, hit):
+        """Passes a cache hit or miss to the metrics collector (if any)"""
+        if self.metrics is not None:
+            self.metrics.record_cache(accessor, hit)
+
+    def record_coalesced(self, command):
+        """Passes an execution of a bw command (without path of "bw") that shared the result of an identical running one to the metrics collector (if any)"""
+        if self.metrics is not None:
+            self.metrics.record_coalesced(self.metrics.command_name(self.command_args(command)))
+
+    def record_command(self, command, start, stats, rc, out, err):
+        """Passes timing and output sizes of an executed bw command (without path of "bw") to the metrics collector"""
+        self.metrics.record_command(self.metrics.command_name(self.command_args(command)), time.perf_counter() - start, spawn_time=stats.get('spawn_time'), stdout_bytes=stats.get('stdout_bytes', len(out)), stderr_bytes=stats.get('stderr_bytes', len(err)), rc=rc)
+
+    def stream_process(self, command, env=None, chunk_size=65536, stats=None):
+        """Execute a command (string or argument list) and yield its output in chunks of bytes; raises RuntimeError if the command fails"""
+        args = self.command_args(command)
+        if env is not None:
+            newenv = os.environ.copy()
+            newenv.update(env)
+        else:
+            newenv=None
+        # stderr goes to a file so that a full pipe cannot block the process while stdout is read
+        with tempfile.TemporaryFile() as errfile:
+            start = time.perf_counter()
+            process = subprocess.Popen(args, env=newenv, stdout=subprocess.PIPE, stderr=errfile)
+            if stats is not None:
+                stats.update(spawn_time=time.perf_counter() - start, stdout_bytes=0)
+            complete = False
+            try:
+                while True:
+                    chunk = process.stdout.read(chunk_size)
+                    if not chunk:
+                        break
+                    if stats is not None:
+                        stats['stdout_bytes'] += len(chunk)
+                    yield chunk
+                complete = True
+            finally:
+                process.stdout.close()
+                if not complete:
+                    process.terminate()
+                rc = process.wait()
+            errfile.seek(0)
+            err = errfile.read().decode('utf8')
+        if stats is not None:
+            stats.update(stderr_bytes=len(err), rc=rc)
+        self.print_output('', err)
+        if rc != 0:
+            raise RuntimeError(err.strip() or f'bw command failed with return code {rc}')
+
+    def print_output(self, out, err):
+        """Echo output of the bw utility unless suppressed"""
         if not self.suppress_errors and (len(err) > 0):
             print(err.strip())
         if not self.suppress_output and (len(out) > 0):
             print(out.strip())
-        return cpe.returncode, out, err
 
-    def execute(self, command, env=None, datadict=None, nojson=False, sparse_output=None, pretty=None):
-        """Execute a bw command and return result"""
-        command = f'{self.bw_cli} {command}'
+    @staticmethod
+    def print_default(obj):
+        """Converts objects that are not JSON serializable for printing"""
+        return obj.to_dict() if isinstance(obj, Model) else str(obj)
+
+    def prepare_args(self, command, env=None, datadict=None, sparse_output=None, pretty=None):
+        """Build argument list of the full bw command (string or argument list without path of "bw") and environment (JSON data is passed separately)"""
+        args = shlex.split(self.bw_cli) + self.command_args(command)
         if self.session is not None:
             if env is None:
                 env = dict()
             env['BW_SESSION'] = self.session
         if sparse_output is None:
             sparse_output = self.sparse_output
-        if sparse_output and (' --raw' not in command):
-            command += ' --raw'            
+        if sparse_output and ('--raw' not in args):
+            args.append('--raw')
         if pretty:
-            command += ' --pretty'            
-        if datadict is not None:
-            if self.print_bwcommands:
-                print(command, json.dumps(datadict, sort_keys=True, indent=self.print_indent, default=str) if (self.print_indent is not None) else datadict)
-            command += ' ' + self.dict2base64(datadict)
-        else:
-            if self.print_bwcommands:
-                print(command)
-        rc, out, err = self.run_process(command, env=env) 
+            args.append('--pretty')
+        # The printable notation is only built if commands are printed
+        if self.print_bwcommands:
+            if datadict is not None:
+                print(self.command_line(args), json.dumps(datadict, sort_keys=True, indent=self.print_indent, default=self.print_default) if (self.print_indent is not None) else datadict)
+            else:
+                print(self.command_line(args))
+        return args, env
+
+    def prepare_command(self, command, env=None, datadict=None, sparse_output=None, pretty=None):
+        """Build full bw command as string and environment (JSON data is not yet appended)"""
+        args, env = self.prepare_args(command, env=env, datadict=datadict, sparse_output=sparse_output, pretty=pretty)
+        return self.command_line(args), env
+
+    def build_result(self, rc, out, err, nojson=False):
+        """Parse the output of a bw command into a result tuple"""
         data = list()
         if (rc == 0) and (out.startswith('[') or out.startswith('{') and not nojson):
             data = json.loads(out)
             if self.print_resultdata:
-                print(json.dumps(data, sort_keys=True, indent=self.print_indent, default=str) if (self.print_indent is not None) else data)
+                print(json.dumps(data, sort_keys=True, indent=self.print_indent, default=self.print_default) if (self.print_indent is not None) else data)
         return self.result_tuple(rc, out, err, data)
 
+    def is_readonly(self, command):
+        """Checks whether the bw command (string or argument list without path of "bw") does not change local data"""
+        words = command.split(maxsplit=1) if isinstance(command, str) else command
+        return bool(words) and (words[0] in self.readonly_commands)
+
+    def worker_env(self, env, appdata_dir):
+        """Environment for running a command using the given worker copy of the application data directory"""
+        if appdata_dir is None:
+            return env
+        env = dict(env) if env is not None else dict()
+        env['BITWARDENCLI_APPDATA_DIR'] = appdata_dir
+        return env
+
+    def coalescing_key(self, subcommand, command, env=None, datadict=None, nojson=False):
+        """Key identifying concurrent identical executions of the bw command that can share a result (None if they can't)"""
+        words = subcommand.split(maxsplit=1) if isinstance(subcommand, str) else subcommand
+        if (datadict is not None) or not words or (words[0] not in self.coalesced_commands):
+            return None
+        return (tuple(command), tuple(sorted(env.items())) if env else None, nojson)
+
+    def execute(self, command, env=None, datadict=None, nojson=False, sparse_output=None, pretty=None):
+        """Execute a bw command (string or argument list without path of "bw") and return result; JSON data is passed via stdin"""
+        start = time.perf_counter()
+        subcommand = self.command_args(command)
+        command, env = self.prepare_args(subcommand, env=env, datadict=datadict, sparse_output=sparse_output, pretty=pretty)
+        key = self.coalescing_key(subcommand, command, env=env, datadict=datadict, nojson=nojson)
+        if key is None:
+            return self.execute_prepared(subcommand, command, env=env, datadict=datadict, nojson=nojson, start=start)
+        # Single flight: identical read-only commands running at the same time share the result of the first one
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = concurrent.futures.Future()
+        if not leader:
+            self.record_coalesced(subcommand)
+            return future.result()
+        try:
+            result = self.execute_prepared(subcommand, command, env=env, datadict=datadict, nojson=nojson, start=start)
+        except BaseException as e:
+            with self._inflight_lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._inflight_lock:
+            del self._inflight[key]
+        future.set_result(result)
+        return result
+
+    @command_steps
+    def execute_prepared(self, subcommand, command, env=None, datadict=None, nojson=False, start=None):
+        """Execute a bw command prepared by 'prepare_args' and return result"""
+        start = time.perf_counter() if start is None else start
+        stats = dict()
+        result = None
+        if self.transport is not None:
+            result = yield functools.partial(self.run_transport, command, env=env, datadict=datadict)
+            if result is not None:
+                self.print_output(result[1], result[2])
+        readonly = self.is_readonly(subcommand)
+        if result is None:
+            # "bw" reads the encoded JSON from stdin if it is not given as argument; this avoids the length limit of the command line
+            input = self.dict2base64(datadict).encode('utf-8') if datadict is not None else None
+            if (self.worker_pool is not None) and readonly:
+                appdata_dir = yield self.acquire_worker
+                try:
+                    result = yield functools.partial(self.run_process, command, env=self.worker_env(env, appdata_dir), stats=stats, input=input)
+                finally:
+                    self.worker_pool.release(appdata_dir)
+            else:
+                result = yield functools.partial(self.run_process, command, env=env, stats=stats, input=input)
+        rc, out, err = result
+        if (self.worker_pool is not None) and not readonly:
+            self.worker_pool.invalidate()
+        result = self.build_result(rc, out, err, nojson=nojson)
+        if self.metrics is not None:
+            self.record_command(subcommand, start, stats, rc, out, err)
+        return result
+
+    def run_steps(self, steps):
+        """Runs a method written as generator (see 'command_steps') by calling the operations it yields; returns its result"""
+        value = None
+        error = None
+        while True:
+            try:
+                operation = steps.throw(error) if error is not None else steps.send(value)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                value = operation()
+                error = None
+            except Exception as e:
+                value = None
+                error = e
+
+    def run_concurrently(self, operations, max_workers=None):
+        """Calls the operations (callables without arguments) concurrently using threads (default: as many as workers in the pool or 4); returns the list of results"""
+        if max_workers is None:
+            max_workers = self.worker_pool.workers if self.worker_pool is not None else 4
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda operation: operation(), operations))
+
+    def run_transport(self, command, env=None, datadict=None):
+        """Executes the prepared command using the transport; returns (rc, out, err) or None if the transport does not support the command"""
+        return self.transport.run(command, env=env, datadict=datadict)
+
+    def acquire_worker(self):
+        """Waits for a worker copy of the application data directory"""
+        return self.worker_pool.acquire()
+
+    def stream_elements(self, command):
+        """Elements of the JSON array output by a bw command (string or argument list), parsed while reading the output (as iterator)"""
+        return self.iter_command(command)
+
+    def execute_many(self, commands, max_workers=None):
+        """Executes several bw commands concurrently (see 'run_concurrently'); returns the list of results"""
+        return self.run_concurrently([ functools.partial(self.execute, command) for command in commands ], max_workers=max_workers)
+
+    @command_steps
     def set_config_server(self, server):
         """Configures the server to use"""
-        result = self.execute('config server ' + server)
+        result = yield functools.partial(self.execute, ['config', 'server', server])
         return (result.rc == 0)
 
-    def check_login(self):
+    @command_steps
+    def get_session_status(self, use_cache=True):
+        """Status of the vault ('unauthenticated', 'locked', 'unlocked'); cached for 'session_ttl' seconds (None on error)"""
+        if use_cache:
+            status = self.cached_session_status()
+            if status is not None:
+                return status
+        result = yield self.get_status
+        if (result.rc != 0) or not isinstance(result.data, dict):
+            return None
+        status = result.data.get('status')
+        self.record_session_status(status)
+        return status
+
+    @command_steps
+    def check_login(self, use_cache=True):
         """Checks whether we are logged in"""
-        result = self.execute('login --check')
-        return (result.rc == 0)
+        return (yield functools.partial(self.get_session_status, use_cache=use_cache)) in ['locked', 'unlocked']
 
+    @command_steps
     def login_apikey(self, clientid, clientsecret):
         """Logs in using the provided API credentials"""
         if clientid is None:
@@ -136,183 +706,556 @@ class BWInterface():
         env = dict()
         env['BW_CLIENTID'] = clientid
         env['BW_CLIENTSECRET'] = clientsecret
-        result = self.execute('login --apikey', env)
+        result = yield functools.partial(self.execute, 'login --apikey', env)
+        if result.rc == 0:
+            self.record_session_status('locked')
         # returncode 1 is used for anything - overwrite to become more specific
         if result.rc == 1:
-            if result.err. startswith('You are already logged in'):
-                result.rc = -1
+            if result.err.startswith('You are already logged in'):
+                result = result._replace(rc=-1)
         return result
 
+    @command_steps
     def logout(self):
         """Logout from vault"""
-        return self.execute('logout')
+        result = yield functools.partial(self.execute, 'logout')
+        if result.rc == 0:
+            self.record_session_status('unauthenticated')
+        return result
 
+    @command_steps
     def unlock(self, pwd):
         """Unlocks the vault with the provided password"""
         if pwd is None:
             raise ValueError('Proper BW_PASSWORD must be provided')
         env = dict()
         env['BW_PASSWORD'] = pwd
-        result = self.execute('unlock --passwordenv BW_PASSWORD --raw', env)
+        result = yield functools.partial(self.execute, 'unlock --passwordenv BW_PASSWORD --raw', env)
         self.session = result.out if (result.rc == 0) else None
+        if self.session is not None:
+            self.record_session_status('unlocked')
+        if self.transport is not None:
+            # "bw serve" is relaunched with the new session on next use
+            self.transport.stop()
+        if (self.session is not None) and (self.snapshot_store is not None):
+            yield self.load_snapshot
         return result
 
-    def sync(self):
-        """Gets updates from the remote vault"""
-        return self.execute('sync')
+    @command_steps
+    def ensure_unlocked(self, pwd):
+        """Unlocks the vault unless the (restored) session is known to be unlocked; avoids the key derivation of 'unlock' if possible"""
+        if (yield self.get_session_status) == 'unlocked':
+            return self.result_tuple(0, self.session or '', '', None)
+        return (yield functools.partial(self.unlock, pwd))
 
-    def generate(self, uppercase=None, lowercase=None, number=None, special=None, passphrase=None, length=None, words=None, min_number=None, min_special=None, separator=None, capitalize=None, include_number=None, avoid_ambiguous=None):
-        """Generates a new password/passphrase"""
-        command = 'generate'
+    @command_steps
+    def sync(self, refresh=None):
+        """Gets updates from the remote vault; refresh: None (caches unchanged), 'full' (caches cleared) or 'incremental' (changes applied to caches)"""
+        if refresh not in [None, 'full', 'incremental']:
+            raise ValueError(f'Unknown refresh mode [{refresh}] given')
+        if refresh == 'incremental':
+            before = yield self.get_status
+        result = yield functools.partial(self.execute, 'sync')
+        if (refresh is None) or (result.rc != 0):
+            return result
+        if refresh == 'full':
+            self.invalidate_organization_cache()
+            if self._vault is not None:
+                yield self.load_vault
+            else:
+                self.invalidate_folder_cache()
+                self.invalidate_collection_cache()
+                self.invalidate_item_cache()
+            return result
+        delta = { 'added': [], 'changed': [], 'removed': [] }
+        after = yield self.get_status
+        if (before.rc == 0) and (after.rc == 0) and (before.data.get('lastSync') == after.data.get('lastSync')):
+            return result._replace(data=delta)
+        # Organizations, folders and collections are small; they are listed again on next use
+        self.invalidate_organization_cache()
+        self.invalidate_folder_cache()
+        self.invalidate_collection_cache()
+        if self._vault is not None:
+            collections = yield functools.partial(self.execute, 'list collections')
+            if collections.rc == 0:
+                self._vault['collections'] = { collection.get('id'): collection for collection in collections.data }
+        if (self._vault is not None) or (len(self._item_cache) > 0):
+            organizationid = self.cached_organizationid()
+            command = 'list items' + self.items_filter(organizationid)
+            if self.stream_items:
+                try:
+                    items = yield functools.partial(self.stream_elements, command)
+                    delta = self.apply_item_delta(items, organizationid)
+                except RuntimeError as e:
+                    # Fail like the non-streaming variant (the caches are only changed after the listing is complete)
+                    self.invalidate_item_cache()
+                    return self.result_tuple(1, '', str(e), [])
+            else:
+                listing = yield functools.partial(self.execute, command)
+                if (listing.rc != 0) or not isinstance(listing.data, list):
+                    self.invalidate_item_cache()
+                    return listing
+                delta = self.apply_item_delta(listing.data, organizationid)
+        if self.snapshot_store is not None:
+            yield self.save_snapshot
+        return result._replace(data=delta)
+
+    def generate_command(self, uppercase=None, lowercase=None, number=None, special=None, passphrase=None, length=None, words=None, min_number=None, min_special=None, separator=None, capitalize=None, include_number=None, avoid_ambiguous=None):
+        """Builds the bw command (as argument list) for generating a new password/passphrase"""
+        command = ['generate']
         if uppercase == True:
-            command += ' --uppercase'
+            command.append('--uppercase')
         if lowercase == True:
-            command += ' --lowercase'
+            command.append('--lowercase')
         if number == True:
-            command += ' --number'
+            command.append('--number')
         if special == True:
-            command += ' --special'
+            command.append('--special')
         if (passphrase == True) or ((words is not None) and (passphrase is None)):
-            command += ' --passphrase'
+            command.append('--passphrase')
         if length is not None:
-            command += f' --length {length}'
+            command += ['--length', str(length)]
         if words is not None:
-            command += f' --words {words}'
+            command += ['--words', str(words)]
         if min_number is not None:
-            command += f' --min_number {min_number}'
+            command += ['--min_number', str(min_number)]
         if min_special is not None:
-            command += f' --min_special {min_special}'
+            command += ['--min_special', str(min_special)]
         if separator is not None:
             if separator == '':
                 separator = 'empty'
             if separator == ' ':
                 separator = 'space'
-            command += f' --separator {separator}'
-        if words is not None:
-            command += f' --words {words}'
+            command += ['--separator', separator]
         if capitalize == True:
-            command += ' --capitalize'
+            command.append('--capitalize')
         if include_number == True:
-            command += ' --include_number'
+            command.append('--include_number')
         if avoid_ambiguous == True:
-            command += ' --ambiguous'
-        return self.execute(command)
+            command.append('--ambiguous')
+        return command
 
+    def generate(self, uppercase=None, lowercase=None, number=None, special=None, passphrase=None, length=None, words=None, min_number=None, min_special=None, separator=None, capitalize=None, include_number=None, avoid_ambiguous=None):
+        """Generates a new password/passphrase"""
+        return self.execute(self.generate_command(uppercase=uppercase, lowercase=lowercase, number=number, special=special, passphrase=passphrase, length=length, words=words, min_number=min_number, min_special=min_special, separator=separator, capitalize=capitalize, include_number=include_number, avoid_ambiguous=avoid_ambiguous))
+
+    @command_steps
     def generate_password(self, uppercase=None, lowercase=None, number=None, special=None, passphrase=None, length=None, words=None, min_number=None, min_special=None, separator=None, capitalize=None, include_number=None, avoid_ambiguous=None):
         """Returns a new password/passphrase"""
-        result = self.generate(uppercase=uppercase, lowercase=lowercase, number=number, special=special, passphrase=passphrase, length=length, words=words, min_number=min_number, min_special=min_special, separator=separator, capitalize=capitalize, include_number=include_number, avoid_ambiguous=avoid_ambiguous)
+        result = yield functools.partial(self.generate, uppercase=uppercase, lowercase=lowercase, number=number, special=special, passphrase=passphrase, length=length, words=words, min_number=min_number, min_special=min_special, separator=separator, capitalize=capitalize, include_number=include_number, avoid_ambiguous=avoid_ambiguous)
         if result.rc != 0:
             return None
         return result.out
 
+    @command_steps
+    def generate_passwords(self, n, uppercase=None, lowercase=None, number=None, special=None, passphrase=None, length=None, words=None, min_number=None, min_special=None, separator=None, capitalize=None, include_number=None, avoid_ambiguous=None):
+        """List of n new passwords/passphrases; generated in-process (passphrases only if the password generator has a word list, otherwise using "bw generate")"""
+        if self.password_generator.can_generate(passphrase=passphrase, words=words):
+            return [ self.password_generator.generate(uppercase=uppercase, lowercase=lowercase, number=number, special=special, passphrase=passphrase, length=length, words=words, min_number=min_number, min_special=min_special, separator=separator, capitalize=capitalize, include_number=include_number, avoid_ambiguous=avoid_ambiguous) for i in range(n) ]
+        command = self.generate_command(uppercase=uppercase, lowercase=lowercase, number=number, special=special, passphrase=passphrase, length=length, words=words, min_number=min_number, min_special=min_special, separator=separator, capitalize=capitalize, include_number=include_number, avoid_ambiguous=avoid_ambiguous)
+        results = yield functools.partial(self.execute_many, [ command ] * n)
+        return [ result.out if result.rc == 0 else None for result in results ]
+
     def get_status(self):
         """Gets status information"""
         return self.execute('status')
 
+    @command_steps
     def get_organizations(self):
         """Gets a list of organizations"""
-        result = self.execute('list organizations')
+        if (self._vault is not None) and (self._organizations is not None):
+            return self.vault_result(self._organizations)
+        result = yield functools.partial(self.execute, 'list organizations')
         if result.rc == 0:
-            self._organizations = result.data
+            self._organizations = [ self.as_model(Organization, organization) for organization in result.data ]
         return result
 
+    @command_steps
+    def get_folders(self):
+        """Gets a list of folders"""
+        if (self._vault is not None) and (self._folders is not None):
+            return self.vault_result(self._folders)
+        result = yield functools.partial(self.execute, 'list folders')
+        if result.rc == 0:
+            self._folders = result.data
+        return result
+
+    @command_steps
     def get_collections(self, organization=None):
         """Gets a list of collections, optionally filtered"""
+        organizationid = (yield functools.partial(self.get_organizationid, organization)) if organization is not None else None
+        if self._vault is not None:
+            return self.vault_result(self.vault_collections(organizationid))
         filter = ''
-        if organization is not None:
-            filter += ' --organizationid ' + self.get_organizationid(organization)
-        return self.execute('list collections' + filter)
+        if organizationid is not None:
+            filter += ' --organizationid ' + organizationid
+        return (yield functools.partial(self.execute, 'list collections' + filter))
 
+    @command_steps
     def get_collections_aslist(self, organization=None):
         """Gets a list of collections, optionally filtered; always returns a list (empty list on invalid filters)"""
         try:
-            return self.get_collections(organization).data
+            return (yield functools.partial(self.get_collections, organization)).data
         except ValueError:
             return []
 
+    def cached_collections(self, organization=None, byname=False):
+        """Cached dictionary of collections for the given filter (None if not cached)"""
+        entry = self._collection_cache.get(organization)
+        if entry is None:
+            return None
+        return entry['byname'] if byname else entry['byid']
+
+    def cache_collections(self, collections, organization=None, byname=False, filterids=None):
+        """Dictionary of the provided collections; populates the collection cache for the scope given by the filter"""
+        collections = [ self.as_model(Collection, collection) for collection in collections ]
+        entry = { 'filterids': filterids, 'byid': { item.get('id'): item for item in collections }, 'byname': { item.get('name'): item for item in collections } }
+        with self._lock:
+            self._collection_cache.set(organization, entry)
+            # The listing also provides the names of the organization's collections (of all collections if unfiltered)
+            if (filterids is not None) and (filterids[0] not in ['null', 'notnull']):
+                self._names.set_collections(collections, filterids[0])
+        return entry['byname'] if byname else entry['byid']
+
+    @command_steps
+    def get_collections_asdict(self, organization=None, byname=False):
+        """Dictionary of collections, uncached, optionally filtered"""
+        try:
+            filterids = yield functools.partial(self.get_filterids, organization)
+        except ValueError:
+            return self.cache_collections([], organization=organization, byname=byname)
+        collections = yield functools.partial(self.get_collections_aslist, filterids[0])
+        return self.cache_collections(collections, organization=organization, byname=byname, filterids=filterids)
+
+    @command_steps
     def get_collections_asdictbyid(self, organization=None, use_cache=True):
         """Dictionary of collections with identifiers as keys, optionally filtered"""
-        if use_cache and (self._collections_asdictbyid is not None) and (self._collections_organization == organization):
-            return self._collections_asdictbyid
-        result = { item.get('id'): item for item in self.get_collections_aslist(organization) }
-        # Populate collection cache
-        if result is not None:
-            if self._collections_organization != organization:
-                self.invalidate_collection_cache()
-            self._collections_asdictbyid = result
-            self._collections_organization = organization
-        return result
+        if use_cache:
+            result = self.cached_collections(organization, byname=False)
+            self.record_cache('get_collections_asdictbyid', result is not None)
+            if result is not None:
+                return result
+        return (yield functools.partial(self.get_collections_asdict, organization=organization, byname=False))
 
+    @command_steps
     def get_collections_asdictbyname(self, organization=None, use_cache=True):
         """Dictionary of collections with names as keys, optionally filtered"""
-        if use_cache and (self._collections_asdictbyname is not None) and (self._collections_organization == organization):
-            return self._collections_asdictbyname
-        result = { item.get('name'): item for item in self.get_collections_aslist(organization) }
-        # Populate item cache
-        if result is not None:
-            if self._collections_organization != organization:
-                self.invalidate_collection_cache()
-            self._collections_asdictbyname = result
-            self._collections_organization = organization
-        return result
+        if use_cache:
+            result = self.cached_collections(organization, byname=True)
+            self.record_cache('get_collections_asdictbyname', result is not None)
+            if result is not None:
+                return result
+        return (yield functools.partial(self.get_collections_asdict, organization=organization, byname=True))
+
+    def items_filter(self, organizationid=None, collectionid=None, folderid=None):
+        """Builds the filter options for listing items from resolved identifiers"""
+        filter = ''
+        if organizationid is not None:
+            filter += ' --organizationid ' + organizationid
+        if collectionid is not None:
+            filter += ' --collectionid ' + collectionid
+        if folderid is not None:
+            filter += ' --folderid ' + folderid
+        return filter
 
+    @command_steps
     def get_items(self, organization=None, collection=None, folder=None):
         """Gets a list of items, optionally filtered"""
-        filter = ''
-        if organization is not None:
-            filter += ' --organizationid ' + self.get_organizationid(organization)
-        if collection is not None:
-            filter += ' --collectionid ' + self.get_collectionid(collection)
-        if folder is not None:
-            filter += ' --folderid ' + self.get_folderid(folder)
-        return self.execute('list items' + filter)
+        filterids = yield functools.partial(self.get_filterids, organization, collection, folder)
+        if self._vault is not None:
+            return self.vault_result(self.vault_items(filterids))
+        return (yield functools.partial(self.execute, 'list items' + self.items_filter(*filterids)))
+
+    def iter_command(self, command, env=None):
+        """Execute a bw command (string or argument list) outputting a JSON array and yield its elements one at a time while reading the output"""
+        start = time.perf_counter()
+        subcommand = self.command_args(command)
+        command, env = self.prepare_args(subcommand, env=env)
+        stats = dict()
+        if self.transport is not None:
+            result = self.run_transport(command, env=env)
+            if result is not None:
+                rc, out, err = result
+                self.print_output('', err)
+                if self.metrics is not None:
+                    self.record_command(subcommand, start, stats, rc, out, err)
+                if rc != 0:
+                    raise RuntimeError(err.strip() or f'bw command failed with return code {rc}')
+                for element in json.loads(out):
+                    yield element
+                return
+        parser = JSONArrayParser()
+        appdata_dir = self.worker_pool.acquire() if self.worker_pool is not None else None
+        try:
+            for chunk in self.stream_process(command, env=self.worker_env(env, appdata_dir), stats=stats):
+                for element in parser.feed(chunk):
+                    yield element
+            for element in parser.feed(b'', final=True):
+                yield element
+        finally:
+            if appdata_dir is not None:
+                self.worker_pool.release(appdata_dir)
+            if (self.metrics is not None) and ('rc' in stats):
+                self.record_command(subcommand, start, stats, stats['rc'], '', '')
+
+    def iter_items(self, organization=None, collection=None, folder=None):
+        """Yields items one at a time while reading the output of bw, optionally filtered"""
+        filterids = self.get_filterids(organization, collection, folder)
+        if self._vault is not None:
+            return iter(self.vault_items(filterids))
+        return self.iter_command('list items' + self.items_filter(*filterids))
 
+    @command_steps
     def get_items_aslist(self, organization=None, collection=None, folder=None):
         """Gets a list of items, optionally filtered; always returns a list (empty list on invalid filters)"""
         try:
-            return self.get_items(organization, collection, folder).data
+            return (yield functools.partial(self.get_items, organization, collection, folder)).data
         except ValueError:
             return []
 
+    def cached_items(self, organization=None, collection=None, folder=None, byname=False):
+        """Cached dictionary of items for the given filter (None if not cached)"""
+        entry = self._item_cache.get((organization, collection, folder))
+        if entry is None:
+            return None
+        return entry['byname'] if byname else entry['byid']
+
+    def cache_items(self, items, organization=None, collection=None, folder=None, byname=False, filterids=None):
+        """Dictionary of the provided items; populates the item cache for the scope given by the filters"""
+        # Single pass so that items may be provided by an iterator
+        entry = { 'filterids': filterids, 'byid': dict(), 'byname': dict(), 'index': None, 'search': None }
+        for item in items:
+            item = self.as_model(Item, item)
+            entry['byid'][item.get('id')] = item
+            entry['byname'][item.get('name')] = item
+        with self._lock:
+            self._item_cache.set((organization, collection, folder), entry)
+        return entry['byname'] if byname else entry['byid']
+
+    @command_steps
     def get_items_asdict(self, organization=None, collection=None, folder=None, byname=False):
         """Dictionary of items, uncached, optionally filtered"""
-        items = self.get_items_aslist(organization, collection, folder)
-        items_byid = { item.get('id'): item for item in items }
-        items_byname = { item.get('name'): item for item in items }
-        # Populate item cache
-        if (items is not None) and (collection is None) and (folder is None):
-            if self._items_organization != organization:
-                self.invalidate_item_cache()
-            self._items_asdictbyid = items_byid
-            self._items_asdictbyname = items_byname
-            self._items_organization = organization
-        # Return dictionary as chosen
-        if byname:
-            return items_byname
+        try:
+            filterids = yield functools.partial(self.get_filterids, organization, collection, folder)
+        except ValueError:
+            return self.cache_items([], organization=organization, collection=collection, folder=folder, byname=byname)
+        if self.stream_items and (self._vault is None):
+            try:
+                items = yield functools.partial(self.stream_elements, 'list items' + self.items_filter(*filterids))
+                return self.cache_items(items, organization=organization, collection=collection, folder=folder, byname=byname, filterids=filterids)
+            except RuntimeError:
+                # Like the non-streaming variant, a failing "bw list items" results in no items
+                items = []
         else:
-            return items_byid
+            items = yield functools.partial(self.get_items_aslist, *filterids)
+        return self.cache_items(items, organization=organization, collection=collection, folder=folder, byname=byname, filterids=filterids)
 
+    @command_steps
     def get_items_asdictbyid(self, organization=None, collection=None, folder=None, use_cache=True):
         """Dictionary of items with identifiers as keys, optionally filtered"""
-        if use_cache and (self._items_asdictbyid is not None) and (self._items_organization == organization) and (collection is None) and (folder is None):
-            return self._items_asdictbyid
-        return self.get_items_asdict(organization=organization, collection=collection, folder=folder, byname=False)
+        if use_cache:
+            result = self.cached_items(organization, collection, folder, byname=False)
+            self.record_cache('get_items_asdictbyid', result is not None)
+            if result is not None:
+                return result
+        return (yield functools.partial(self.get_items_asdict, organization=organization, collection=collection, folder=folder, byname=False))
 
+    @command_steps
     def get_items_asdictbyname(self, organization=None, collection=None, folder=None, use_cache=True):
         """Dictionary of items with names as keys, optionally filtered"""
-        if use_cache and (self._items_asdictbyname is not None) and (self._items_organization == organization) and (collection is None) and (folder is None):
-            return self._items_asdictbyname
-        return self.get_items_asdict(organization=organization, collection=collection, folder=folder, byname=True)
+        if use_cache:
+            result = self.cached_items(organization, collection, folder, byname=True)
+            self.record_cache('get_items_asdictbyname', result is not None)
+            if result is not None:
+                return result
+        return (yield functools.partial(self.get_items_asdict, organization=organization, collection=collection, folder=folder, byname=True))
+
+    def index_items(self, organization=None, collection=None, folder=None):
+        """Secondary index of the cached items of the given scope (built on first use)"""
+        with self._lock:
+            entry = self._item_cache.peek((organization, collection, folder))
+            if entry is None:
+                return None
+            if entry['index'] is None:
+                entry['index'] = ItemIndex(entry['byid'].values())
+            return entry['index']
+
+    @command_steps
+    def get_item_index(self, organization=None, collection=None, folder=None, use_cache=True):
+        """Secondary index (by name, username, URI host, collection, folder) of items, optionally filtered"""
+        items = yield functools.partial(self.get_items_asdictbyid, organization=organization, collection=collection, folder=folder, use_cache=use_cache)
+        index = self.index_items(organization, collection, folder)
+        return index if index is not None else ItemIndex(items.values())
+
+    def fulltext_index(self, organization=None, collection=None, folder=None):
+        """Full-text search index of the cached items of the given scope (built on first use)"""
+        with self._lock:
+            entry = self._item_cache.peek((organization, collection, folder))
+            if entry is None:
+                return None
+            if entry['search'] is None:
+                entry['search'] = SearchIndex(entry['byid'].values())
+            return entry['search']
 
+    @command_steps
+    def get_fulltext_index(self, organization=None, collection=None, folder=None, use_cache=True):
+        """Full-text search index (over name, username, URIs, notes) of items, optionally filtered"""
+        items = yield functools.partial(self.get_items_asdictbyid, organization=organization, collection=collection, folder=folder, use_cache=use_cache)
+        index = self.fulltext_index(organization, collection, folder)
+        return index if index is not None else SearchIndex(items.values())
+
+    @command_steps
+    def search_items(self, query, fields=('name', 'username', 'uris', 'notes'), organization=None, collection=None, folder=None, limit=None, substring=True, use_cache=True):
+        """List of items whose fields contain all words of the query (as word, word prefix or substring), the most relevant first"""
+        index = yield functools.partial(self.get_fulltext_index, organization=organization, collection=collection, folder=folder, use_cache=use_cache)
+        return index.search(query, fields=fields, limit=limit, substring=substring)
+
+    def search_index(self, index, name=None, username=None, host=None, collectionid=None, folderid=None):
+        """List of items in the index matching all provided criteria"""
+        result = None
+        for field, key in [('name', name), ('username', username), ('host', host), ('collection', collectionid), ('folder', folderid)]:
+            if key is None:
+                continue
+            matches = index.find(field, key)
+            if result is None:
+                result = matches
+            else:
+                ids = set(item.get('id') for item in matches)
+                result = [ item for item in result if item.get('id') in ids ]
+        return result if result is not None else list(index.by_id.values())
+
+    @command_steps
+    def find_items(self, organization=None, name=None, username=None, host=None, collection=None, folder=None, use_cache=True):
+        """List of items of the organization matching all provided criteria (name, username, URI host, collection, folder)"""
+        collectionid = (yield functools.partial(self.get_collectionid, collection, organization=organization)) if collection is not None else None
+        folderid = (yield functools.partial(self.get_folderid, folder)) if folder is not None else None
+        index = yield functools.partial(self.get_item_index, organization=organization, use_cache=use_cache)
+        return self.search_index(index, name=name, username=username, host=host, collectionid=collectionid, folderid=folderid)
+
+    @command_steps
     def get_item(self, itemid):
         """Get item with the provided identifier"""
         # Note: it is possible to enter a search term (use double quotes) instead of an item id
-        return self.execute(f'get item {itemid}')
+        if (self._vault is not None) and self.is_uuid(itemid):
+            return self.vault_item(itemid)
+        return (yield functools.partial(self.execute, ['get', 'item', self.search_term(itemid)]))
+
+    def search_term(self, itemid):
+        """Item identifier or search term without surrounding double quotes (needed when commands were given as string)"""
+        if isinstance(itemid, str) and (len(itemid) >= 2) and itemid.startswith('"') and itemid.endswith('"'):
+            return itemid[1:-1]
+        return itemid
+
+    def vault_item(self, itemid, field=None):
+        """Result tuple for the item (or a field of it) with the provided identifier from the loaded vault"""
+        data = self._vault['items'].get(itemid)
+        if data is None:
+            return self.result_tuple(1, '', 'Not found.', list())
+        if field is not None:
+            return self.result_tuple(0, data.get(field) or '', '', list())
+        # Callers may modify the returned item; the vault must not change
+        return self.vault_result(self.copy_object(data))
 
+    @command_steps
     def get_item_notes(self, itemid):
         """Get notes of item with the provided identifier (result is provided in 'out')"""
-        return self.execute(f'get notes {itemid}', nojson=True)
+        if (self._vault is not None) and self.is_uuid(itemid):
+            return self.vault_item(itemid, field='notes')
+        return (yield functools.partial(self.execute, ['get', 'notes', self.search_term(itemid)], nojson=True))
 
+    def totp_generator(self, item):
+        """TOTP generator for the secret of the provided item (None if there is no item or it has no secret)"""
+        login = item.get('login') if item is not None else None
+        secret = login.get('totp') if login else None
+        return TOTP.from_string(secret) if secret else None
+
+    def compute_totps(self, items, byid, timestamp=None):
+        """Dictionary of item identifier -> TOTP code for the provided items (dictionaries or identifiers looked up in byid)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        result = dict()
+        for item in items:
+            if isinstance(item, (dict, Model)):
+                itemid = item.get('id')
+            else:
+                itemid, item = item, byid.get(item)
+            try:
+                generator = self.totp_generator(item)
+            except ValueError:
+                generator = None
+            result[itemid] = generator.code(timestamp) if generator is not None else None
+        return result
+
+    def parse_references(self, refs, strict=True):
+        """Dictionary of reference -> parsed reference; malformed references raise ValueError if strict (otherwise they are None)"""
+        references = dict()
+        for reference in dict.fromkeys(refs):
+            try:
+                references[reference] = parse_reference(reference)
+            except ValueError:
+                if strict:
+                    raise
+                references[reference] = None
+        return references
+
+    def secret_values(self, references, scopes, strict=True):
+        """Dictionary of reference -> value for parsed references, looking up their items in the (byid, byname) dictionaries of their scopes"""
+        values = dict()
+        unresolved = list()
+        for reference, parsed in references.items():
+            if parsed is None:
+                unresolved.append(reference)
+                values[reference] = None
+                continue
+            byid, byname = scopes[(parsed.organization, parsed.collection)]
+            item = byid.get(parsed.item) if self.is_uuid(parsed.item) else byname.get(parsed.item)
+            value = item_value(item, parsed.field) if item is not None else None
+            if value is None:
+                unresolved.append(reference)
+            values[reference] = value
+        if strict and unresolved:
+            raise ValueError(f'Unresolved secret references [{", ".join(unresolved)}]')
+        return values
+
+    @command_steps
+    def resolve_secrets(self, refs, strict=True, use_cache=True):
+        """Dictionary of secret reference ("bw://<organization>/<collection>/<item>#<field>") -> value; items are looked up in one listing per scope (scopes listed concurrently)"""
+        references = self.parse_references(refs, strict=strict)
+        scopes = list(dict.fromkeys((parsed.organization, parsed.collection) for parsed in references.values() if parsed is not None))
+        byids = yield functools.partial(self.run_concurrently, [ functools.partial(self.get_items_asdictbyid, organization=organization, collection=collection, use_cache=use_cache) for organization, collection in scopes ])
+        lookups = dict()
+        for (organization, collection), byid in zip(scopes, byids):
+            # Served from the cache entry just filled
+            lookups[(organization, collection)] = (byid, (yield functools.partial(self.get_items_asdictbyname, organization=organization, collection=collection)))
+        return self.secret_values(references, lookups, strict=strict)
+
+    @command_steps
+    def render_template(self, template, strict=True, use_cache=True):
+        """Text with all secret references ("bw://...") replaced by their values (unresolved ones are kept if not strict)"""
+        values = yield functools.partial(self.resolve_secrets, find_references(template), strict=strict, use_cache=use_cache)
+        return reference_pattern.sub(lambda match: str(values[match.group(0)]) if values[match.group(0)] is not None else match.group(0), template)
+
+    @command_steps
+    def get_totp(self, item, organization=None, timestamp=None, use_cache=True):
+        """TOTP code computed locally for the item (dictionary, identifier or name); None if not found or without TOTP secret"""
+        if not isinstance(item, (dict, Model)):
+            if self.is_uuid(item):
+                items = yield functools.partial(self.get_items_asdictbyid, organization=organization, use_cache=use_cache)
+            else:
+                items = yield functools.partial(self.get_items_asdictbyname, organization=organization, use_cache=use_cache)
+            item = items.get(item)
+        generator = self.totp_generator(item)
+        return generator.code(timestamp) if generator is not None else None
+
+    @command_steps
+    def get_totps(self, items, organization=None, timestamp=None, use_cache=True):
+        """Dictionary of item identifier -> TOTP code computed locally for the items (dictionaries or identifiers); None for items without valid TOTP secret"""
+        items = list(items)
+        byid = None
+        if not all(isinstance(item, (dict, Model)) for item in items):
+            byid = yield functools.partial(self.get_items_asdictbyid, organization=organization, use_cache=use_cache)
+        return self.compute_totps(items, byid, timestamp=timestamp)
+
+    @command_steps
     def create_collection(self, name, organization=None, external_id=None, otherfields=None):
         """Create a collection with the given data"""
         # Collection template ("bw get template org-collection --pretty"):
@@ -351,18 +1294,47 @@ class BWInterface():
         # }
         data = otherfields.copy() if otherfields is not None else dict()
         if organization is not None:
-            data['organizationId'] = self.get_organizationid(organization)
+            data['organizationId'] = yield functools.partial(self.get_organizationid, organization)
         data['name'] = name
         data['externalId'] = external_id
         if 'groups' not in data:
             data['groups'] = []
         if 'users' not in data:
             data['users'] = []
-        result = self.execute(f'create org-collection --organizationid {data['organizationId']}', datadict=data)
+        result = yield functools.partial(self.execute, ['create', 'org-collection', '--organizationid', data['organizationId']], datadict=data)
         if result.rc == 0:
             self.update_collection_cache(result.data, organization=organization)
         return result
 
+    def fill_item_data(self, data, name=None, username=None, password=None, organizationid=None, collectionids=None, folderid=None, totp=None, uris=None, type=None, notes=None, favorite=None, fields=None):
+        """Sets the provided values in the given item data (identifiers must already be resolved)"""
+        if organizationid is not None:
+            data['organizationId'] = organizationid
+        if collectionids is not None:
+            data['collectionIds'] = collectionids
+        if folderid is not None:
+            data['folderId'] = folderid
+        if type is not None:
+            data['type'] = type
+        if name is not None:
+            data['name'] = name
+        if notes is not None:
+            data['notes'] = notes
+        if favorite is not None:
+            data['favorite'] = favorite
+        if fields is not None:
+            data['fields'] = fields
+        if username is not None:
+            data['login']['username'] = username
+        if password is not None:
+            data['login']['password'] = password
+        if totp is not None:
+            data['login']['totp'] = totp
+        if uris is not None:
+            data['login']['uris'] = uris
+        return data
+
+    @command_steps
     def create_item(self, name, username, password, organization=None, collection=None, folder=None, totp=None, uris=None, type=1, notes=None, favorite=False, fields=None, otherfields=None):
         """Create an item with the given data"""
         # Item template:
@@ -410,102 +1382,306 @@ class BWInterface():
         # "totp": "JBSWY3DPEHPK3PXP"
         # }
         data = otherfields.copy() if otherfields is not None else dict()
-        if organization is not None:
-            data['organizationId'] = self.get_organizationid(organization)
-        if collection is not None:
-            data['collectionIds'] = [ self.get_collectionid(collection, organization=organization) ]
-        if folder is not None:
-            data['folderId'] = self.get_folderid(folder)
-        if type is not None:
-            data['type'] = type
-        else:
-            data['type'] = 1
-        if name is not None:
-            data['name'] = name
-        if notes is not None:
-            data['notes'] = notes
-        if favorite is not None:
-            data['favorite'] = favorite
-        if fields is not None:
-            data['fields'] = fields
-        login_data = dict()
-        if username is not None:
-            login_data['username'] = username
-        if password is not None:
-            login_data['password'] = password
-        if totp is not None:
-            login_data['totp'] = password
-        if uris is not None:
-            login_data['uris'] = uris
-        data['login'] = login_data
-        result = self.execute('create item', datadict=data)
+        data['login'] = dict()
+        organizationid = (yield functools.partial(self.get_organizationid, organization)) if organization is not None else None
+        collectionids = [ (yield functools.partial(self.get_collectionid, collection, organization=organization)) ] if collection is not None else None
+        folderid = (yield functools.partial(self.get_folderid, folder)) if folder is not None else None
+        self.fill_item_data(data, name=name, username=username, password=password, organizationid=organizationid, collectionids=collectionids, folderid=folderid, totp=totp, uris=uris, type=type if type is not None else 1, notes=notes, favorite=favorite, fields=fields)
+        result = yield functools.partial(self.execute, 'create item', datadict=data)
         if result.rc == 0:
             self.update_item_cache(result.data, organization=organization)
         return result
 
+    @command_steps
     def edit_item(self, itemid, name=None, username=None, password=None, organization=None, collection=None, folder=None, totp=None, uris=None, type=None, notes=None, favorite=None, fields=None, otherfields=None, create_if_not_exists=False, use_cache=True):
         """Update an item with the given data"""
         if use_cache:
             if self.is_uuid(itemid):
-                data = self.get_items_asdictbyid(organization=organization, use_cache=True)
+                data = yield functools.partial(self.get_items_asdictbyid, organization=organization, use_cache=True)
             else:
-                data = self.get_items_asdictbyname(organization=organization, use_cache=True)
-            data = copy.deepcopy(data.get(itemid))
+                data = yield functools.partial(self.get_items_asdictbyname, organization=organization, use_cache=True)
+            data = data.get(itemid)
+            data = self.copy_object(data) if data is not None else None
             if (data is None) and not create_if_not_exists:
                 return self.result_tuple(1, '', 'Not found.', None)
         else:
-            result = self.get_item(itemid)
+            result = yield functools.partial(self.get_item, itemid)
             if result.rc != 0:
                 if create_if_not_exists and result.err == 'Not found.':
                     data = None
                 else:
                     return result
-            data = result.data
+            else:
+                # Results may be shared with concurrent callers (see 'execute'), so they are not changed
+                data = self.copy_object(result.data)
         if data is None:
             if name is None:
                 name = itemid
-            return self.create_item(name=name, username=username, password=password, organization=organization, collection=collection, folder=folder, totp=totp, uris=uris, type=type, notes=notes, favorite=favorite, fields=fields, otherfields=otherfields)
+            return (yield functools.partial(self.create_item, name=name, username=username, password=password, organization=organization, collection=collection, folder=folder, totp=totp, uris=uris, type=type, notes=notes, favorite=favorite, fields=fields, otherfields=otherfields))
         itemid = data.get('id')
         if otherfields is not None:
             data.update(otherfields)
-        if organization is not None:
-            data['organizationId'] = self.get_organizationid(organization)
-        if collection is not None:
-            data['collectionIds'] = [ self.get_collectionid(collection) ]
-        if folder is not None:
-            data['folderId'] = self.get_folderid(folder)
-        if type is not None:
-            data['type'] = type
-        if name is not None:
-            data['name'] = name
-        if notes is not None:
-            data['notes'] = notes
-        if favorite is not None:
-            data['favorite'] = favorite
-        if fields is not None:
-            data['fields'] = fields
-        if username is not None:
-            data['login']['username'] = username
-        if password is not None:
-            data['login']['password'] = password
-        if totp is not None:
-            data['login']['totp'] = password
-        if uris is not None:
-            data['login']['uris'] = uris
-        result = self.execute(f'edit item {itemid}', datadict=data)
+        organizationid = (yield functools.partial(self.get_organizationid, organization)) if organization is not None else None
+        collectionids = [ (yield functools.partial(self.get_collectionid, collection)) ] if collection is not None else None
+        folderid = (yield functools.partial(self.get_folderid, folder)) if folder is not None else None
+        self.fill_item_data(data, name=name, username=username, password=password, organizationid=organizationid, collectionids=collectionids, folderid=folderid, totp=totp, uris=uris, type=type, notes=notes, favorite=favorite, fields=fields)
+        result = yield functools.partial(self.execute, ['edit', 'item', itemid], datadict=data)
         if result.rc == 0:
             self.update_item_cache(result.data, organization=organization)
         return result
 
+    @command_steps
+    def edit_item_data(self, data):
+        """Writes the complete (already modified) item data and updates the caches"""
+        result = yield functools.partial(self.execute, ['edit', 'item', data.get('id')], datadict=data)
+        if result.rc == 0:
+            self.update_item_cache(result.data)
+        return result
+
+    def same_entries(self, desired, current):
+        """Checks whether lists of dictionaries (e.g. URIs, custom fields) match; only the keys of the desired entries are compared"""
+        current = current or []
+        if len(desired) != len(current):
+            return False
+        return all(all(entry.get(key) == other.get(key) for key in entry) for entry, other in zip(desired, current))
+
+    def item_changes(self, data, item, folderids=None):
+        """List of the arguments of the desired item (dict of 'create_item' arguments) whose values differ from the item data"""
+        login = data.get('login') or dict()
+        current = { 'name': data.get('name'), 'type': data.get('type'), 'notes': data.get('notes'), 'favorite': data.get('favorite'), 'username': login.get('username'), 'password': login.get('password'), 'totp': login.get('totp') }
+        changes = list()
+        for field, value in item.items():
+            if value is None:
+                continue
+            if field in current:
+                differs = (current[field] != value)
+            elif field == 'uris':
+                differs = not self.same_entries(value, login.get('uris'))
+            elif field == 'fields':
+                differs = not self.same_entries(value, data.get('fields'))
+            elif field == 'folder':
+                folderid = folderids[value]
+                differs = ((folderid if folderid != 'null' else None) != data.get('folderId'))
+            elif field == 'otherfields':
+                differs = any(data.get(key) != other for key, other in value.items())
+            else:
+                raise ValueError(f'Unknown item field [{field}] given')
+            if differs:
+                changes.append(field)
+        return changes
+
+    def apply_item_changes(self, data, item, fields, folderids=None):
+        """Sets the given fields of the desired item (dict of 'create_item' arguments) in the item data"""
+        values = { field: item[field] for field in fields if field not in ['folder', 'otherfields'] }
+        if 'otherfields' in fields:
+            data.update(item['otherfields'])
+        if 'folder' in fields:
+            folderid = folderids[item['folder']]
+            data['folderId'] = folderid if folderid != 'null' else None
+        if (data.get('login') is None) and any(field in values for field in ['username', 'password', 'totp', 'uris']):
+            data['login'] = dict()
+        return self.fill_item_data(data, **values)
+
+    def plan_reconciliation(self, desired_items, existing, folderids=None, prune=False):
+        """Plans the creates, edits and deletes needed to turn the existing items (dict by id) into the desired items (matched by name)"""
+        plan = { 'create': [], 'edit': [], 'delete': [], 'unchanged': [] }
+        byname = dict()
+        for data in existing.values():
+            byname.setdefault(data.get('name'), data)
+        names = set()
+        for item in desired_items:
+            name = item.get('name')
+            if name in names:
+                raise ValueError(f'Item name [{name}] given more than once')
+            names.add(name)
+            data = byname.get(name)
+            if data is None:
+                plan['create'].append({ 'name': name, 'item': item })
+                continue
+            fields = self.item_changes(data, item, folderids)
+            if fields:
+                plan['edit'].append({ 'id': data.get('id'), 'name': name, 'fields': fields, 'item': item })
+            else:
+                plan['unchanged'].append({ 'id': data.get('id'), 'name': name })
+        if prune:
+            # Items not matched (including further items with a desired name) are deleted
+            matched = set(entry['id'] for entry in plan['edit'] + plan['unchanged'])
+            plan['delete'] = [ { 'id': itemid, 'name': data.get('name') } for itemid, data in existing.items() if itemid not in matched ]
+        return plan
+
+    def use_bulk_create(self, plan, bulk, organization=None):
+        """Checks whether the planned items are created using a single import"""
+        # The import into an organization does not support folders
+        return bulk and (len(plan['create']) > 1) and ((organization is None) or all(entry['item'].get('folder') is None for entry in plan['create']))
+
+    def create_arguments(self, item):
+        """Arguments for 'create_item' from the desired item"""
+        arguments = dict(item)
+        arguments.setdefault('username', None)
+        arguments.setdefault('password', None)
+        return arguments
+
+    @command_steps
+    def reconcile(self, desired_items, organization=None, collection=None, prune=False, dry_run=False, bulk=True, max_workers=None):
+        """Makes the items of the scope match the desired items (dicts of 'create_item' arguments, matched by name); returns the plan including the results"""
+        existing = yield functools.partial(self.get_items_asdictbyid, organization=organization, collection=collection)
+        folderids = dict()
+        for item in desired_items:
+            if item.get('folder') is not None:
+                folderids[item['folder']] = yield functools.partial(self.get_folderid, item['folder'])
+        plan = self.plan_reconciliation(desired_items, existing, folderids, prune=prune)
+        if dry_run:
+            return plan
+        # Deletes, edits and single creates are executed concurrently (one kind after the other)
+        results = yield functools.partial(self.run_concurrently, [ functools.partial(self.delete_item, entry['id']) for entry in plan['delete'] ], max_workers=max_workers)
+        for entry, result in zip(plan['delete'], results):
+            entry['result'] = result
+        datas = [ self.apply_item_changes(self.copy_object(existing[entry['id']]), entry['item'], entry['fields'], folderids) for entry in plan['edit'] ]
+        results = yield functools.partial(self.run_concurrently, [ functools.partial(self.edit_item_data, data) for data in datas ], max_workers=max_workers)
+        for entry, result in zip(plan['edit'], results):
+            entry['result'] = result
+        if self.use_bulk_create(plan, bulk, organization=organization):
+            known = set(existing)
+            result = yield functools.partial(self.create_items_bulk, [ entry['item'] for entry in plan['create'] ], organization=organization, collection=collection, refresh_cache=False)
+            for entry in plan['create']:
+                entry['result'] = result
+            if result.rc == 0:
+                # The import does not provide the new items; list the scope again and pass the new items to the other scopes
+                for itemid, data in (yield functools.partial(self.get_items_asdict, organization=organization, collection=collection)).items():
+                    if itemid not in known:
+                        self.update_item_cache(data)
+        else:
+            results = yield functools.partial(self.run_concurrently, [ functools.partial(self.create_item, organization=organization, collection=collection, **self.create_arguments(entry['item'])) for entry in plan['create'] ], max_workers=max_workers)
+            for entry, result in zip(plan['create'], results):
+                entry['result'] = result
+        return plan
+
+    def build_import_document(self, items, organizationid=None, collectiondata=None, folderids=None):
+        """Builds an unencrypted Bitwarden JSON import document for the provided items (given as dicts of 'create_item' arguments; folders resolved by 'folderids')"""
+        collectionids = [ collectiondata.get('id') ] if collectiondata is not None else None
+        document = { 'encrypted': False, 'items': [] }
+        if organizationid is not None:
+            document['collections'] = [ { key: collectiondata.get(key) for key in ['id', 'organizationId', 'name', 'externalId'] } ] if collectiondata is not None else []
+        else:
+            document['folders'] = []
+        foldernames = { folder.get('id'): folder.get('name') for folder in self._folders or [] }
+        for item in items:
+            item = dict(item)
+            unsupported = [ key for key in item if key not in self.import_arguments ]
+            if unsupported:
+                raise ValueError(f'Unsupported item arguments {unsupported} for importing (organization and collection are given for the whole import)')
+            otherfields = item.pop('otherfields', None)
+            folder = item.pop('folder', None)
+            folderid = folderids.get(folder) if (folder is not None) and (folderids is not None) else None
+            if (folder is not None) and (organizationid is not None):
+                raise ValueError('Folders are not supported when importing into an organization')
+            if (folder is not None) and (folderid is None):
+                raise ValueError(f'Unresolved folder [{folder}] given')
+            if (folderid is None) or not self.is_uuid(folderid):
+                # No folder ('null')
+                folderid = None
+            elif folderid not in [ entry['id'] for entry in document['folders'] ]:
+                # The import keeps existing folders with the same identifier
+                document['folders'].append({ 'id': folderid, 'name': foldernames.get(folderid, folder) })
+            data = otherfields.copy() if otherfields is not None else dict()
+            data['login'] = dict()
+            item.setdefault('favorite', False)
+            if item.get('type') is None:
+                item['type'] = 1
+            self.fill_item_data(data, organizationid=organizationid, collectionids=collectionids, folderid=folderid, **item)
+            document['items'].append(data)
+        return document
+
+    @command_steps
+    def import_document(self, document, organizationid=None):
+        """Imports the provided Bitwarden JSON document using a single bw command"""
+        # The document contains secrets; NamedTemporaryFile creates the file readable for the owner only
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(document, f)
+        try:
+            filter = ['--organizationid', organizationid] if organizationid is not None else []
+            return (yield functools.partial(self.execute, ['import'] + filter + ['bitwardenjson', f.name], nojson=True))
+        finally:
+            os.remove(f.name)
+
+    @command_steps
+    def create_items_bulk(self, items, organization=None, collection=None, refresh_cache=True):
+        """Create many items (given as dicts of 'create_item' arguments) using a single import"""
+        organizationid = (yield functools.partial(self.get_organizationid, organization)) if organization is not None else None
+        collectiondata = None
+        if collection is not None:
+            if organizationid is None:
+                raise ValueError('Organization must be provided when importing into a collection')
+            collectionid = yield functools.partial(self.get_collectionid, collection, organization=organization)
+            # The scope is given by identifier like the collection names were listed
+            collectiondata = (yield functools.partial(self.get_collections_asdictbyid, organization=organizationid)).get(collectionid)
+            if collectiondata is None:
+                raise ValueError(f'Unknown collection [{collection}] given')
+        folderids = dict()
+        for folder in set(item['folder'] for item in items if item.get('folder') is not None):
+            folderids[folder] = yield functools.partial(self.get_folderid, folder)
+        if folderids and (self._folders is None):
+            # Names of the folders for the import document
+            yield self.get_folders
+        document = self.build_import_document(items, organizationid=organizationid, collectiondata=collectiondata, folderids=folderids)
+        result = yield functools.partial(self.import_document, document, organizationid=organizationid)
+        if (result.rc == 0) and (self._vault is not None):
+            # Reads are answered from the loaded vault which has to contain the imported items
+            yield functools.partial(self.refresh_vault_items, organizationid)
+        elif (result.rc == 0) and refresh_cache:
+            yield functools.partial(self.get_items_asdict, organization=organization)
+        return result
+
+    @command_steps
     def delete_collection(self, collection, organization, permanent=False):
         """Delete collection with the provided identifier ('permanent' does not use trash)"""
-        organizationid = self.get_organizationid(organization)
-        collectionid = self.get_collectionid(collection, organization=organization)
-        return self.execute(f'delete org-collection {collectionid} --organizationid {organizationid}' + (' --permanent' if permanent else ''))
+        organizationid = yield functools.partial(self.get_organizationid, organization)
+        collectionid = yield functools.partial(self.get_collectionid, collection, organization=organization)
+        result = yield functools.partial(self.execute, ['delete', 'org-collection', collectionid, '--organizationid', organizationid] + (['--permanent'] if permanent else []))
+        if result.rc == 0:
+            self.remove_from_collection_cache(collectionid)
+        return result
 
+    @command_steps
     def delete_item(self, itemid, permanent=False):
         """Delete item with the provided identifier ('permanent' does not use trash)"""
-        return self.execute(f'delete item {itemid}' + (' --permanent' if permanent else ''))
+        result = yield functools.partial(self.execute, ['delete', 'item', itemid] + (['--permanent'] if permanent else []))
+        if result.rc == 0:
+            self.remove_from_item_cache(itemid)
+        return result
+
+    def attachment_command(self, item, attachment, output_path):
+        """Builds the bw command (as argument list) for saving an attachment (identifier, file name or dictionary) of an item (identifier or dictionary) to a file"""
+        itemid = item.get('id') if isinstance(item, (dict, Model)) else item
+        attachmentid = attachment.get('id') if isinstance(attachment, (dict, Model)) else attachment
+        return ['get', 'attachment', attachmentid, '--itemid', itemid, '--output', output_path]
+
+    def get_attachment(self, item, attachment, output_path):
+        """Saves an attachment (identifier, file name or dictionary) of an item (identifier or dictionary) to a file; "bw" writes the file itself"""
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        return self.execute(self.attachment_command(item, attachment, output_path), nojson=True)
+
+    def get_attachments(self, downloads, max_workers=None):
+        """Saves several attachments concurrently (see 'run_concurrently'); downloads are (item, attachment, output_path) tuples; returns the list of results"""
+        return self.run_concurrently([ functools.partial(self.get_attachment, *download) for download in downloads ], max_workers=max_workers)
+
+    def attachment_downloads(self, items, directory):
+        """List of (item, attachment, output_path) tuples for all attachments of the items, saved as <directory>/<item id>/<attachment id>/<file name>"""
+        downloads = list()
+        for item in items:
+            for attachment in item.get('attachments') or []:
+                filename = os.path.basename(attachment.get('fileName') or '') or 'attachment'
+                downloads.append((item, attachment, os.path.join(directory, item.get('id'), attachment.get('id'), filename)))
+        return downloads
+
+    @command_steps
+    def create_attachment(self, item, path):
+        """Attaches the file to the item (identifier or dictionary); "bw" reads the file itself"""
+        itemid = item.get('id') if isinstance(item, (dict, Model)) else item
+        result = yield functools.partial(self.execute, ['create', 'attachment', '--file', path, '--itemid', itemid])
+        if (result.rc == 0) and isinstance(result.data, dict) and (result.data.get('object') == 'item'):
+            self.update_item_cache(result.data)
+        return result
 
     def is_uuid(self, s):
         """Checks whether the given string is a valid UUID"""
@@ -517,11 +1693,12 @@ class BWInterface():
 
     def dict2base64(self, datadict):
         """Encodes a dictionary into a base64-encoded JSON notation"""
-        data = json.dumps(datadict)
+        data = json.dumps(datadict, default=json_default)
         data = bytes(data, 'utf-8')
         data = base64.b64encode(data)
         return data.decode('utf-8')
 
+    @command_steps
     def get_organizationid(self, organization):
         """Converts a string identifying an organization into the organization's UUID"""
         if organization == '':
@@ -530,12 +1707,27 @@ class BWInterface():
             return organization
         organizationid = organization
         if not self.is_uuid(organizationid):
-            organizationid = self.organizations_asdictbyname.get(organization, dict()).get('id')
+            organizationid = self._names.organizationid(organization, (yield self.cached_organizations))
             if organizationid is None:
                 raise ValueError(f'Unknown organization name [{organization}] given')
         assert self.is_uuid(organizationid)
         return organizationid
 
+    @command_steps
+    def get_filterids(self, organization=None, collection=None, folder=None):
+        """Resolves the given filters into identifiers (None if not filtered); raises ValueError on unknown names"""
+        organizationid = (yield functools.partial(self.get_organizationid, organization)) if organization is not None else None
+        collectionid = (yield functools.partial(self.get_collectionid, collection, organization=organizationid)) if collection is not None else None
+        folderid = (yield functools.partial(self.get_folderid, folder)) if folder is not None else None
+        return organizationid, collectionid, folderid
+
+    @command_steps
+    def load_collection_names(self, organizationid=None):
+        """Lists the collections of the organization (of all organizations if None) for resolving their names; the listing is cached as well"""
+        # Caching the listing sets the names (see 'cache_collections')
+        yield functools.partial(self.get_collections_asdict, organization=organizationid)
+
+    @command_steps
     def get_collectionid(self, collection, organization=None, use_cache=True):
         """Converts a string identifying a collection into the collection's UUID"""
         if collection == '':
@@ -544,12 +1736,16 @@ class BWInterface():
             return collection
         collectionid = collection
         if not self.is_uuid(collectionid):
-            collectionid = self.get_collections_asdictbyname(organization=organization, use_cache=use_cache).get(collection, dict()).get('id')
+            organizationid = (yield functools.partial(self.get_organizationid, organization)) if organization is not None else None
+            if (not use_cache) or not self._names.has_collections(organizationid):
+                yield functools.partial(self.load_collection_names, organizationid)
+            collectionid = self._names.collectionid(collection, organizationid)
             if collectionid is None:
                 raise ValueError(f'Unknown collection name [{collection}] given')
         assert self.is_uuid(collectionid)
         return collectionid
 
+    @command_steps
     def get_folderid(self, folder):
         """Converts a string identifying a folder into the folder's UUID"""
         if folder == '':
@@ -558,26 +1754,96 @@ class BWInterface():
             return folder
         folderid = folder
         if not self.is_uuid(folderid):
-            raise NotImplementedError('not needed so far and thus not implemented')
-            folderid = self.get_folders_asdictbyname().get(folder, dict()).get('id')
+            folderid = self._names.folderid(folder, (yield self.cached_folders))
             if folderid is None:
                 raise ValueError(f'Unknown folder name [{folder}] given')
         assert self.is_uuid(folderid)
         return folderid
 
+    def name_requests(self, names):
+        """List of (kind, name, organization) tuples for the provided (kind, name) or (kind, name, organization) tuples; raises ValueError on unknown kinds"""
+        requests = [ (entry[0], entry[1], entry[2] if len(entry) > 2 else None) for entry in names ]
+        for kind, name, organization in requests:
+            if kind not in ['organization', 'collection', 'folder']:
+                raise ValueError(f'Unknown kind of name [{kind}] given')
+        return requests
+
+    def collection_scopes_to_load(self, organizationids, use_cache=True):
+        """Organizations whose collections need to be listed for resolving names (a single None if listing all collections at once is preferable)"""
+        missing = [ organizationid for organizationid in set(organizationids) if (not use_cache) or not self._names.has_collections(organizationid) ]
+        return missing if len(missing) <= 1 else [ None ]
+
+    @command_steps
+    def resolve_many(self, names, use_cache=True):
+        """List of identifiers for (kind, name) or (kind, name, organization) tuples with kind 'organization', 'collection' or 'folder' (None for unknown names)"""
+        requests = self.name_requests(names)
+        # The collections of all organizations needed are listed before resolving so that each listing is done at most once
+        organizationids = list()
+        for kind, name, organization in requests:
+            if (kind == 'collection') and (name not in ['', 'null', 'notnull']) and not self.is_uuid(name):
+                try:
+                    organizationids.append((yield functools.partial(self.get_organizationid, organization)) if organization is not None else None)
+                except ValueError:
+                    pass
+        for organizationid in self.collection_scopes_to_load(organizationids, use_cache=use_cache):
+            yield functools.partial(self.load_collection_names, organizationid)
+        result = list()
+        for kind, name, organization in requests:
+            try:
+                if kind == 'organization':
+                    result.append((yield functools.partial(self.get_organizationid, name)))
+                elif kind == 'collection':
+                    result.append((yield functools.partial(self.get_collectionid, name, organization=organization)))
+                else:
+                    result.append((yield functools.partial(self.get_folderid, name)))
+            except ValueError:
+                result.append(None)
+        return result
+
+    @command_steps
+    def cached_organizations(self):
+        """Cached list of organizations as returned by bw (listed on first use)"""
+        if self._organizations is None:
+            yield self.get_organizations
+        return self._organizations
+
+    @command_steps
+    def cached_folders(self):
+        """Cached list of folders as returned by bw (listed on first use)"""
+        if self._folders is None:
+            yield self.get_folders
+        return self._folders
+
     @property
     def organizations(self):
         """Cached list of organizations as returned by bw"""
-        if self._organizations is None:
-            self.get_organizations()
-        return self._organizations
+        return self.cached_organizations()
 
     @property
+    @command_steps
     def organizations_asdictbyid(self):
         """Dictionary of (cached) organizations with organization identifiers as keys"""
-        return { item.get('id'): item for item in self.organizations }
+        return { item.get('id'): item for item in (yield self.cached_organizations) }
 
     @property
+    @command_steps
     def organizations_asdictbyname(self):
         """Dictionary of (cached) organizations with organization names as keys"""
-        return { item.get('name'): item for item in self.organizations }
+        return { item.get('name'): item for item in (yield self.cached_organizations) }
+
+    @property
+    def folders(self):
+        """Cached list of folders as returned by bw"""
+        return self.cached_folders()
+
+    @property
+    @command_steps
+    def folders_asdictbyid(self):
+        """Dictionary of (cached) folders with folder identifiers as keys"""
+        return { item.get('id'): item for item in (yield self.cached_folders) }
+
+    @property
+    @command_steps
+    def folders_asdictbyname(self):
+        """Dictionary of (cached) folders with folder names as keys"""
+        return { item.get('name'): item for item in (yield self.cached_folders) }
@@ -0,0 +1,275 @@
+import http.client
+import json
+import os
+import queue
+import shlex
+import socket
+import subprocess
+import threading
+import time
+import urllib.parse
+
+from .models import json_default
+
+"""Transport executing "bw" commands via the REST API of a long-running "bw serve" process."""
+
+# Vault Management API documentation: https://bitwarden.com/help/vault-management-api/
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection via a unix domain socket"""
+
+    def __init__(self, socket_path, timeout=None):
+        """Initialize instance"""
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        """Connect to the unix domain socket"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class BWServeTransport():
+
+    # Mapping of "bw" filter options to query parameters of the REST API
+    option_params = {
+        '--organizationid': 'organizationId',
+        '--collectionid': 'collectionId',
+        '--folderid': 'folderId',
+        '--search': 'search',
+        '--url': 'url',
+        '--length': 'length',
+        '--words': 'words',
+        '--separator': 'separator',
+        '--min_number': 'minNumber',
+        '--min_special': 'minSpecial',
+    }
+    # Mapping of "bw" flags to boolean query parameters of the REST API
+    flag_params = {
+        '--uppercase': 'uppercase',
+        '--lowercase': 'lowercase',
+        '--number': 'number',
+        '--special': 'special',
+        '--passphrase': 'passphrase',
+        '--capitalize': 'capitalize',
+        '--include_number': 'includeNumber',
+        '--ambiguous': 'ambiguous',
+        '--permanent': 'permanent',
+        '--trashed': 'trashed',
+    }
+    # Flags that only influence the output formatting of "bw"
+    format_flags = ['--raw', '--pretty', '--response', '--quiet', '--nointeraction']
+
+    def __init__(self, bw_cli=None, hostname='localhost', port=None, socket_path=None, launch=True, pool_size=4, timeout=60, startup_timeout=30):
+        """Initialize instance"""
+        self.bw_cli = bw_cli
+        self.hostname = hostname
+        self.port = port
+        self.socket_path = socket_path
+        self.launch = launch
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self._pool = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_free_port(self):
+        """Asks the operating system for a currently unused TCP port"""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind((self.hostname, 0))
+            return sock.getsockname()[1]
+
+    def new_connection(self):
+        """Opens a new (keep-alive) HTTP connection to "bw serve\""""
+        if self.socket_path is not None:
+            return UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+        return http.client.HTTPConnection(self.hostname, self.port, timeout=self.timeout)
+
+    def start(self, env=None):
+        """Launches "bw serve" (if configured) and waits until it answers requests"""
+        with self._lock:
+            if self._started:
+                return
+            if self.launch:
+                if self.bw_cli is None:
+                    raise ValueError('Path to the "bw" CLI must be provided to launch "bw serve"')
+                if self.socket_path is not None:
+                    hostname = 'unix:' + self.socket_path
+                    port = []
+                else:
+                    if self.port is None:
+                        self.port = self.get_free_port()
+                    hostname = self.hostname
+                    port = ['--port', str(self.port)]
+                if env is not None:
+                    newenv = os.environ.copy()
+                    newenv.update(env)
+                else:
+                    newenv = None
+                self.process = subprocess.Popen(shlex.split(self.bw_cli) + ['serve', '--hostname', hostname] + port, env=newenv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            elif (self.port is None) and (self.socket_path is None):
+                raise ValueError('Port or socket path of the running "bw serve" must be provided')
+            deadline = time.monotonic() + self.startup_timeout
+            while True:
+                try:
+                    self.request('GET', '/status')
+                    break
+                except OSError:
+                    if (self.process is not None) and (self.process.poll() is not None):
+                        self.process = None
+                        raise RuntimeError('"bw serve" terminated unexpectedly')
+                    if time.monotonic() > deadline:
+                        self.stop_process()
+                        raise TimeoutError('"bw serve" did not become ready in time')
+                    time.sleep(0.1)
+            self._started = True
+
+    def stop_process(self):
+        """Terminates the launched "bw serve" process"""
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def stop(self):
+        """Closes all pooled connections and terminates the launched "bw serve" process"""
+        with self._lock:
+            while True:
+                try:
+                    self._pool.get_nowait().close()
+                except queue.Empty:
+                    break
+            self.stop_process()
+            self._started = False
+
+    def request(self, method, path, body=None):
+        """Sends a request via a pooled keep-alive connection and returns HTTP status and decoded response"""
+        headers = dict()
+        if body is not None:
+            body = json.dumps(body, default=json_default).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            try:
+                conn = self._pool.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn = self.new_connection()
+                reused = False
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                content = response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                conn.close()
+                # The server may have closed an idle keep-alive connection; retry once with a new one
+                if reused and (attempt == 0):
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if response.will_close or (self._pool.qsize() >= self.pool_size):
+                conn.close()
+            else:
+                self._pool.put(conn)
+            try:
+                content = json.loads(content.decode('utf-8')) if content else dict()
+            except ValueError:
+                content = { 'success': False, 'message': content.decode('utf-8', errors='replace') }
+            return response.status, content
+
+    def translate(self, args, datadict=None):
+        """Translates "bw" command line arguments into method, path and body of a REST request (None if unsupported)"""
+        positional = list()
+        params = dict()
+        pretty = False
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            if arg in self.option_params:
+                if i + 1 >= len(args):
+                    return None
+                params[self.option_params[arg]] = args[i + 1]
+                i += 2
+                continue
+            if arg in self.flag_params:
+                params[self.flag_params[arg]] = 'true'
+            elif arg == '--pretty':
+                pretty = True
+            elif arg in self.format_flags:
+                pass
+            elif arg.startswith('--'):
+                return None
+            else:
+                positional.append(arg)
+            i += 1
+        if not positional:
+            return None
+        action, positional = positional[0], positional[1:]
+        query = ('?' + urllib.parse.urlencode(params)) if params else ''
+        if (action == 'status') and not positional:
+            return 'GET', '/status' + query, None, pretty
+        if (action == 'sync') and not positional:
+            return 'POST', '/sync' + query, None, pretty
+        if (action == 'generate') and not positional:
+            return 'GET', '/generate' + query, None, pretty
+        if (action == 'list') and (len(positional) == 1):
+            return 'GET', f'/list/object/{positional[0]}' + query, None, pretty
+        if len(positional) == 2:
+            path = '/object/' + '/'.join(urllib.parse.quote(item, safe='') for item in positional) + query
+            if action == 'get':
+                return 'GET', path, None, pretty
+            if (action == 'edit') and (datadict is not None):
+                return 'PUT', path, datadict, pretty
+            if action == 'delete':
+                return 'DELETE', path, None, pretty
+        if (action == 'create') and (len(positional) == 1) and (datadict is not None):
+            return 'POST', f'/object/{positional[0]}' + query, datadict, pretty
+        return None
+
+    def run(self, command, env=None, datadict=None):
+        """Executes a bw command (string or argument list) via "bw serve" and returns (rc, out, err) like "run_process" (None if not supported)"""
+        args = shlex.split(command) if isinstance(command, str) else list(command)
+        args = args[len(shlex.split(self.bw_cli)) if self.bw_cli is not None else 1:]  # strip path of "bw" CLI (may consist of several words)
+        request = self.translate(args, datadict)
+        if request is None:
+            return None
+        method, path, body, pretty = request
+        self.start(env)
+        status, content = self.request(method, path, body)
+        if not content.get('success', 200 <= status < 300):
+            return 1, '', content.get('message') or f'HTTP status {status}'
+        data = content.get('data')
+        if isinstance(data, dict):
+            if data.get('object') == 'list':
+                data = data.get('data')
+            elif data.get('object') == 'string':
+                data = data.get('data')
+            elif data.get('object') == 'template':
+                data = data.get('template')
+            elif data.get('object') == 'message':
+                data = data.get('title') or data.get('message') or ''
+        if data is None:
+            return 0, '', ''
+        if isinstance(data, str):
+            return 0, data, ''
+        return 0, json.dumps(data, indent=2 if pretty else None), ''
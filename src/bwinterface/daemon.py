@@ -0,0 +1,362 @@
+import argparse
+import json
+import os
+import shlex
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+
+from .bwinterface import BWInterface
+from .bwserve import BWServeTransport
+from .models import json_default
+
+"""Long-running process keeping an unlocked session and the caches, answering requests of short-lived scripts via a unix socket."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+def default_socket_path():
+    """Path of the socket if none is given (in a directory accessible for the current user only)"""
+    return os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(), f'bwinterface-{os.getuid()}', 'daemon.sock')
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Answers the requests of a client connection (one JSON object per line each way)"""
+
+    def handle(self):
+        """Handles requests until the client closes the connection"""
+        if hasattr(socket, 'SO_PEERCRED'):
+            # The permissions of the socket already restrict access; connections of other users are refused nevertheless
+            pid, uid, gid = struct.unpack('3i', self.request.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i')))
+            if uid != os.getuid():
+                return
+        for line in self.rfile:
+            response = self.server.daemon.dispatch(line)
+            self.wfile.write(json.dumps(response, default=json_default).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded unix socket server"""
+    daemon_threads = True
+
+
+class BWDaemon():
+    """Serves the methods of a BWInterface instance (sharing its session and caches) to clients connecting to a unix socket"""
+
+    # Methods of BWInterface that may be called by clients
+    exposed_methods = [
+        'cache_stats', 'create_collection', 'create_item', 'create_items_bulk', 'delete_collection', 'delete_item', 'edit_item', 'find_items',
+        'generate_passwords', 'get_collectionid', 'get_collections_asdictbyid', 'get_collections_asdictbyname', 'get_folderid', 'get_item',
+        'get_item_notes', 'get_items_asdictbyid', 'get_items_asdictbyname', 'get_organizationid', 'get_session_status', 'get_status',
+        'get_totp', 'get_totps', 'invalidate_collection_cache', 'invalidate_item_cache', 'reconcile', 'resolve_many', 'search_items', 'sync',
+    ]
+    # Options of listings answered from the caches -> filter argument of the accessors
+    filter_options = { '--organizationid': 'organization', '--collectionid': 'collection', '--folderid': 'folder' }
+    # Commands of clients that would change the session of the daemon
+    refused_commands = ['login', 'logout', 'lock', 'config', 'serve']
+
+    def __init__(self, bw, socket_path=None):
+        """Initialize instance"""
+        self.bw = bw
+        self.socket_path = socket_path if socket_path is not None else default_socket_path()
+        self.server = None
+
+    def dispatch(self, line):
+        """Executes the request given as JSON notation; returns the response as dictionary"""
+        try:
+            request = json.loads(line)
+            if 'command' in request:
+                return { 'output': list(self.run_command(request['command'], env=request.get('env'), datadict=request.get('datadict'))) }
+            method = request.get('method')
+            if method not in self.exposed_methods:
+                raise ValueError(f'Method [{method}] is not available')
+            result = getattr(self.bw, method)(*request.get('args', []), **request.get('kwargs', dict()))
+        except Exception as e:
+            return { 'error': { 'type': type(e).__name__, 'message': str(e) } }
+        if isinstance(result, BWInterface.result_tuple):
+            return { 'bwresult': list(result) }
+        return { 'result': result }
+
+    def cached_listing(self, args):
+        """Answer to a listing of organizations, folders, collections or items from the caches (None if the command is no such listing)"""
+        positional = list()
+        filters = dict()
+        i = 0
+        while i < len(args):
+            if args[i] in self.filter_options:
+                if i + 1 >= len(args):
+                    return None
+                filters[self.filter_options[args[i]]] = args[i + 1]
+                i += 2
+                continue
+            if args[i] in BWServeTransport.format_flags:
+                i += 1
+                continue
+            if args[i].startswith('-'):
+                # Options like "--search" are left to "bw"
+                return None
+            positional.append(args[i])
+            i += 1
+        if (len(positional) != 2) or (positional[0] != 'list'):
+            return None
+        if (positional[1] == 'organizations') and not filters:
+            return self.bw.organizations
+        if (positional[1] == 'folders') and not filters:
+            return self.bw.folders
+        if (positional[1] == 'collections') and (set(filters) <= { 'organization' }):
+            return list(self.bw.get_collections_asdictbyid(**filters).values())
+        if positional[1] == 'items':
+            return list(self.bw.get_items_asdictbyid(**filters).values())
+        return None
+
+    def apply_write(self, args, result):
+        """Applies the result of a write command executed for a client to the caches"""
+        if (result.rc != 0) or self.bw.is_readonly(args):
+            return
+        words = [ arg for arg in args if not arg.startswith('-') ]
+        data = result.data if isinstance(result.data, dict) else dict()
+        if data.get('object') == 'item':
+            self.bw.update_item_cache(result.data)
+        elif data.get('object') == 'org-collection':
+            self.bw.update_collection_cache(result.data)
+        elif (words[:2] == ['delete', 'item']) and (len(words) > 2):
+            self.bw.remove_from_item_cache(words[2])
+        elif (words[:2] == ['delete', 'org-collection']) and (len(words) > 2):
+            self.bw.remove_from_collection_cache(words[2])
+        else:
+            # The changes are not known (e.g. imports)
+            self.bw.invalidate_folder_cache()
+            self.bw.invalidate_collection_cache()
+            self.bw.invalidate_item_cache()
+
+    def run_command(self, args, env=None, datadict=None):
+        """Executes a bw command (arguments without path of "bw") for a client transport and returns (rc, out, err); listings are answered from the caches"""
+        words = [ arg for arg in args if not arg.startswith('-') ]
+        if words[:1] in [ [ command ] for command in self.refused_commands ]:
+            return 1, '', f'Command [{words[0]}] is not available via the daemon'
+        if words[:1] == ['unlock']:
+            # The daemon's session is unlocked if needed; it is not passed to the client
+            result = self.bw.ensure_unlocked((env or dict()).get('BW_PASSWORD'))
+            return result.rc, '', result.err
+        if words == ['sync']:
+            result = self.bw.sync(refresh='incremental')
+            return result.rc, result.out, result.err
+        listing = self.cached_listing(args)
+        if listing is not None:
+            return 0, json.dumps(listing, default=json_default), ''
+        result = self.bw.execute(args, env=env or None, datadict=datadict)
+        self.apply_write(args, result)
+        return result.rc, result.out, result.err
+
+    def bind(self):
+        """Creates the socket accessible for the current user only"""
+        directory = os.path.dirname(os.path.abspath(self.socket_path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            # Remove a stale socket but don't take over the socket of a running daemon
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                try:
+                    sock.connect(self.socket_path)
+                except OSError:
+                    os.remove(self.socket_path)
+                else:
+                    raise RuntimeError(f'A daemon is already listening on [{self.socket_path}]')
+        # The socket is created accessible for the current user only
+        umask = os.umask(0o177)
+        try:
+            self.server = DaemonServer(self.socket_path, DaemonRequestHandler)
+        finally:
+            os.umask(umask)
+        self.server.daemon = self
+
+    def serve_forever(self):
+        """Answers requests until 'shutdown' is called"""
+        if self.server is None:
+            self.bind()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self):
+        """Stops 'serve_forever' (to be called from another thread)"""
+        if self.server is not None:
+            self.server.shutdown()
+
+    def close(self):
+        """Closes and removes the socket"""
+        if self.server is not None:
+            self.server.server_close()
+            self.server = None
+            try:
+                os.remove(self.socket_path)
+            except FileNotFoundError:
+                pass
+
+
+class DaemonClient():
+    """Calls the methods of BWInterface on a daemon via its unix socket; provides the methods listed in 'BWDaemon.exposed_methods'"""
+
+    # Exceptions that are raised again with their original type
+    client_exceptions = { 'ValueError': ValueError, 'KeyError': KeyError, 'TypeError': TypeError }
+
+    def __init__(self, socket_path=None, timeout=60):
+        """Initialize instance"""
+        self.socket_path = socket_path if socket_path is not None else default_socket_path()
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getattr__(self, name):
+        if name in BWDaemon.exposed_methods:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    def connect(self):
+        """Opens the connection to the daemon (kept open for further requests)"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self._file = sock.makefile('rwb')
+
+    def call(self, method, *args, **kwargs):
+        """Calls the method of the daemon's BWInterface instance and returns its result"""
+        response = self.request({ 'method': method, 'args': args, 'kwargs': kwargs })
+        if 'bwresult' in response:
+            return BWInterface.result_tuple(*response['bwresult'])
+        return response['result']
+
+    def run_command(self, args, env=None, datadict=None):
+        """Executes a bw command (arguments without path of "bw") via the daemon and returns (rc, out, err)"""
+        return tuple(self.request({ 'command': args, 'env': env, 'datadict': datadict })['output'])
+
+    def request(self, request):
+        """Sends the request (dictionary) to the daemon and returns the response; errors reported by the daemon are raised"""
+        request = json.dumps(request, default=json_default).encode('utf-8') + b'\n'
+        with self._lock:
+            if self._sock is None:
+                self.connect()
+            try:
+                self._file.write(request)
+                self._file.flush()
+                line = self._file.readline()
+            except OSError:
+                self.close()
+                raise
+            if not line:
+                self.close()
+                raise ConnectionError('Connection closed by the daemon')
+        response = json.loads(line)
+        if 'error' in response:
+            error = response['error']
+            raise self.client_exceptions.get(error['type'], RuntimeError)(error['message'])
+        return response
+
+    def close(self):
+        """Closes the connection"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                # Flushing the buffer fails if the daemon closed the connection
+                pass
+            self._file = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class DaemonTransport():
+    """Transport for BWInterface executing the "bw" commands via the daemon; listings are answered from the daemon's caches"""
+
+    def __init__(self, socket_path=None, timeout=60, bw_cli=None):
+        """Initialize instance"""
+        self.bw_cli = bw_cli
+        self.client = DaemonClient(socket_path=socket_path, timeout=timeout)
+
+    def run(self, command, env=None, datadict=None):
+        """Executes a bw command (string or argument list) via the daemon and returns (rc, out, err) like "run_process\""""
+        args = shlex.split(command) if isinstance(command, str) else list(command)
+        args = args[len(shlex.split(self.bw_cli)) if self.bw_cli is not None else 1:]  # strip path of "bw" CLI
+        # The daemon uses its own session
+        env = { key: value for key, value in env.items() if key != 'BW_SESSION' } if env is not None else None
+        return self.client.run_command(args, env=env or None, datadict=datadict)
+
+    def stop(self):
+        """Closes the connection to the daemon"""
+        self.client.close()
+
+
+def sync_periodically(bw, interval, stopped):
+    """Syncs the vault (applying the changes to the caches) every 'interval' seconds until the event is set"""
+    while not stopped.wait(interval):
+        # A failed sync is reported and retried after the interval
+        try:
+            result = bw.sync(refresh='incremental')
+        except Exception as e:
+            print(f'Periodic sync failed: {e}', file=sys.stderr)
+            continue
+        if result.rc != 0:
+            print(f'Periodic sync failed: {result.err.strip()}', file=sys.stderr)
+
+
+def main(argv=None):
+    """Parses the command line and runs the daemon"""
+    parser = argparse.ArgumentParser(prog='bwinterface', description='Keep an unlocked "bw" session and the caches of bwinterface for short-lived scripts, serving them via a unix socket')
+    parser.add_argument('--socket', default=None, help=f'path of the unix socket (default: {default_socket_path()})')
+    parser.add_argument('--bw-cli', default='/opt/bitwarden/bw', help='path of the "bw" CLI')
+    parser.add_argument('--password-file', help='file containing the master password for unlocking (otherwise the session is taken from BW_SESSION)')
+    parser.add_argument('--serve', action='store_true', help='execute commands via a "bw serve" process instead of a process per command')
+    parser.add_argument('--use-models', action='store_true', help='cache objects as compact models')
+    parser.add_argument('--stream-items', action='store_true', help='parse item listings incrementally')
+    parser.add_argument('--sync-interval', type=float, default=0, help='sync the vault every given number of seconds (default: never)')
+    parser.add_argument('--verbose', action='store_true', help='print the "bw" commands executed')
+    args = parser.parse_args(argv)
+    transport = BWServeTransport() if args.serve else None
+    bw = BWInterface(bw_cli=args.bw_cli, print_bwcommands=args.verbose, transport=transport, stream_items=args.stream_items, use_models=args.use_models)
+    if args.password_file is not None:
+        with open(args.password_file, 'r') as f:
+            result = bw.ensure_unlocked(f.read().strip())
+        if result.rc != 0:
+            sys.exit(f'Unlocking failed: {result.err}')
+    daemon = BWDaemon(bw, socket_path=args.socket)
+    try:
+        daemon.bind()
+    except RuntimeError as e:
+        sys.exit(str(e))
+    # SIGTERM ends the daemon like Ctrl+C so that the socket is removed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    stopped = threading.Event()
+    if args.sync_interval > 0:
+        threading.Thread(target=sync_periodically, args=(bw, args.sync_interval, stopped), daemon=True).start()
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopped.set()
+        if transport is not None:
+            transport.stop()
+
+
+if __name__ == '__main__':
+    main()
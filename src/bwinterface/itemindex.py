@@ -0,0 +1,109 @@
+import urllib.parse
+
+"""Secondary indexes over items for lookups without scanning all items."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class ItemIndex():
+    """Indexes items by name, username, URI host, collection and folder; each key maps to all matching items"""
+
+    fields = ['name', 'username', 'host', 'collection', 'folder']
+
+    def __init__(self, items=None):
+        """Initialize instance"""
+        self.by_id = dict()
+        self.indexes = { field: dict() for field in self.fields }
+        if items is not None:
+            for item in items:
+                self.add(item)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    @staticmethod
+    def normalize_host(uri):
+        """Extracts the lower-case host name (without port) from a URI; URIs without scheme are accepted"""
+        if not uri:
+            return None
+        uri = uri.strip()
+        if '://' not in uri:
+            uri = '//' + uri
+        try:
+            host = urllib.parse.urlsplit(uri).hostname
+        except ValueError:
+            return None
+        return host.rstrip('.') if host else None
+
+    def extract_keys(self, item):
+        """Dictionary of the index keys of an item per field"""
+        login = item.get('login') or dict()
+        hosts = set(self.normalize_host(uri.get('uri')) for uri in (login.get('uris') or []))
+        hosts.discard(None)
+        return {
+            'name': [ item.get('name') ],
+            'username': [ login.get('username') ] if login.get('username') is not None else [],
+            'host': hosts,
+            'collection': item.get('collectionIds') or [],
+            'folder': [ item.get('folderId') ],
+        }
+
+    def add(self, item):
+        """Adds the new or updated item to the indexes"""
+        itemid = item.get('id')
+        if itemid in self.by_id:
+            self.remove(itemid)
+        self.by_id[itemid] = item
+        for field, keys in self.extract_keys(item).items():
+            index = self.indexes[field]
+            for key in keys:
+                index.setdefault(key, dict())[itemid] = item
+
+    def remove(self, itemid):
+        """Removes the item with the given identifier from the indexes; returns the removed item (None if unknown)"""
+        item = self.by_id.pop(itemid, None)
+        if item is None:
+            return None
+        for field, keys in self.extract_keys(item).items():
+            index = self.indexes[field]
+            for key in keys:
+                matches = index.get(key)
+                if matches is not None:
+                    matches.pop(itemid, None)
+                    if not matches:
+                        del index[key]
+        return item
+
+    def clear(self):
+        """Removes all items"""
+        self.by_id.clear()
+        for index in self.indexes.values():
+            index.clear()
+
+    def find(self, field, key):
+        """List of items with the given key in the index of the given field"""
+        if field == 'host':
+            key = self.normalize_host(key)
+        return list(self.indexes[field].get(key, dict()).values())
+
+    def find_by_name(self, name):
+        """List of items with the given name"""
+        return self.find('name', name)
+
+    def find_by_username(self, username):
+        """List of items with the given username"""
+        return self.find('username', username)
+
+    def find_by_host(self, host):
+        """List of items having a URI with the given host (a full URI may be provided as well)"""
+        return self.find('host', host)
+
+    def find_by_collection(self, collectionid):
+        """List of items in the collection with the given identifier"""
+        return self.find('collection', collectionid)
+
+    def find_by_folder(self, folderid):
+        """List of items in the folder with the given identifier (None: items without folder)"""
+        return self.find('folder', folderid)
@@ -0,0 +1,78 @@
+import codecs
+import json
+
+"""Incremental parsing of JSON arrays as provided by "bw list"."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class JSONArrayParser():
+    """Parses a JSON array fed in chunks and provides each element as soon as it is complete"""
+
+    whitespace = ' \t\r\n'
+    delimiters = ' \t\r\n,]'
+
+    def __init__(self):
+        """Initialize instance"""
+        # Elements are decoded separately; share the key strings among them like a single json.loads does
+        self.keys = dict()
+        self.decoder = json.JSONDecoder(object_pairs_hook=self.build_object)
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.started = False
+        self.finished = False
+        self.expect_comma = False
+        self.count = 0
+
+    def build_object(self, pairs):
+        """Builds a dictionary with deduplicated keys"""
+        keys = self.keys
+        return { keys.setdefault(key, key): value for key, value in pairs }
+
+    def feed(self, data, final=False):
+        """Adds a chunk of bytes; returns the list of elements completed by it (final: no more data follows)"""
+        buffer = self.buffer + self.utf8.decode(data, final)
+        length = len(buffer)
+        elements = list()
+        pos = 0
+        while True:
+            while (pos < length) and (buffer[pos] in self.whitespace):
+                pos += 1
+            if pos >= length:
+                break
+            if self.finished:
+                raise ValueError('Extra data after JSON array')
+            if not self.started:
+                if buffer[pos] != '[':
+                    raise ValueError('JSON array expected')
+                self.started = True
+                pos += 1
+            elif buffer[pos] == ']':
+                if (self.count > 0) and not self.expect_comma:
+                    raise ValueError(f'Element expected at position {pos}')
+                self.finished = True
+                pos += 1
+            elif self.expect_comma:
+                if buffer[pos] != ',':
+                    raise ValueError(f'Comma expected at position {pos}')
+                self.expect_comma = False
+                pos += 1
+            else:
+                try:
+                    element, end = self.decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break  # element not complete yet
+                if (not final) and not isinstance(element, (dict, list, str)) and ((end >= length) or (buffer[end] not in self.delimiters)):
+                    break  # a number might continue in the next chunk (e.g. after its decimal point)
+                elements.append(element)
+                self.count += 1
+                self.expect_comma = True
+                pos = end
+        self.buffer = buffer[pos:]
+        if final and not self.finished:
+            raise ValueError('Incomplete JSON array')
+        return elements
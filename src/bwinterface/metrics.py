@@ -0,0 +1,125 @@
+import copy
+import json
+import threading
+
+"""Collection and export of timing metrics of executed "bw" commands and cache accesses."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class CommandMetrics():
+    """Collects per-command timings, output sizes, return codes, coalesced executions and cache hits/misses"""
+
+    # Options of "bw" that are followed by a value
+    value_options = ['--organizationid', '--collectionid', '--folderid', '--search', '--url', '--length', '--words', '--separator', '--min_number', '--min_special', '--format', '--output', '--passwordenv', '--passwordfile', '--itemid', '--file']
+
+    def __init__(self):
+        """Initialize instance"""
+        self._lock = threading.Lock()
+        self.hooks = list()
+        self.reset()
+
+    def reset(self):
+        """Clears all collected metrics"""
+        with self._lock:
+            self.commands = dict()
+            self.coalesced = dict()
+            self.caches = dict()
+
+    def add_hook(self, hook):
+        """Registers a callable that is called with a dictionary describing each executed command"""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """Unregisters a previously registered callable"""
+        self.hooks.remove(hook)
+
+    def command_name(self, args):
+        """Name of the bw subcommand (e.g. "list items") for the given arguments (without path of "bw")"""
+        words = list()
+        skip = False
+        for arg in args:
+            if skip:
+                skip = False
+            elif arg.startswith('-'):
+                skip = arg in self.value_options
+            else:
+                words.append(arg)
+        if not words:
+            return ''
+        if (words[0] in ['list', 'get', 'create', 'edit', 'delete', 'restore', 'move', 'confirm']) and (len(words) > 1):
+            return ' '.join(words[:2])
+        return words[0]
+
+    def record_command(self, command, wall_time, spawn_time=None, stdout_bytes=0, stderr_bytes=0, rc=0):
+        """Records the execution of a command (spawn_time is None if no process has been started)"""
+        with self._lock:
+            stats = self.commands.get(command)
+            if stats is None:
+                stats = { 'calls': 0, 'processes': 0, 'wall_seconds': 0.0, 'wall_seconds_max': 0.0, 'spawn_seconds': 0.0, 'stdout_bytes': 0, 'stderr_bytes': 0, 'returncodes': dict() }
+                self.commands[command] = stats
+            stats['calls'] += 1
+            stats['wall_seconds'] += wall_time
+            stats['wall_seconds_max'] = max(stats['wall_seconds_max'], wall_time)
+            if spawn_time is not None:
+                stats['processes'] += 1
+                stats['spawn_seconds'] += spawn_time
+            stats['stdout_bytes'] += stdout_bytes
+            stats['stderr_bytes'] += stderr_bytes
+            stats['returncodes'][rc] = stats['returncodes'].get(rc, 0) + 1
+        if self.hooks:
+            event = { 'command': command, 'wall_time': wall_time, 'spawn_time': spawn_time, 'stdout_bytes': stdout_bytes, 'stderr_bytes': stderr_bytes, 'rc': rc }
+            for hook in self.hooks:
+                hook(event)
+
+    def record_coalesced(self, command):
+        """Records an execution of a command that shared the result of an identical running one instead of starting "bw\""""
+        with self._lock:
+            self.coalesced[command] = self.coalesced.get(command, 0) + 1
+
+    def record_cache(self, accessor, hit):
+        """Records a cache hit or miss of the given accessor method"""
+        with self._lock:
+            stats = self.caches.setdefault(accessor, { 'hits': 0, 'misses': 0 })
+            stats['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        """Copy of the collected metrics"""
+        with self._lock:
+            return { 'commands': copy.deepcopy(self.commands), 'coalesced': dict(self.coalesced), 'caches': copy.deepcopy(self.caches) }
+
+    def to_json(self, indent=None):
+        """Collected metrics in JSON notation"""
+        return json.dumps(self.snapshot(), indent=indent, sort_keys=True)
+
+    @staticmethod
+    def escape_label(value):
+        """Escapes a label value for the Prometheus text format"""
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def to_prometheus(self, prefix='bwinterface'):
+        """Collected metrics in Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = list()
+        def add_metric(name, mtype, description, samples):
+            lines.append(f'# HELP {prefix}_{name} {description}')
+            lines.append(f'# TYPE {prefix}_{name} {mtype}')
+            for labels, value in samples:
+                labeltext = ','.join(f'{key}="{self.escape_label(labelvalue)}"' for key, labelvalue in labels)
+                lines.append(f'{prefix}_{name}{{{labeltext}}} {value}')
+        commands = sorted(snapshot['commands'].items())
+        add_metric('command_calls_total', 'counter', 'Number of executed bw commands', [ ([('command', name)], stats['calls']) for name, stats in commands ])
+        add_metric('command_processes_total', 'counter', 'Number of started bw processes', [ ([('command', name)], stats['processes']) for name, stats in commands ])
+        add_metric('command_seconds_total', 'counter', 'Wall time spent executing bw commands', [ ([('command', name)], stats['wall_seconds']) for name, stats in commands ])
+        add_metric('command_seconds_max', 'gauge', 'Maximum wall time of a single bw command', [ ([('command', name)], stats['wall_seconds_max']) for name, stats in commands ])
+        add_metric('command_spawn_seconds_total', 'counter', 'Time spent starting bw processes', [ ([('command', name)], stats['spawn_seconds']) for name, stats in commands ])
+        add_metric('command_stdout_bytes_total', 'counter', 'Bytes written to stdout by bw commands', [ ([('command', name)], stats['stdout_bytes']) for name, stats in commands ])
+        add_metric('command_stderr_bytes_total', 'counter', 'Bytes written to stderr by bw commands', [ ([('command', name)], stats['stderr_bytes']) for name, stats in commands ])
+        add_metric('command_returncodes_total', 'counter', 'Return codes of bw commands', [ ([('command', name), ('rc', rc)], count) for name, stats in commands for rc, count in sorted(stats['returncodes'].items()) ])
+        add_metric('command_coalesced_total', 'counter', 'Number of bw commands that shared the result of an identical running one', [ ([('command', name)], count) for name, count in sorted(snapshot['coalesced'].items()) ])
+        caches = sorted(snapshot['caches'].items())
+        add_metric('cache_hits_total', 'counter', 'Cache hits of accessor methods', [ ([('accessor', name)], stats['hits']) for name, stats in caches ])
+        add_metric('cache_misses_total', 'counter', 'Cache misses of accessor methods', [ ([('accessor', name)], stats['misses']) for name, stats in caches ])
+        return '\n'.join(lines) + '\n'
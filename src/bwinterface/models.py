@@ -0,0 +1,189 @@
+import copy
+import json
+
+"""Compact models of the objects provided by "bw" with dictionary-like access."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class RawJSON(str):
+    """JSON notation of a rarely used value that is decoded on first access"""
+    __slots__ = ()
+
+
+class Model():
+    """Base class of objects storing their JSON fields in slots (other fields in a dictionary)"""
+
+    __slots__ = ('_extra',)
+    # Names of the JSON fields stored in slots
+    json_fields = ()
+    # Fields kept as JSON notation until accessed
+    lazy_fields = ()
+    # Fields holding another model
+    nested_fields = {}
+
+    def __init__(self, data=None):
+        """Initialize instance with the provided dictionary"""
+        self._extra = None
+        if data is not None:
+            self.update(data)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Model for the provided dictionary (models are returned unchanged)"""
+        return data if isinstance(data, Model) else cls(data)
+
+    def __setitem__(self, key, value):
+        if isinstance(value, dict) and (key in self.nested_fields):
+            value = self.nested_fields[key](value)
+        elif isinstance(value, (list, dict)) and (key in self.lazy_fields):
+            value = RawJSON(json.dumps(value, separators=(',', ':')))
+        if key in self.json_fields:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = dict()
+            self._extra[key] = value
+
+    def __getitem__(self, key):
+        if key in self.json_fields:
+            try:
+                value = getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            if type(value) is RawJSON:
+                value = json.loads(value)
+                setattr(self, key, value)
+            return value
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __delitem__(self, key):
+        if key in self.json_fields:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __contains__(self, key):
+        if key in self.json_fields:
+            return hasattr(self, key)
+        return (self._extra is not None) and (key in self._extra)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Model, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, Model) else other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return type(self)(copy.deepcopy(self.to_dict(), memo))
+
+    def keys(self):
+        """List of the fields present"""
+        keys = [ key for key in self.json_fields if hasattr(self, key) ]
+        if self._extra is not None:
+            keys.extend(self._extra)
+        return keys
+
+    def values(self):
+        """List of the values of the fields present"""
+        return [ self[key] for key in self.keys() ]
+
+    def items(self):
+        """List of (field, value) tuples of the fields present"""
+        return [ (key, self[key]) for key in self.keys() ]
+
+    def get(self, key, default=None):
+        """Value of the field (default if not present)"""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        """Value of the field; the field is set to default if not present"""
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, data):
+        """Sets the fields of the provided dictionary"""
+        for key, value in data.items():
+            self[key] = value
+
+    def copy(self):
+        """Copy sharing unchanged values; nested models, lists and dictionaries are copied one level deep"""
+        other = type(self).__new__(type(self))
+        other._extra = dict(self._extra) if self._extra is not None else None
+        for key in self.json_fields:
+            try:
+                value = getattr(self, key)
+            except AttributeError:
+                continue
+            if isinstance(value, Model):
+                value = value.copy()
+            elif isinstance(value, (list, dict)):
+                # Decoded lazy fields are encoded again so that changes inside them don't affect the original
+                value = RawJSON(json.dumps(value, separators=(',', ':'))) if key in self.lazy_fields else copy.copy(value)
+            setattr(other, key, value)
+        return other
+
+    def to_dict(self):
+        """Dictionary with all fields (as provided by "bw")"""
+        return { key: (value.to_dict() if isinstance(value, Model) else value) for key, value in self.items() }
+
+
+class Login(Model):
+    """Login data of an item"""
+    json_fields = ('uris', 'username', 'password', 'totp', 'passwordRevisionDate', 'fido2Credentials')
+    lazy_fields = ('fido2Credentials',)
+    __slots__ = json_fields
+
+
+class Item(Model):
+    """Vault item"""
+    json_fields = ('object', 'id', 'organizationId', 'folderId', 'type', 'reprompt', 'name', 'notes', 'favorite', 'login', 'collectionIds',
+                   'revisionDate', 'creationDate', 'deletedDate', 'passwordHistory', 'fields', 'attachments', 'card', 'identity', 'secureNote', 'sshKey')
+    lazy_fields = ('passwordHistory', 'fields', 'attachments', 'card', 'identity', 'secureNote', 'sshKey')
+    nested_fields = { 'login': Login }
+    __slots__ = json_fields
+
+
+class Collection(Model):
+    """Collection of an organization"""
+    json_fields = ('object', 'id', 'organizationId', 'name', 'externalId')
+    __slots__ = json_fields
+
+
+class Organization(Model):
+    """Organization"""
+    json_fields = ('object', 'id', 'name', 'status', 'type', 'enabled')
+    __slots__ = json_fields
+
+
+def json_default(obj):
+    """Converts models for 'json.dumps' (use as its 'default' argument)"""
+    if isinstance(obj, Model):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
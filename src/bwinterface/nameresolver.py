@@ -0,0 +1,88 @@
+"""Resolution of organization, collection and folder names into identifiers."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class NameResolver():
+    """Name -> identifier maps of organizations, folders and the collections of every organization"""
+
+    def __init__(self):
+        """Initialize instance"""
+        # Maps of organizations and folders are derived from the lists they were built from and rebuilt if those are replaced
+        self._organizations = None
+        self._organizations_source = None
+        self._folders = None
+        self._folders_source = None
+        # Organization identifier -> dictionary of collection name -> identifier
+        self._collections = dict()
+        # Whether the collections of all organizations are known
+        self._all_collections = False
+
+    @staticmethod
+    def by_name(objects):
+        """Dictionary of name -> identifier of the provided objects (the last one wins for duplicate names)"""
+        return { item.get('name'): item.get('id') for item in objects }
+
+    def organizationid(self, name, organizations):
+        """Identifier of the organization with the given name in the provided list of organizations (None if unknown)"""
+        if organizations is not self._organizations_source:
+            self._organizations = self.by_name(organizations)
+            self._organizations_source = organizations
+        return self._organizations.get(name)
+
+    def folderid(self, name, folders):
+        """Identifier of the folder with the given name in the provided list of folders (None if unknown)"""
+        if folders is not self._folders_source:
+            self._folders = self.by_name(folders)
+            self._folders_source = folders
+        return self._folders.get(name)
+
+    def has_collections(self, organizationid=None):
+        """Checks whether the collections of the organization (of all organizations if None) are known"""
+        return self._all_collections or ((organizationid is not None) and (organizationid in self._collections))
+
+    def set_collections(self, collections, organizationid=None):
+        """Sets the collections of the organization (of all organizations if None)"""
+        if organizationid is not None:
+            self._collections[organizationid] = self.by_name(collections)
+            return
+        self._collections = dict()
+        for collection in collections:
+            self._collections.setdefault(collection.get('organizationId'), dict())[collection.get('name')] = collection.get('id')
+        self._all_collections = True
+
+    def collectionid(self, name, organizationid=None):
+        """Identifier of the collection with the given name in the organization (in any organization if None); None if unknown"""
+        if organizationid is not None:
+            return self._collections.get(organizationid, dict()).get(name)
+        result = None
+        for names in self._collections.values():
+            result = names.get(name, result)
+        return result
+
+    def add_collection(self, data):
+        """Adds the new or renamed collection if the collections of its organization are known"""
+        organizationid = data.get('organizationId')
+        if not self.has_collections(organizationid):
+            return
+        self.remove_collection(data.get('id'))
+        self._collections.setdefault(organizationid, dict())[data.get('name')] = data.get('id')
+
+    def remove_collection(self, collectionid):
+        """Removes the (deleted) collection"""
+        for names in self._collections.values():
+            for name in [ name for name, objectid in names.items() if objectid == collectionid ]:
+                del names[name]
+
+    def clear_collections(self):
+        """Forgets all collections"""
+        self._collections = dict()
+        self._all_collections = False
+
+    def clear(self):
+        """Forgets all names"""
+        self._organizations = self._organizations_source = None
+        self._folders = self._folders_source = None
+        self.clear_collections()
@@ -0,0 +1,88 @@
+import secrets
+
+"""Generation of passwords and passphrases like "bw generate" does, without executing "bw"."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class PasswordGenerator():
+    """Generates passwords (and passphrases if a word list is provided) using the rules and defaults of "bw generate\""""
+
+    uppercase_chars = 'ABCDEFGHJKLMNPQRSTUVWXYZ'
+    lowercase_chars = 'abcdefghijkmnopqrstuvwxyz'
+    number_chars = '23456789'
+    special_chars = '!@#$%^&*'
+    # Characters that are only used unless avoiding ambiguous characters is requested
+    ambiguous_chars = { 'uppercase': 'IO', 'lowercase': 'l', 'number': '01' }
+
+    def __init__(self, wordlist=None):
+        """Initialize instance (wordlist: file with one word per line for passphrases, e.g. the EFF long word list; a leading dice number is ignored)"""
+        self.wordlist = wordlist
+        self._words = None
+
+    @property
+    def words(self):
+        """List of the words for passphrases (None if no word list is configured)"""
+        if (self._words is None) and (self.wordlist is not None):
+            with open(self.wordlist, 'r', encoding='utf-8') as f:
+                words = [ line.split()[-1] for line in f if line.strip() ]
+            if not words:
+                raise ValueError(f'Word list [{self.wordlist}] is empty')
+            self._words = words
+        return self._words
+
+    def charsets(self, avoid_ambiguous=False):
+        """Dictionary of character class -> characters"""
+        charsets = { 'uppercase': self.uppercase_chars, 'lowercase': self.lowercase_chars, 'number': self.number_chars, 'special': self.special_chars }
+        if not avoid_ambiguous:
+            for name, chars in self.ambiguous_chars.items():
+                charsets[name] += chars
+        return charsets
+
+    def password(self, uppercase=None, lowercase=None, number=None, special=None, length=None, min_number=None, min_special=None, avoid_ambiguous=None):
+        """New password; uppercase, lowercase and number are used if no character class is selected"""
+        if not (uppercase or lowercase or number or special):
+            uppercase = lowercase = number = True
+        charsets = self.charsets(avoid_ambiguous=avoid_ambiguous)
+        # Each selected class occurs at least once (numbers and special characters at least the requested number of times)
+        minimums = {
+            'uppercase': 1 if uppercase else 0,
+            'lowercase': 1 if lowercase else 0,
+            'number': max(min_number if min_number is not None else 1, 1) if number else 0,
+            'special': max(min_special if min_special is not None else 1, 1) if special else 0,
+        }
+        length = max(length if length is not None else 14, sum(minimums.values()), 5)
+        allchars = ''.join(charsets[name] for name, minimum in minimums.items() if minimum)
+        positions = [ charsets[name] for name, minimum in minimums.items() for i in range(minimum) ]
+        positions.extend([ allchars ] * (length - len(positions)))
+        secrets.SystemRandom().shuffle(positions)
+        return ''.join(secrets.choice(chars) for chars in positions)
+
+    def passphrase(self, words=None, separator=None, capitalize=None, include_number=None):
+        """New passphrase of randomly chosen words"""
+        wordlist = self.words
+        if wordlist is None:
+            raise ValueError('No word list configured for generating passphrases')
+        count = min(max(words if words is not None else 3, 3), 20)
+        separator = '-' if separator is None else separator
+        chosen = [ secrets.choice(wordlist) for i in range(count) ]
+        if capitalize:
+            chosen = [ word[:1].upper() + word[1:] for word in chosen ]
+        if include_number:
+            pos = secrets.randbelow(count)
+            chosen[pos] += str(secrets.randbelow(10))
+        return separator.join(chosen)
+
+    def can_generate(self, passphrase=None, words=None):
+        """Whether values for the options of "bw generate" can be generated (passphrases need a word list)"""
+        if (passphrase == True) or ((words is not None) and (passphrase is None)):
+            return self.wordlist is not None
+        return True
+
+    def generate(self, uppercase=None, lowercase=None, number=None, special=None, passphrase=None, length=None, words=None, min_number=None, min_special=None, separator=None, capitalize=None, include_number=None, avoid_ambiguous=None):
+        """New password/passphrase for the options of "bw generate\""""
+        if (passphrase == True) or ((words is not None) and (passphrase is None)):
+            return self.passphrase(words=words, separator=separator, capitalize=capitalize, include_number=include_number)
+        return self.password(uppercase=uppercase, lowercase=lowercase, number=number, special=special, length=length, min_number=min_number, min_special=min_special, avoid_ambiguous=avoid_ambiguous)
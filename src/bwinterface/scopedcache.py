@@ -0,0 +1,92 @@
+from collections import OrderedDict
+import threading
+import time
+
+"""Cache holding entries for several scopes with LRU eviction and optional expiry."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class ScopedCache():
+    """Keyed cache with size limit (least recently used entries are evicted), time to live and hit/miss counters; thread-safe"""
+
+    def __init__(self, maxsize=16, ttl=None):
+        """Initialize instance (maxsize None: unlimited; ttl in seconds, None: entries don't expire)"""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.peek(key) is not None
+
+    def is_expired(self, timestamp):
+        """Checks whether an entry stored at the given time is expired"""
+        return (self.ttl is not None) and (time.monotonic() - timestamp > self.ttl)
+
+    def peek(self, key):
+        """Returns the entry for the given key (None if missing/expired) without affecting counters and LRU order"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.is_expired(entry[0]):
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def get(self, key):
+        """Returns the entry for the given key (None if missing/expired)"""
+        with self._lock:
+            value = self.peek(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Stores an entry for the given key and evicts the least recently used entries if needed"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while (self.maxsize is not None) and (len(self._entries) > self.maxsize):
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        """Removes the entry for the given key; returns it (None if missing)"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry is not None else None
+
+    def clear(self):
+        """Removes all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def items(self):
+        """List of (key, entry) tuples of all entries not expired"""
+        with self._lock:
+            return [ (key, value) for key, value in ((key, self.peek(key)) for key in list(self._entries)) if value is not None ]
+
+    def stats(self):
+        """Dictionary of counters"""
+        with self._lock:
+            return { 'size': len(self._entries), 'maxsize': self.maxsize, 'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions }
+
+    def reset_stats(self):
+        """Resets the counters"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
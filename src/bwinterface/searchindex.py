@@ -0,0 +1,173 @@
+import bisect
+import heapq
+import re
+
+"""Inverted index for full-text search over items without executing "bw"."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class SearchIndex():
+    """Indexes the words of item names, usernames, URIs and notes; supports exact, prefix and substring matching with ranking"""
+
+    fields = ['name', 'username', 'uris', 'notes']
+    # Relevance of a match per field and per kind of match
+    field_weights = { 'name': 8, 'username': 4, 'uris': 2, 'notes': 1 }
+    match_weights = { 'exact': 3, 'prefix': 2, 'substring': 1 }
+    word_pattern = re.compile(r'\w+')
+
+    def __init__(self, items=None):
+        """Initialize instance"""
+        self.by_id = dict()
+        # Word -> dictionary of item identifier -> bit mask of the fields containing the word
+        self.postings = dict()
+        # All words in sorted order for prefix lookups
+        self.words = list()
+        # All words separated by newlines for substring lookups (built on first use)
+        self.joined_words = None
+        self.field_bits = { field: 1 << i for i, field in enumerate(self.fields) }
+        if items is not None:
+            self.update(items)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    @classmethod
+    def tokenize(cls, text):
+        """List of the lower-case words of a text"""
+        return cls.word_pattern.findall(text.casefold()) if text else []
+
+    def extract_texts(self, item):
+        """Dictionary of the searchable text of an item per field"""
+        login = item.get('login') or dict()
+        return {
+            'name': item.get('name') or '',
+            'username': login.get('username') or '',
+            'uris': ' '.join(uri.get('uri') or '' for uri in (login.get('uris') or [])),
+            'notes': item.get('notes') or '',
+        }
+
+    def extract_words(self, item):
+        """Dictionary of word -> bit mask of the fields of the item containing it"""
+        words = dict()
+        for field, text in self.extract_texts(item).items():
+            bit = self.field_bits[field]
+            for word in self.tokenize(text):
+                words[word] = words.get(word, 0) | bit
+        return words
+
+    def add(self, item, sort=True):
+        """Adds the new or updated item to the index (sort=False defers sorting the word list to the caller)"""
+        itemid = item.get('id')
+        if itemid in self.by_id:
+            self.remove(itemid)
+        self.by_id[itemid] = item
+        for word, mask in self.extract_words(item).items():
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = dict()
+                if sort:
+                    bisect.insort(self.words, word)
+                self.joined_words = None
+            posting[itemid] = mask
+
+    def update(self, items):
+        """Adds the provided items to the index"""
+        for item in items:
+            self.add(item, sort=False)
+        # Sorting once is much faster than inserting each new word at its position
+        self.words = sorted(self.postings)
+
+    def remove(self, itemid):
+        """Removes the item with the given identifier from the index; returns the removed item (None if unknown)"""
+        item = self.by_id.pop(itemid, None)
+        if item is None:
+            return None
+        for word in self.extract_words(item):
+            posting = self.postings.get(word)
+            if posting is None:
+                continue
+            posting.pop(itemid, None)
+            if not posting:
+                del self.postings[word]
+                pos = bisect.bisect_left(self.words, word)
+                if (pos < len(self.words)) and (self.words[pos] == word):
+                    del self.words[pos]
+                self.joined_words = None
+        return item
+
+    def clear(self):
+        """Removes all items"""
+        self.by_id.clear()
+        self.postings.clear()
+        self.words.clear()
+        self.joined_words = None
+
+    def match_words(self, term, substring=True):
+        """Dictionary of the indexed words matching the term -> kind of match ('exact', 'prefix', 'substring')"""
+        matches = dict()
+        pos = bisect.bisect_left(self.words, term)
+        while (pos < len(self.words)) and self.words[pos].startswith(term):
+            word = self.words[pos]
+            matches[word] = 'exact' if word == term else 'prefix'
+            pos += 1
+        if substring:
+            if self.joined_words is None:
+                self.joined_words = '\n'.join(self.words)
+            # Scanning a single string is much faster than checking each word
+            joined = self.joined_words
+            pos = joined.find(term)
+            while pos >= 0:
+                start = joined.rfind('\n', 0, pos) + 1
+                end = joined.find('\n', pos)
+                if end < 0:
+                    end = len(joined)
+                word = joined[start:end]
+                if word not in matches:
+                    matches[word] = 'substring'
+                pos = joined.find(term, end)
+        return matches
+
+    def search(self, query, fields=None, limit=None, substring=True):
+        """List of items containing all words of the query (as word, word prefix or substring), the most relevant first"""
+        terms = self.tokenize(query)
+        if not terms:
+            return []
+        fields = self.fields if fields is None else fields
+        # Weight of the most relevant selected field per bit mask
+        weights = [ max([ self.field_weights[field] for field in fields if mask & self.field_bits[field] ], default=0) for mask in range(1 << len(self.fields)) ]
+        # Terms with the fewest matching items first so that the others only need to be checked for the remaining candidates
+        matches = [ self.match_words(term, substring=substring) for term in dict.fromkeys(terms) ]
+        matches.sort(key=lambda words: sum(len(self.postings[word]) for word in words))
+        scores = None
+        for words in matches:
+            termscores = dict()
+            for word, kind in words.items():
+                factor = self.match_weights[kind]
+                posting = self.postings[word]
+                if (scores is not None) and (len(scores) < len(posting)):
+                    candidates = ((itemid, posting[itemid]) for itemid in scores if itemid in posting)
+                else:
+                    candidates = posting.items()
+                for itemid, mask in candidates:
+                    score = factor * weights[mask]
+                    if score > termscores.get(itemid, 0):
+                        termscores[itemid] = score
+            if scores is None:
+                scores = termscores
+            else:
+                scores = { itemid: score + termscores[itemid] for itemid, score in scores.items() if itemid in termscores }
+            if not scores:
+                return []
+        # Items whose name equals the query come first
+        query = query.casefold().strip()
+        def rank(entry):
+            name = self.by_id[entry[0]].get('name') or ''
+            return (name.casefold() != query, -entry[1], name)
+        if limit is None:
+            ranked = sorted(scores.items(), key=rank)
+        else:
+            ranked = heapq.nsmallest(limit, scores.items(), key=rank)
+        return [ self.by_id[itemid] for itemid, score in ranked ]
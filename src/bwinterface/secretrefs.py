@@ -0,0 +1,58 @@
+from collections import namedtuple
+import re
+import urllib.parse
+
+from .totp import TOTP
+
+"""References to secrets in the form "bw://<organization>/<collection>/<item>#<field>" as used in configuration templates."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+# Names containing other characters (e.g. spaces) need to be percent-encoded
+reference_pattern = re.compile(r"bw://[A-Za-z0-9\-._~%!$&*+=:@/]+(?:#[A-Za-z0-9\-._~%!$&*+=:@]*)?")
+secretreference = namedtuple('secretreference', ['organization', 'collection', 'item', 'field'])
+
+
+def parse_reference(reference):
+    """Splits a reference ("bw://[<organization>/[<collection>/]]<item>[#<field>]") into its parts; raises ValueError if malformed"""
+    if not reference.startswith('bw://'):
+        raise ValueError(f'Secret reference [{reference}] does not start with "bw://"')
+    path, _, field = reference[len('bw://'):].partition('#')
+    segments = [ urllib.parse.unquote(segment) for segment in path.split('/') ]
+    if (len(segments) > 3) or not all(segments):
+        raise ValueError(f'Malformed secret reference [{reference}]')
+    organization = segments[0] if len(segments) > 1 else None
+    collection = segments[1] if len(segments) > 2 else None
+    # The password is provided if no field is given
+    return secretreference(organization, collection, segments[-1], urllib.parse.unquote(field) or 'password')
+
+
+def find_references(text):
+    """List of the references contained in the text (in order of appearance, duplicates included)"""
+    return reference_pattern.findall(text)
+
+
+def item_value(item, field):
+    """Value of the field of the item (None if not present or, for "totp", not a valid secret)"""
+    login = item.get('login') or dict()
+    if field in ['password', 'username']:
+        return login.get(field)
+    if field == 'totp':
+        if not login.get('totp'):
+            return None
+        try:
+            return TOTP.from_string(login['totp']).code()
+        except ValueError:
+            return None
+    if field == 'uri':
+        uris = login.get('uris') or []
+        return uris[0].get('uri') if uris else None
+    if field in ['notes', 'name', 'id']:
+        return item.get(field)
+    for customfield in item.get('fields') or []:
+        if customfield.get('name') == field:
+            return customfield.get('value')
+    return None
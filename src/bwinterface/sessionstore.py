@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+
+"""Persistent storage of the "bw" session so that it can be reused by later processes."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class SessionStore():
+    """Stores the session and its last known status in a file readable for the owner only"""
+
+    def __init__(self, path):
+        """Initialize instance"""
+        self.path = os.path.expanduser(path)
+
+    def save(self, data):
+        """Writes the provided JSON-serializable dictionary atomically to disk"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # mkstemp creates the file readable for the owner only
+        fd, tmpname = tempfile.mkstemp(dir=directory, prefix='.bwsession')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmpname, self.path)
+        except BaseException:
+            os.remove(tmpname)
+            raise
+
+    def load(self):
+        """Reads the stored dictionary; returns None if there is none (or it is not usable)"""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+
+    def delete(self):
+        """Removes the stored session"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,99 @@
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import zlib
+
+from .models import json_default
+
+"""Encrypted on-disk storage of cache snapshots so that they survive process restarts."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class SnapshotStore():
+    """Stores a snapshot in a file encrypted with keys derived from the "bw" session
+
+    Construction (standard library only, encrypt-then-MAC): a random 16-byte salt is chosen per write; BLAKE2b keyed
+    derivation of the session with the salt and distinct personalization strings gives an encryption and a MAC key.
+    The compressed state is XORed with a SHAKE-256 keystream of the encryption key (unique per salt) and magic, salt
+    and ciphertext are authenticated using keyed BLAKE2b (256 bits), checked in constant time before decrypting.
+
+    Threat model: protects the cached vault data against parties able to read or modify the file but not knowing the
+    session (e.g. backups, other users given access to the file); modified, truncated or foreign files are rejected
+    and treated as missing snapshot. It does not protect against anyone knowing the session (who can unlock the vault
+    via "bw" anyway), against replacing the file by an older snapshot written with the same session (detected only
+    through the time of the last sync) nor against side channels of the Python implementation.
+    """
+
+    # File layout: magic, salt, ciphertext, MAC
+    magic = b'BWISNAP1'
+    salt_size = 16
+    mac_size = 32
+
+    def __init__(self, path):
+        """Initialize instance"""
+        self.path = os.path.expanduser(path)
+
+    def derive_keys(self, session, salt):
+        """Derives encryption key and MAC key from the session"""
+        session = session.encode('utf-8')
+        enc_key = hashlib.blake2b(session, digest_size=32, salt=salt, person=b'bwi-snapshot-enc').digest()
+        mac_key = hashlib.blake2b(session, digest_size=32, salt=salt, person=b'bwi-snapshot-mac').digest()
+        return enc_key, mac_key
+
+    def crypt(self, key, data):
+        """Encrypts/decrypts the data by XORing it with a SHAKE-256 keystream"""
+        keystream = hashlib.shake_256(key).digest(len(data))
+        return (int.from_bytes(data, 'big') ^ int.from_bytes(keystream, 'big')).to_bytes(len(data), 'big')
+
+    def mac(self, key, data):
+        """Computes the message authentication code of the data"""
+        return hashlib.blake2b(data, digest_size=self.mac_size, key=key).digest()
+
+    def save(self, session, state):
+        """Encrypts the provided JSON-serializable state and writes it atomically to disk"""
+        salt = os.urandom(self.salt_size)
+        enc_key, mac_key = self.derive_keys(session, salt)
+        data = zlib.compress(json.dumps(state, separators=(',', ':'), default=json_default).encode('utf-8'), 1)
+        data = self.magic + salt + self.crypt(enc_key, data)
+        data += self.mac(mac_key, data)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # mkstemp creates the file readable for the owner only
+        fd, tmpname = tempfile.mkstemp(dir=directory, prefix='.bwsnapshot')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmpname, self.path)
+        except BaseException:
+            os.remove(tmpname)
+            raise
+
+    def load(self, session):
+        """Reads and decrypts the state; returns None if there is no usable snapshot (e.g. different session)"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        header_size = len(self.magic) + self.salt_size
+        if (len(data) < header_size + self.mac_size) or not data.startswith(self.magic):
+            return None
+        salt = data[len(self.magic):header_size]
+        enc_key, mac_key = self.derive_keys(session, salt)
+        data, mac = data[:-self.mac_size], data[-self.mac_size:]
+        if not hmac.compare_digest(self.mac(mac_key, data), mac):
+            return None
+        data = self.crypt(enc_key, data[header_size:])
+        return json.loads(zlib.decompress(data).decode('utf-8'))
+
+    def delete(self):
+        """Removes the snapshot from disk"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,87 @@
+import base64
+import hashlib
+import hmac
+import struct
+import time
+import urllib.parse
+
+"""Generation of time-based one-time passwords (TOTP) without executing "bw"."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class TOTP():
+    """Generator of TOTP codes (RFC 6238) for a secret as stored in the "login.totp" field of items"""
+
+    algorithms = { 'SHA1': hashlib.sha1, 'SHA256': hashlib.sha256, 'SHA512': hashlib.sha512 }
+    steam_alphabet = '23456789BCDFGHJKMNPQRTVWXY'
+
+    def __init__(self, key, digits=6, period=30, algorithm='SHA1', steam=False):
+        """Initialize instance (key: the decoded secret as bytes)"""
+        algorithm = algorithm.upper()
+        if algorithm not in self.algorithms:
+            raise ValueError(f'Unsupported TOTP algorithm [{algorithm}]')
+        if not (1 <= digits <= 10):
+            raise ValueError(f'Unsupported number of TOTP digits [{digits}]')
+        if period <= 0:
+            raise ValueError(f'Invalid TOTP period [{period}]')
+        self.key = key
+        self.digits = 5 if steam else digits
+        self.period = period
+        self.algorithm = algorithm
+        self.steam = steam
+
+    @staticmethod
+    def decode_secret(secret):
+        """Bytes of a base32-encoded secret (case, spaces and missing padding are tolerated)"""
+        secret = secret.replace(' ', '').replace('-', '').upper().rstrip('=')
+        try:
+            return base64.b32decode(secret + '=' * (-len(secret) % 8))
+        except ValueError:
+            raise ValueError('TOTP secret is not base32-encoded') from None
+
+    @classmethod
+    def from_string(cls, totp):
+        """Generator for the provided secret; plain base32 secrets, "otpauth://totp/..." URIs and "steam://..." secrets are supported"""
+        totp = totp.strip()
+        if totp.lower().startswith('steam://'):
+            return cls(cls.decode_secret(totp[len('steam://'):]), steam=True)
+        if totp.lower().startswith('otpauth://'):
+            uri = urllib.parse.urlsplit(totp)
+            if uri.netloc.lower() != 'totp':
+                raise ValueError(f'Unsupported OTP type [{uri.netloc}]')
+            params = { key.lower(): value for key, value in urllib.parse.parse_qsl(uri.query) }
+            if not params.get('secret'):
+                raise ValueError('TOTP URI without secret')
+            try:
+                digits = int(params.get('digits', 6))
+                period = int(params.get('period', 30))
+            except ValueError:
+                raise ValueError('Invalid TOTP parameters') from None
+            steam = params.get('encoder', '').lower() == 'steam'
+            return cls(cls.decode_secret(params['secret']), digits=digits, period=period, algorithm=params.get('algorithm', 'SHA1'), steam=steam)
+        return cls(cls.decode_secret(totp))
+
+    def counter(self, timestamp=None):
+        """Number of the time step the timestamp (default: now) falls into"""
+        return int((time.time() if timestamp is None else timestamp) // self.period)
+
+    def remaining(self, timestamp=None):
+        """Seconds until the code for the timestamp (default: now) expires"""
+        timestamp = time.time() if timestamp is None else timestamp
+        return self.period - int(timestamp % self.period)
+
+    def code(self, timestamp=None):
+        """Code valid at the timestamp (default: now)"""
+        digest = hmac.new(self.key, struct.pack('>Q', self.counter(timestamp)), self.algorithms[self.algorithm]).digest()
+        offset = digest[-1] & 0x0f
+        value = struct.unpack('>I', digest[offset:offset + 4])[0] & 0x7fffffff
+        if self.steam:
+            chars = list()
+            for i in range(self.digits):
+                value, index = divmod(value, len(self.steam_alphabet))
+                chars.append(self.steam_alphabet[index])
+            return ''.join(chars)
+        return str(value % 10 ** self.digits).zfill(self.digits)
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+import unittest
+
+from bwinterface import AsyncBWInterface, BWInterface, SnapshotStore
+
+from test_bwinterface import COLLECTION, FOLDER, ORGANIZATION, FakeBWTestCase, fakebw
+
+"""Tests of AsyncBWInterface."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class AsyncFakeBWTestCase(FakeBWTestCase):
+    """Runs AsyncBWInterface against the stand-in for the "bw" CLI"""
+
+    def create_interface(self, **kwargs):
+        """AsyncBWInterface using the stand-in"""
+        return AsyncBWInterface(bw_cli=BWInterface.command_line([sys.executable, fakebw]), print_bwcommands=False, **kwargs)
+
+    def run_async(self, awaitable):
+        """Result of the awaitable run in a new event loop"""
+        async def run():
+            return await awaitable
+        return asyncio.run(run())
+
+
+class PropertiesTest(AsyncFakeBWTestCase):
+
+    def test_organizations(self):
+        self.assertEqual([ organization['id'] for organization in self.run_async(self.bw.organizations) ], [ORGANIZATION])
+        self.assertEqual(list(self.run_async(self.bw.organizations_asdictbyname)), ['Org'])
+
+    def test_folders(self):
+        self.assertEqual(list(self.run_async(self.bw.folders_asdictbyid)), [FOLDER])
+
+    def test_name_resolution(self):
+        items = self.run_async(self.bw.get_items_asdictbyid(organization='Org', collection='Collection'))
+        self.assertEqual(sorted(item['name'] for item in items.values()), ['Beta', 'Gamma'])
+        self.assertEqual(self.run_async(self.bw.get_collectionid('Collection', organization='Org')), COLLECTION)
+
+
+class SnapshotTest(AsyncFakeBWTestCase):
+
+    def test_snapshot_store(self):
+        store = SnapshotStore(os.path.join(self.vault_dir, 'snapshot'))
+        bw = FakeBWTestCase.create_interface(self, snapshot_store=store)
+        bw.session = 'session'
+        bw.get_items_asdictbyid()
+        self.assertTrue(bw.save_snapshot())
+        bw = self.create_interface(snapshot_store=store)
+        self.assertIs(bw.snapshot_store, store)
+        # The snapshot is not loaded on instantiation but needs to be awaited
+        self.assertEqual(bw.get_cache_state()['items'], [])
+        bw.session = 'session'
+        self.assertTrue(self.run_async(bw.load_snapshot()))
+        self.assertEqual(len(bw.get_cache_state()['items']), 1)
+
+
+class ReconcileTest(AsyncFakeBWTestCase):
+
+    def test_max_workers(self):
+        desired = [ { 'name': 'Beta', 'username': 'bob' }, { 'name': 'Delta', 'username': 'dave' } ]
+        plan = self.run_async(self.bw.reconcile(desired, organization='Org', collection='Collection', prune=True, bulk=False, max_workers=1))
+        self.assertEqual([ entry['name'] for entry in plan['create'] ], ['Delta'])
+        self.assertEqual([ entry['name'] for entry in plan['delete'] ], ['Gamma'])
+        self.assertTrue(all(entry['result'].rc == 0 for entry in plan['create'] + plan['delete']))
+
+    def test_execute_many(self):
+        results = self.run_async(self.bw.execute_many(['list folders', 'list organizations'], max_workers=1))
+        self.assertEqual([ result.data[0]['id'] for result in results ], [FOLDER, ORGANIZATION])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+from bwinterface import BWInterface
+
+"""Tests of BWInterface."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+fakebw = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'fakebw.py')
+
+ORGANIZATION = '00000000-0000-4000-8000-000000000001'
+COLLECTION = '00000000-0000-4000-8000-000000000002'
+FOLDER = '00000000-0000-4000-8000-000000000003'
+
+
+def make_item(itemid, name, organizationid=None, collectionids=None, folderid=None, username=None, notes=None, revision='2024-01-01T00:00:00.000Z'):
+    """Item as listed by "bw" """
+    return { 'object': 'item', 'id': itemid, 'organizationId': organizationid, 'collectionIds': collectionids or [], 'folderId': folderid, 'type': 1, 'name': name, 'notes': notes, 'favorite': False, 'revisionDate': revision, 'login': { 'username': username, 'password': 'secret', 'totp': None, 'uris': [] } }
+
+
+class FakeBWTestCase(unittest.TestCase):
+    """Runs BWInterface against the stand-in for the "bw" CLI of the benchmarks serving a small vault"""
+
+    items = [
+        make_item('00000000-0000-4000-8000-000000000011', 'Alpha', username='alice', notes='Notes of Alpha'),
+        make_item('00000000-0000-4000-8000-000000000012', 'Beta', organizationid=ORGANIZATION, collectionids=[COLLECTION], username='bob'),
+        make_item('00000000-0000-4000-8000-000000000013', 'Gamma', organizationid=ORGANIZATION, collectionids=[COLLECTION], folderid=FOLDER, username='carol'),
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.vault_dir = directory.name
+        self.write_vault('organizations', [ { 'object': 'organization', 'id': ORGANIZATION, 'name': 'Org' } ])
+        self.write_vault('collections', [ { 'object': 'collection', 'id': COLLECTION, 'organizationId': ORGANIZATION, 'name': 'Collection', 'externalId': None } ])
+        self.write_vault('folders', [ { 'object': 'folder', 'id': FOLDER, 'name': 'Folder' } ])
+        self.write_vault('items', self.items)
+        environ = unittest.mock.patch.dict(os.environ, { 'BWI_FAKEBW_VAULT': self.vault_dir })
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.bw = self.create_interface()
+
+    def create_interface(self, **kwargs):
+        """BWInterface using the stand-in"""
+        return BWInterface(bw_cli=BWInterface.command_line([sys.executable, fakebw]), print_bwcommands=False, **kwargs)
+
+    def write_vault(self, name, data):
+        """Writes a part of the vault served by the stand-in"""
+        with open(os.path.join(self.vault_dir, name + '.json'), 'w') as f:
+            json.dump(data, f)
+
+
+class GetItemTest(FakeBWTestCase):
+
+    def test_identifier(self):
+        result = self.bw.get_item(self.items[0]['id'])
+        self.assertEqual((result.rc, result.data.get('name')), (0, 'Alpha'))
+
+    def test_search_term(self):
+        self.assertEqual(self.bw.get_item('Beta').data.get('id'), self.items[1]['id'])
+
+    def test_quoted_search_term(self):
+        # Search terms were given in double quotes when commands were built as strings
+        self.assertEqual(self.bw.get_item('"Beta"').data.get('id'), self.items[1]['id'])
+        self.assertEqual(self.bw.get_item_notes('"Alpha"').out, 'Notes of Alpha')
+
+    def test_not_found(self):
+        result = self.bw.get_item('"Delta"')
+        self.assertEqual((result.rc, result.err), (1, 'Not found.'))
+
+
+class GenerateCommandTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bw = BWInterface(bw_cli='bw', print_bwcommands=False)
+
+    def test_password(self):
+        self.assertEqual(self.bw.generate_command(uppercase=True, number=True, length=20), ['generate', '--uppercase', '--number', '--length', '20'])
+
+    def test_passphrase(self):
+        self.assertEqual(self.bw.generate_command(words=3, separator='-', capitalize=True), ['generate', '--passphrase', '--words', '3', '--separator', '-', '--capitalize'])
+
+    def test_separator_quotes(self):
+        self.assertEqual(self.bw.generate_command(words=3, separator='"'), ['generate', '--passphrase', '--words', '3', '--separator', '"'])
+        self.assertEqual(self.bw.generate_command(separator="'"), ['generate', '--separator', "'"])
+
+    def test_separator_names(self):
+        self.assertEqual(self.bw.generate_command(separator=''), ['generate', '--separator', 'empty'])
+        self.assertEqual(self.bw.generate_command(separator=' '), ['generate', '--separator', 'space'])
+
+
+if __name__ == '__main__':
+    unittest.main()
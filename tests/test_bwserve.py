@@ -0,0 +1,136 @@
+import http.server
+import json
+import threading
+import unittest
+import unittest.mock
+import urllib.parse
+
+from bwinterface import BWInterface, BWServeTransport
+
+"""Tests of the translation of "bw" commands into requests of the REST API of "bw serve" using a stub server."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+ITEM = { 'object': 'item', 'id': '11111111-2222-3333-4444-555555555555', 'name': 'Item', 'login': { 'username': 'user', 'password': 'secret' } }
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """Answers like "bw serve" does and records the requests"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status, content):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        url = urllib.parse.urlsplit(self.path)
+        self.server.requests.append((method, url.path, dict(urllib.parse.parse_qsl(url.query)), body))
+        if url.path == '/status':
+            self.respond(200, { 'success': True, 'data': { 'object': 'template', 'template': { 'status': 'unlocked' } } })
+        elif url.path == '/list/object/items':
+            self.respond(200, { 'success': True, 'data': { 'object': 'list', 'data': [ ITEM ] } })
+        elif (method == 'GET') and (url.path == '/object/item/' + ITEM['id']):
+            self.respond(200, { 'success': True, 'data': ITEM })
+        elif (method == 'PUT') and (url.path == '/object/item/' + ITEM['id']):
+            self.respond(200, { 'success': True, 'data': body })
+        elif url.path == '/generate':
+            self.respond(200, { 'success': True, 'data': { 'object': 'string', 'data': 'generated' } })
+        elif url.path == '/sync':
+            self.respond(200, { 'success': True, 'data': { 'object': 'message', 'title': 'Syncing complete.' } })
+        else:
+            self.respond(404, { 'success': False, 'message': 'Not found.' })
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+
+class BWServeTransportTest(unittest.TestCase):
+
+    bw_cli = 'node /opt/bitwarden/bw.js'
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.requests = list()
+        threading.Thread(target=self.server.serve_forever, kwargs={ 'poll_interval': 0.01 }, daemon=True).start()
+        self.transport = BWServeTransport(bw_cli=self.bw_cli, hostname='127.0.0.1', port=self.server.server_address[1], launch=False)
+
+    def tearDown(self):
+        self.transport.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def run_command(self, args, datadict=None):
+        return self.transport.run(self.bw_cli.split() + args, datadict=datadict)
+
+    def last_request(self):
+        return self.server.requests[-1]
+
+    def test_list(self):
+        rc, out, err = self.run_command(['list', 'items', '--organizationid', 'org', '--raw'])
+        self.assertEqual(rc, 0)
+        self.assertEqual(json.loads(out), [ ITEM ])
+        self.assertEqual(self.last_request(), ('GET', '/list/object/items', { 'organizationId': 'org' }, None))
+
+    def test_get(self):
+        rc, out, err = self.run_command(['get', 'item', ITEM['id']])
+        self.assertEqual((rc, json.loads(out)), (0, ITEM))
+        self.assertEqual(self.last_request()[:2], ('GET', '/object/item/' + ITEM['id']))
+
+    def test_edit(self):
+        data = dict(ITEM, name='Renamed')
+        rc, out, err = self.run_command(['edit', 'item', ITEM['id']], datadict=data)
+        self.assertEqual((rc, json.loads(out)), (0, data))
+        self.assertEqual(self.last_request(), ('PUT', '/object/item/' + ITEM['id'], {}, data))
+
+    def test_generate(self):
+        rc, out, err = self.run_command(['generate', '--length', '20', '--special'])
+        self.assertEqual((rc, out), (0, 'generated'))
+        self.assertEqual(self.last_request(), ('GET', '/generate', { 'length': '20', 'special': 'true' }, None))
+
+    def test_sync(self):
+        self.assertEqual(self.run_command(['sync']), (0, 'Syncing complete.', ''))
+        self.assertEqual(self.last_request()[:2], ('POST', '/sync'))
+
+    def test_not_found(self):
+        self.assertEqual(self.run_command(['get', 'item', 'unknown']), (1, '', 'Not found.'))
+
+    def test_unsupported(self):
+        self.assertIsNone(self.run_command(['login', '--apikey']))
+        self.assertEqual(self.server.requests, [])
+
+    def test_bwinterface(self):
+        bw = BWInterface(bw_cli=self.bw_cli, print_bwcommands=False, transport=self.transport)
+        self.assertEqual(bw.get_items_asdictbyid(), { ITEM['id']: ITEM })
+        result = bw.get_item('unknown')
+        self.assertEqual((result.rc, result.err), (1, 'Not found.'))
+
+    def test_launch(self):
+        transport = BWServeTransport(bw_cli=self.bw_cli, hostname='127.0.0.1', port=self.server.server_address[1])
+        with unittest.mock.patch('subprocess.Popen') as popen:
+            popen.return_value.poll.return_value = None
+            transport.start()
+            transport.stop()
+        self.assertEqual(popen.call_args[0][0], [ 'node', '/opt/bitwarden/bw.js', 'serve', '--hostname', '127.0.0.1', '--port', str(self.server.server_address[1]) ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import socket
+import stat
+import threading
+import unittest
+import unittest.mock
+
+from bwinterface import BWDaemon, DaemonClient
+
+from test_bwinterface import FakeBWTestCase
+
+"""Tests of BWDaemon and DaemonClient."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class DaemonTest(FakeBWTestCase):
+    """Runs a daemon serving a BWInterface instance using the stand-in for the "bw" CLI"""
+
+    def setUp(self):
+        super().setUp()
+        self.socket_path = os.path.join(self.vault_dir, 'run', 'daemon.sock')
+        self.daemon = BWDaemon(self.bw, socket_path=self.socket_path)
+        self.daemon.bind()
+        thread = threading.Thread(target=self.daemon.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.daemon.shutdown)
+        self.client = DaemonClient(socket_path=self.socket_path, timeout=10)
+        self.addCleanup(self.client.close)
+
+    def test_permissions(self):
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.dirname(self.socket_path)).st_mode), 0o700)
+        mode = os.stat(self.socket_path).st_mode
+        self.assertTrue(stat.S_ISSOCK(mode))
+        self.assertEqual(stat.S_IMODE(mode), 0o600)
+
+    def test_call(self):
+        self.assertEqual(sorted(self.client.get_items_asdictbyname(organization='Org')), ['Beta', 'Gamma'])
+        result = self.client.get_item('Alpha')
+        self.assertEqual((result.rc, result.data['name']), (0, 'Alpha'))
+        with self.assertRaises(ValueError):
+            self.client.get_organizationid('Unknown')
+
+    def test_exposed_methods(self):
+        # Methods not listed are neither provided by the client nor executed by the daemon
+        with self.assertRaises(AttributeError):
+            self.client.execute
+        for method in ['execute', 'unlock', 'get_session', '__init__', None]:
+            with self.subTest(method=method):
+                with unittest.mock.patch.object(self.bw, 'execute') as execute:
+                    with self.assertRaisesRegex(ValueError, 'is not available'):
+                        self.client.call(method, 'list items')
+                execute.assert_not_called()
+
+    def test_refused_commands(self):
+        rc, out, err = self.client.run_command(['lock'])
+        self.assertEqual((rc, out), (1, ''))
+        self.assertIn('not available', err)
+
+    def test_cached_listing(self):
+        self.client.get_items_asdictbyid(organization='Org')
+        with unittest.mock.patch.object(self.bw, 'execute') as execute:
+            rc, out, err = self.client.run_command(['list', 'items', '--organizationid', 'Org'])
+        execute.assert_not_called()
+        self.assertEqual(rc, 0)
+        self.assertIn('"Gamma"', out)
+
+    def test_peer_uid(self):
+        # Connections of other users are closed without answering
+        with unittest.mock.patch('bwinterface.daemon.os.getuid', return_value=os.getuid() + 1):
+            with self.assertRaises(ConnectionError):
+                self.client.get_status()
+        self.assertEqual(self.client.get_status().rc, 0)
+
+    def test_running_daemon(self):
+        with self.assertRaises(RuntimeError):
+            BWDaemon(self.bw, socket_path=self.socket_path).bind()
+
+    def test_stale_socket(self):
+        path = os.path.join(self.vault_dir, 'stale.sock')
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(path)
+        daemon = BWDaemon(self.bw, socket_path=path)
+        daemon.bind()
+        daemon.close()
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
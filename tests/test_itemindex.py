@@ -0,0 +1,102 @@
+import unittest
+
+from bwinterface import ItemIndex
+
+from test_bwinterface import COLLECTION, FOLDER, FakeBWTestCase, make_item
+
+"""Tests of ItemIndex."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+def with_uris(item, *uris):
+    """Item with the given URIs"""
+    item['login']['uris'] = [ { 'match': None, 'uri': uri } for uri in uris ]
+    return item
+
+
+class ItemIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [
+            with_uris(make_item('1', 'Mail', username='alice'), 'https://Mail.Example.com:8443/login', 'mail.example.com'),
+            with_uris(make_item('2', 'Mail', username='bob', collectionids=[COLLECTION], folderid=FOLDER), 'https://mail.example.com./'),
+            with_uris(make_item('3', 'Shop', username='alice', collectionids=[COLLECTION]), 'not a uri://', ''),
+        ]
+        self.index = ItemIndex(self.items)
+
+    def ids(self, items):
+        """Sorted identifiers of the items"""
+        return sorted(item['id'] for item in items)
+
+    def test_find(self):
+        self.assertEqual(len(self.index), 3)
+        # Items with the same name are all kept
+        self.assertEqual(self.ids(self.index.find_by_name('Mail')), ['1', '2'])
+        self.assertEqual(self.ids(self.index.find_by_username('alice')), ['1', '3'])
+        self.assertEqual(self.ids(self.index.find_by_collection(COLLECTION)), ['2', '3'])
+        self.assertEqual(self.ids(self.index.find_by_folder(FOLDER)), ['2'])
+        self.assertEqual(self.ids(self.index.find_by_folder(None)), ['1', '3'])
+        self.assertEqual(self.index.find_by_name('Unknown'), [])
+
+    def test_host(self):
+        self.assertEqual(ItemIndex.normalize_host('HTTPS://Mail.Example.com:8443/path'), 'mail.example.com')
+        self.assertEqual(ItemIndex.normalize_host('example.com/path'), 'example.com')
+        self.assertIsNone(ItemIndex.normalize_host(''))
+        self.assertIsNone(ItemIndex.normalize_host('http://[invalid'))
+        self.assertEqual(self.ids(self.index.find_by_host('mail.example.com')), ['1', '2'])
+        self.assertEqual(self.ids(self.index.find_by_host('http://MAIL.example.com/other')), ['1', '2'])
+
+    def test_update(self):
+        item = with_uris(make_item('1', 'Webmail', username='carol', folderid=FOLDER), 'https://webmail.example.com')
+        self.index.add(item)
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.ids(self.index.find_by_name('Mail')), ['2'])
+        self.assertEqual(self.index.find_by_name('Webmail'), [item])
+        self.assertEqual(self.ids(self.index.find_by_username('alice')), ['3'])
+        self.assertEqual(self.ids(self.index.find_by_host('mail.example.com')), ['2'])
+        self.assertEqual(self.ids(self.index.find_by_folder(FOLDER)), ['1', '2'])
+
+    def test_remove(self):
+        self.assertEqual(self.index.remove('2')['id'], '2')
+        self.assertIsNone(self.index.remove('2'))
+        self.assertEqual(self.ids(self.index.find_by_name('Mail')), ['1'])
+        self.assertEqual(self.index.find_by_folder(FOLDER), [])
+        # Keys without items are dropped
+        self.assertNotIn('bob', self.index.indexes['username'])
+        self.assertNotIn(FOLDER, self.index.indexes['folder'])
+        self.index.clear()
+        self.assertEqual((len(self.index), self.index.find_by_name('Mail')), (0, []))
+
+
+class FindItemsTest(FakeBWTestCase):
+
+    def names(self, items):
+        """Sorted names of the items"""
+        return sorted(item['name'] for item in items)
+
+    def test_find(self):
+        self.assertEqual(self.names(self.bw.find_items(organization='Org', collection='Collection')), ['Beta', 'Gamma'])
+        self.assertEqual(self.names(self.bw.find_items(organization='Org', folder='Folder', username='carol')), ['Gamma'])
+        self.assertEqual(self.bw.find_items(organization='Org', folder='Folder', username='bob'), [])
+
+    def test_edit(self):
+        self.bw.find_items(organization='Org')
+        index = self.bw.index_items(organization='Org')
+        self.assertEqual(self.bw.edit_item(self.items[1]['id'], username='bert', folder='Folder').rc, 0)
+        self.assertIs(self.bw.index_items(organization='Org'), index)
+        self.assertEqual(self.bw.find_items(organization='Org', username='bob'), [])
+        self.assertEqual(self.names(self.bw.find_items(organization='Org', username='bert')), ['Beta'])
+        self.assertEqual(self.names(self.bw.find_items(organization='Org', folder='Folder')), ['Beta', 'Gamma'])
+
+    def test_delete(self):
+        self.bw.find_items(organization='Org')
+        self.assertEqual(self.bw.delete_item(self.items[2]['id']).rc, 0)
+        self.assertEqual(self.bw.find_items(organization='Org', username='carol'), [])
+        self.assertEqual(self.names(self.bw.find_items(organization='Org')), ['Beta'])
+
+
+if __name__ == '__main__':
+    unittest.main()
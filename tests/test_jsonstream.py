@@ -0,0 +1,106 @@
+import json
+import os
+import unittest
+
+from bwinterface import JSONArrayParser
+
+from test_bwinterface import FakeBWTestCase
+
+"""Tests of JSONArrayParser."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+ELEMENTS = [ { 'name': 'Grüße "quoted" \\ €', 'notes': 'line\nbreak ☃', 'size': 12345 }, [], 'text', 1.5e3, None, True ]
+
+
+class JSONArrayParserTest(unittest.TestCase):
+
+    def parse(self, data, chunk_size):
+        """Elements obtained by feeding the data in chunks of the given size"""
+        parser = JSONArrayParser()
+        elements = list()
+        for pos in range(0, len(data), chunk_size):
+            elements.extend(parser.feed(data[pos:pos + chunk_size]))
+        elements.extend(parser.feed(b'', final=True))
+        return elements
+
+    def test_chunks(self):
+        # Chunk boundaries fall into strings, escapes, multi-byte UTF-8 sequences and numbers
+        data = json.dumps(ELEMENTS, ensure_ascii=False).encode('utf8')
+        for chunk_size in range(1, 17):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.parse(data, chunk_size), ELEMENTS)
+
+    def test_split_escape(self):
+        data = b'["a\\"b", "\\u00fc"]'
+        pos = data.index(b'\\u') + 3
+        parser = JSONArrayParser()
+        self.assertEqual(parser.feed(data[:pos]), ['a"b'])
+        self.assertEqual(parser.feed(data[pos:], final=True), ['ü'])
+
+    def test_split_utf8(self):
+        data = '["€"]'.encode('utf8')
+        parser = JSONArrayParser()
+        self.assertEqual(parser.feed(data[:3]), [])
+        self.assertEqual(parser.feed(data[3:], final=True), ['€'])
+
+    def test_elements_when_complete(self):
+        parser = JSONArrayParser()
+        self.assertEqual(parser.feed(b'[{"a": 1}, {"b"'), [{ 'a': 1 }])
+        self.assertEqual(parser.feed(b': 2}, 1'), [{ 'b': 2 }])
+        self.assertEqual(parser.feed(b'2]', final=True), [12])
+
+    def test_empty(self):
+        self.assertEqual(self.parse(b'[]', 1), [])
+        self.assertEqual(self.parse(b' [ \n ] ', 2), [])
+
+    def test_shared_keys(self):
+        first, second = self.parse(b'[{"name": 1}, {"name": 2}]', 5)
+        self.assertIs(next(iter(first)), next(iter(second)))
+
+    def test_malformed(self):
+        for data in [b'{}', b'[1 2]', b'[1,]', b'[,1]', b'[1] 2', b'[{"a" 1}]', b'["\xff"]']:
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    self.parse(data, 3)
+
+    def test_truncated(self):
+        for data in [b'', b'[', b'[1,', b'[{"a": 1}', b'["text']:
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    self.parse(data, 3)
+
+
+class StreamItemsTest(FakeBWTestCase):
+
+    def test_streaming(self):
+        expected = self.bw.get_items_asdictbyid(organization='Org')
+        bw = self.create_interface(stream_items=True)
+        self.assertEqual(bw.get_items_asdictbyid(organization='Org'), expected)
+        self.assertEqual(len(expected), 2)
+
+    def test_failing_listing(self):
+        # Both variants provide no items if "bw list items" fails
+        os.remove(os.path.join(self.vault_dir, 'items.json'))
+        self.assertEqual(self.bw.get_items_asdictbyid(), {})
+        self.assertEqual(self.create_interface(stream_items=True).get_items_asdictbyid(), {})
+
+    def test_failing_sync(self):
+        for stream_items in [False, True]:
+            with self.subTest(stream_items=stream_items):
+                bw = self.create_interface(stream_items=stream_items)
+                bw.get_items_asdictbyid()
+                items = self.items
+                self.addCleanup(self.write_vault, 'items', items)
+                os.remove(os.path.join(self.vault_dir, 'items.json'))
+                result = bw.sync(refresh='incremental')
+                self.assertNotEqual(result.rc, 0)
+                self.assertIsNone(bw.cached_items())
+                self.write_vault('items', items)
+
+
+if __name__ == '__main__':
+    unittest.main()
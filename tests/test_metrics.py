@@ -0,0 +1,69 @@
+import os
+import threading
+import unittest
+import unittest.mock
+
+from bwinterface import CommandMetrics
+
+from test_bwinterface import FakeBWTestCase
+
+"""Tests of CommandMetrics and of coalescing concurrent identical commands."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class CoalescingTest(FakeBWTestCase):
+
+    threads = 4
+
+    def setUp(self):
+        super().setUp()
+        # The stand-in takes long enough to start for all threads to call while the first command is running
+        environ = unittest.mock.patch.dict(os.environ, { 'BWI_FAKEBW_DELAY': '0.5' })
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.metrics = CommandMetrics()
+        self.bw = self.create_interface(metrics=self.metrics)
+
+    def run_threads(self, command):
+        """Results of executing the command in several threads at the same time"""
+        barrier = threading.Barrier(self.threads)
+        results = [None] * self.threads
+        def run(i):
+            barrier.wait()
+            results[i] = self.bw.execute(command)
+        threads = [ threading.Thread(target=run, args=(i,)) for i in range(self.threads) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_read_only(self):
+        results = self.run_threads('list items')
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(len(results[0].data), 3)
+        metrics = self.metrics.snapshot()
+        self.assertEqual((metrics['commands']['list items']['calls'], metrics['commands']['list items']['processes']), (1, 1))
+        self.assertEqual(metrics['coalesced'], { 'list items': self.threads - 1 })
+
+    def test_generate(self):
+        results = self.run_threads(['generate', '--length', '14'])
+        self.assertEqual(len(set(result.out for result in results)), self.threads)
+        metrics = self.metrics.snapshot()
+        self.assertEqual(metrics['commands']['generate']['processes'], self.threads)
+        self.assertEqual(metrics['coalesced'], dict())
+
+    def test_sequential(self):
+        # Only commands running at the same time are coalesced
+        self.bw.execute('list folders')
+        self.bw.execute('list folders')
+        metrics = self.metrics.snapshot()
+        self.assertEqual(metrics['commands']['list folders']['processes'], 2)
+        self.assertEqual(metrics['coalesced'], dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import unittest.mock
+
+from test_bwinterface import COLLECTION, FOLDER, ORGANIZATION, FakeBWTestCase, make_item
+
+"""Tests of reconciling the items of a scope with desired items."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class ReconcileTest(FakeBWTestCase):
+
+    def names(self, plan):
+        """Names of the planned items per kind of change"""
+        return { key: [ entry['name'] for entry in entries ] for key, entries in plan.items() }
+
+    def test_dry_run(self):
+        desired = [ { 'name': 'Beta', 'username': 'bob' }, { 'name': 'Gamma', 'username': 'carl' }, { 'name': 'Delta', 'username': 'dave' } ]
+        with unittest.mock.patch.object(self.bw, 'run_concurrently') as run_concurrently:
+            plan = self.bw.reconcile(desired, organization='Org', collection='Collection', prune=True, dry_run=True)
+        run_concurrently.assert_not_called()
+        self.assertEqual(self.names(plan), { 'create': ['Delta'], 'edit': ['Gamma'], 'delete': [], 'unchanged': ['Beta'] })
+        self.assertEqual(plan['edit'][0]['id'], self.items[2]['id'])
+        self.assertTrue(all('result' not in entry for entry in plan['create'] + plan['edit']))
+
+    def test_fields(self):
+        # Only given arguments are compared; each differing one is listed
+        desired = [
+            { 'name': 'Beta', 'username': 'bob', 'password': 'secret', 'notes': None },
+            { 'name': 'Gamma', 'username': 'carl', 'password': 'secret', 'notes': 'New notes', 'folder': 'Folder', 'favorite': True },
+        ]
+        plan = self.bw.reconcile(desired, organization='Org', collection='Collection', dry_run=True)
+        self.assertEqual(plan['unchanged'], [ { 'id': self.items[1]['id'], 'name': 'Beta' } ])
+        self.assertEqual(plan['edit'][0]['fields'], ['username', 'notes', 'favorite'])
+        plan = self.bw.reconcile([ { 'name': 'Beta', 'folder': 'Folder', 'uris': ['https://example.com'] } ], organization='Org', collection='Collection', dry_run=True)
+        self.assertEqual(plan['edit'][0]['fields'], ['folder', 'uris'])
+
+    def test_edit(self):
+        plan = self.bw.reconcile([ { 'name': 'Gamma', 'username': 'carl', 'notes': 'New notes' } ], organization='Org', collection='Collection')
+        result = plan['edit'][0]['result']
+        self.assertEqual(result.rc, 0)
+        self.assertEqual((result.data['id'], result.data['login']['username'], result.data['notes']), (self.items[2]['id'], 'carl', 'New notes'))
+        # Unchanged data of the item is kept
+        self.assertEqual((result.data['folderId'], result.data['login']['password']), (FOLDER, 'secret'))
+
+    def test_duplicate_names(self):
+        with self.assertRaises(ValueError):
+            self.bw.reconcile([ { 'name': 'Delta' }, { 'name': 'Delta' } ], organization='Org', dry_run=True)
+
+    def test_prune(self):
+        plan = self.bw.reconcile([ { 'name': 'Beta' } ], organization='Org', collection='Collection', prune=True, max_workers=1)
+        self.assertEqual(self.names(plan), { 'create': [], 'edit': [], 'delete': ['Gamma'], 'unchanged': ['Beta'] })
+        self.assertEqual(plan['delete'][0]['result'].rc, 0)
+        self.assertEqual(sorted(self.bw.cached_items(organization='Org', collection='Collection', byname=True)), ['Beta'])
+
+    def test_no_prune(self):
+        plan = self.bw.reconcile([], organization='Org', collection='Collection')
+        self.assertEqual(self.names(plan), { 'create': [], 'edit': [], 'delete': [], 'unchanged': [] })
+
+    def test_single_create(self):
+        with unittest.mock.patch.object(self.bw, 'import_document') as import_document:
+            plan = self.bw.reconcile([ { 'name': 'Delta', 'username': 'dave' } ], organization='Org', collection='Collection')
+        import_document.assert_not_called()
+        result = plan['create'][0]['result']
+        self.assertEqual((result.rc, result.data['name'], result.data['organizationId'], result.data['collectionIds']), (0, 'Delta', ORGANIZATION, [COLLECTION]))
+
+    def test_bulk_create(self):
+        imported = [
+            make_item('00000000-0000-4000-8000-000000000014', 'Delta', organizationid=ORGANIZATION, collectionids=[COLLECTION], username='dave'),
+            make_item('00000000-0000-4000-8000-000000000015', 'Epsilon', organizationid=ORGANIZATION, collectionids=[COLLECTION], username='eve'),
+        ]
+        documents = list()
+        def import_document(document, organizationid=None):
+            # The stand-in does not store imported items
+            documents.append((document, organizationid))
+            self.write_vault('items', self.items + imported)
+            return original(document, organizationid=organizationid)
+        original = self.bw.import_document
+        with unittest.mock.patch.object(self.bw, 'import_document', side_effect=import_document):
+            plan = self.bw.reconcile([ { 'name': 'Delta', 'username': 'dave' }, { 'name': 'Epsilon', 'username': 'eve' } ], organization='Org', collection='Collection')
+        self.assertEqual(len(documents), 1)
+        document, organizationid = documents[0]
+        self.assertEqual(organizationid, ORGANIZATION)
+        self.assertEqual([ item['name'] for item in document['items'] ], ['Delta', 'Epsilon'])
+        self.assertEqual([ collection['id'] for collection in document['collections'] ], [COLLECTION])
+        self.assertEqual([ entry['result'].out for entry in plan['create'] ], ['Imported', 'Imported'])
+        # The new items are taken over into the cache of the scope
+        self.assertEqual(sorted(self.bw.cached_items(organization='Org', collection='Collection', byname=True)), ['Beta', 'Delta', 'Epsilon', 'Gamma'])
+
+    def test_bulk_with_folder(self):
+        # The import into an organization does not support folders; the items are created one by one
+        with unittest.mock.patch.object(self.bw, 'import_document') as import_document:
+            plan = self.bw.reconcile([ { 'name': 'Delta', 'folder': 'Folder' }, { 'name': 'Epsilon' } ], organization='Org', collection='Collection')
+        import_document.assert_not_called()
+        self.assertEqual([ entry['result'].data.get('folderId') for entry in plan['create'] ], [FOLDER, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import unittest.mock
+
+from bwinterface import ScopedCache
+
+from test_bwinterface import FakeBWTestCase
+
+"""Tests of ScopedCache."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class Clock():
+    """Replacement for time.monotonic that is advanced manually"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ScopedCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = unittest.mock.patch('bwinterface.scopedcache.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_eviction_order(self):
+        cache = ScopedCache(maxsize=3)
+        for key in 'abc':
+            cache.set(key, key.upper())
+        # Reading makes an entry the most recently used one; peeking does not
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertEqual(cache.peek('b'), 'B')
+        cache.set('d', 'D')
+        self.assertEqual([ key for key, value in cache.items() ], ['c', 'a', 'd'])
+        cache.set('c', 'C2')
+        cache.set('e', 'E')
+        self.assertEqual([ key for key, value in cache.items() ], ['d', 'c', 'e'])
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+    def test_unlimited(self):
+        cache = ScopedCache(maxsize=None)
+        for key in range(100):
+            cache.set(key, key)
+        self.assertEqual(len(cache), 100)
+
+    def test_ttl(self):
+        cache = ScopedCache(ttl=60)
+        cache.set('a', 'A')
+        self.clock.now += 30
+        cache.set('b', 'B')
+        self.clock.now += 30
+        self.assertEqual(cache.get('a'), 'A')
+        self.clock.now += 1
+        # Reading does not extend the lifetime of an entry
+        self.assertIsNone(cache.get('a'))
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.items(), [ ('b', 'B') ])
+        self.clock.now += 30
+        self.assertEqual(cache.items(), [])
+        self.assertEqual(len(cache), 0)
+
+    def test_no_ttl(self):
+        cache = ScopedCache()
+        cache.set('a', 'A')
+        self.clock.now += 10 ** 6
+        self.assertEqual(cache.get('a'), 'A')
+
+    def test_stats(self):
+        cache = ScopedCache(maxsize=1, ttl=60)
+        cache.set('a', 'A')
+        cache.get('a')
+        cache.get('b')
+        cache.set('b', 'B')
+        self.assertEqual(cache.stats(), { 'size': 1, 'maxsize': 1, 'ttl': 60, 'hits': 1, 'misses': 1, 'evictions': 1 })
+        cache.reset_stats()
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (0, 0, 0))
+
+    def test_pop_clear(self):
+        cache = ScopedCache()
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+        self.assertEqual(cache.pop('a'), 'A')
+        self.assertIsNone(cache.pop('a'))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class ItemCacheTest(FakeBWTestCase):
+
+    def test_scopes(self):
+        # Each filter is cached separately; the least recently used scope is evicted
+        bw = self.create_interface(cache_size=2)
+        bw.get_items_asdictbyid()
+        bw.get_items_asdictbyid(organization='Org')
+        bw.get_items_asdictbyid()
+        bw.get_items_asdictbyid(organization='Org', folder='Folder')
+        self.assertIsNone(bw.cached_items(organization='Org'))
+        self.assertEqual(len(bw.cached_items()), 3)
+        self.assertEqual(len(bw.cached_items(organization='Org', folder='Folder')), 1)
+
+    def test_ttl(self):
+        clock = Clock()
+        bw = self.create_interface(cache_ttl=60)
+        with unittest.mock.patch('bwinterface.scopedcache.time.monotonic', clock):
+            bw.get_items_asdictbyid()
+            clock.now += 61
+            self.assertIsNone(bw.cached_items())
+
+
+if __name__ == '__main__':
+    unittest.main()
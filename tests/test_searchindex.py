@@ -0,0 +1,94 @@
+import unittest
+
+from bwinterface import SearchIndex
+
+from test_bwinterface import FakeBWTestCase, make_item
+
+"""Tests of SearchIndex."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [
+            make_item('1', 'GitHub', username='alice'),
+            make_item('2', 'Git server', username='git', notes='Self-hosted'),
+            make_item('3', 'Mail', notes='See the GitHub account'),
+            make_item('4', 'Gitea'),
+            make_item('5', 'A mail'),
+        ]
+        self.items[0]['login']['uris'] = [ { 'match': None, 'uri': 'https://github.com/login' } ]
+        self.index = SearchIndex(self.items)
+
+    def names(self, items):
+        """Names of the items in the given order"""
+        return [ item['name'] for item in items ]
+
+    def test_tokenize(self):
+        self.assertEqual(SearchIndex.tokenize('Straße, GitHub-Login 2'), ['strasse', 'github', 'login', '2'])
+        self.assertEqual(SearchIndex.tokenize(None), [])
+
+    def test_ranking(self):
+        # Exact matches before prefix matches before substring matches; names weigh more than notes; ties sorted by name
+        self.assertEqual(self.names(self.index.search('git')), ['Git server', 'GitHub', 'Gitea', 'Mail'])
+        self.assertEqual(self.names(self.index.search('hub')), ['GitHub', 'Mail'])
+        self.assertEqual(self.names(self.index.search('GIT', limit=2)), ['Git server', 'GitHub'])
+
+    def test_exact_name_first(self):
+        self.assertEqual(self.names(self.index.search('mail')), ['Mail', 'A mail'])
+
+    def test_all_terms(self):
+        self.assertEqual(self.names(self.index.search('git host')), ['Git server'])
+        self.assertEqual(self.index.search('git unknown'), [])
+        self.assertEqual(self.index.search(' - '), [])
+
+    def test_options(self):
+        self.assertEqual(self.index.search('hub', substring=False), [])
+        self.assertEqual(self.names(self.index.search('github', fields=['notes'])), ['Mail'])
+        self.assertEqual(self.names(self.index.search('github', fields=['uris'])), ['GitHub'])
+
+    def test_update(self):
+        self.index.search('hub')
+        self.index.add(make_item('1', 'Codeberg', username='alice'))
+        self.index.add(make_item('6', 'Hubspot'))
+        self.assertEqual(len(self.index), 6)
+        self.assertEqual(self.names(self.index.search('hub')), ['Hubspot', 'Mail'])
+        self.assertEqual(self.names(self.index.search('code')), ['Codeberg'])
+        self.assertEqual(self.index.words, sorted(self.index.words))
+
+    def test_remove(self):
+        self.index.search('git')
+        self.assertEqual(self.index.remove('2')['id'], '2')
+        self.assertIsNone(self.index.remove('2'))
+        self.assertEqual(self.names(self.index.search('git')), ['GitHub', 'Gitea', 'Mail'])
+        self.assertEqual(self.index.search('server'), [])
+        self.assertNotIn('server', self.index.words)
+        self.index.clear()
+        self.assertEqual(self.index.search('git'), [])
+
+
+class SearchItemsTest(FakeBWTestCase):
+
+    def names(self, items):
+        """Names of the items in the given order"""
+        return [ item['name'] for item in items ]
+
+    def test_search(self):
+        self.assertEqual(self.names(self.bw.search_items('alpha')), ['Alpha'])
+        self.assertEqual(self.names(self.bw.search_items('a')), ['Alpha', 'Beta', 'Gamma'])
+        self.assertEqual(self.names(self.bw.search_items('notes of', organization='Org')), [])
+
+    def test_edit_delete(self):
+        self.bw.search_items('carol', organization='Org')
+        self.assertEqual(self.bw.edit_item(self.items[1]['id'], notes='Shared with carol').rc, 0)
+        self.assertEqual(self.names(self.bw.search_items('carol', organization='Org')), ['Gamma', 'Beta'])
+        self.assertEqual(self.bw.delete_item(self.items[2]['id']).rc, 0)
+        self.assertEqual(self.names(self.bw.search_items('carol', organization='Org')), ['Beta'])
+
+
+if __name__ == '__main__':
+    unittest.main()
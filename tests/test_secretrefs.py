@@ -0,0 +1,81 @@
+import unittest
+import unittest.mock
+
+from bwinterface import find_references, parse_reference, secretreference
+
+from test_bwinterface import FakeBWTestCase
+
+"""Tests of secret references and rendering templates."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class ParseReferenceTest(unittest.TestCase):
+
+    def test_parts(self):
+        self.assertEqual(parse_reference('bw://Org/Collection/Beta#username'), secretreference('Org', 'Collection', 'Beta', 'username'))
+        self.assertEqual(parse_reference('bw://Org/Beta'), secretreference('Org', None, 'Beta', 'password'))
+        self.assertEqual(parse_reference('bw://My%20Item#API%20key'), secretreference(None, None, 'My Item', 'API key'))
+
+    def test_malformed(self):
+        for reference in ['https://Org/Beta', 'bw://', 'bw://Org//Beta', 'bw://a/b/c/d', 'bw://Org/Beta/']:
+            with self.subTest(reference=reference):
+                with self.assertRaises(ValueError):
+                    parse_reference(reference)
+
+    def test_find(self):
+        text = 'user=bw://Org/Beta#username\npassword="bw://Org/Beta"; again: bw://Org/Beta#username, see https://example.com'
+        self.assertEqual(find_references(text), ['bw://Org/Beta#username', 'bw://Org/Beta', 'bw://Org/Beta#username'])
+
+
+class ParseReferencesTest(FakeBWTestCase):
+
+    def test_strict(self):
+        with self.assertRaises(ValueError):
+            self.bw.parse_references(['bw://Org/Beta', 'bw://a/b/c/d'])
+
+    def test_not_strict(self):
+        references = self.bw.parse_references(['bw://Org/Beta', 'bw://a/b/c/d', 'bw://Org/Beta'], strict=False)
+        # Duplicates are parsed once
+        self.assertEqual(references, { 'bw://Org/Beta': secretreference('Org', None, 'Beta', 'password'), 'bw://a/b/c/d': None })
+
+
+class RenderTemplateTest(FakeBWTestCase):
+
+    template = 'user: bw://Org/Collection/Beta#username\npassword: bw://Org/Collection/Beta\nnotes: bw://Alpha#notes\nagain: bw://Org/Collection/Beta#username\n'
+
+    def test_render(self):
+        with unittest.mock.patch.object(self.bw, 'get_items_asdictbyid', wraps=self.bw.get_items_asdictbyid) as get_items:
+            text = self.bw.render_template(self.template)
+        self.assertEqual(text, 'user: bob\npassword: secret\nnotes: Notes of Alpha\nagain: bob\n')
+        # One listing per scope although a reference is used twice
+        self.assertEqual(get_items.call_count, 2)
+
+    def test_unresolved(self):
+        template = self.template + 'missing: bw://Org/Collection/Delta\nfield: bw://Alpha#totp\n'
+        with self.assertRaisesRegex(ValueError, 'Delta.*totp'):
+            self.bw.render_template(template)
+        # References not resolved are kept if not strict
+        self.assertEqual(self.bw.render_template(template, strict=False), 'user: bob\npassword: secret\nnotes: Notes of Alpha\nagain: bob\nmissing: bw://Org/Collection/Delta\nfield: bw://Alpha#totp\n')
+
+    def test_malformed(self):
+        template = 'ok: bw://Alpha#username\nbad: bw://a/b/c/d\n'
+        with self.assertRaises(ValueError):
+            self.bw.render_template(template)
+        self.assertEqual(self.bw.render_template(template, strict=False), 'ok: alice\nbad: bw://a/b/c/d\n')
+
+    def test_unknown_scope(self):
+        with self.assertRaises(ValueError):
+            self.bw.render_template('bw://Unknown/Beta')
+        self.assertEqual(self.bw.render_template('bw://Unknown/Beta', strict=False), 'bw://Unknown/Beta')
+
+    def test_invalid_totp(self):
+        alpha = dict(self.items[0], login=dict(self.items[0]['login'], totp='not base32!'))
+        self.write_vault('items', [alpha] + self.items[1:])
+        self.assertEqual(self.bw.resolve_secrets(['bw://Alpha#totp'], strict=False), { 'bw://Alpha#totp': None })
+
+
+if __name__ == '__main__':
+    unittest.main()
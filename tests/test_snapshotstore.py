@@ -0,0 +1,81 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from bwinterface import SnapshotStore
+
+"""Tests of SnapshotStore."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+STATE = { 'lastSync': '2024-01-01T00:00:00.000Z', 'caches': { 'items': [ { 'name': 'Grüße', 'login': { 'password': 'secret' } } ] } }
+
+
+class SnapshotStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache', 'snapshot')
+        self.store = SnapshotStore(self.path)
+
+    def read(self):
+        """Contents of the snapshot file"""
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def write(self, data):
+        """Replaces the contents of the snapshot file"""
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def test_round_trip(self):
+        self.assertIsNone(self.store.load('session'))
+        self.store.save('session', STATE)
+        self.assertEqual(self.store.load('session'), STATE)
+        self.assertEqual(SnapshotStore(self.path).load('session'), STATE)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_encrypted(self):
+        self.store.save('session', STATE)
+        data = self.read()
+        self.assertTrue(data.startswith(SnapshotStore.magic))
+        self.assertNotIn(b'secret', data)
+        # A new salt is used for every write
+        self.store.save('session', STATE)
+        self.assertNotEqual(self.read(), data)
+
+    def test_wrong_session(self):
+        self.store.save('session', STATE)
+        self.assertIsNone(self.store.load('other session'))
+
+    def test_mac_failure(self):
+        self.store.save('session', STATE)
+        data = self.read()
+        # Changes to the header, the ciphertext or the MAC are detected
+        for pos in [0, len(SnapshotStore.magic), len(data) // 2, len(data) - 1]:
+            with self.subTest(pos=pos):
+                self.write(data[:pos] + bytes([data[pos] ^ 1]) + data[pos + 1:])
+                self.assertIsNone(self.store.load('session'))
+
+    def test_truncated(self):
+        self.store.save('session', STATE)
+        data = self.read()
+        for size in [0, len(SnapshotStore.magic) + SnapshotStore.salt_size, len(data) - 1]:
+            with self.subTest(size=size):
+                self.write(data[:size])
+                self.assertIsNone(self.store.load('session'))
+
+    def test_delete(self):
+        self.store.save('session', STATE)
+        self.store.delete()
+        self.assertFalse(os.path.exists(self.path))
+        self.store.delete()
+
+
+if __name__ == '__main__':
+    unittest.main()
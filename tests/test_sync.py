@@ -0,0 +1,72 @@
+import unittest
+
+from test_bwinterface import COLLECTION, FOLDER, ORGANIZATION, FakeBWTestCase, make_item
+
+"""Tests of incremental refreshes of the caches when syncing."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+class IncrementalSyncTest(FakeBWTestCase):
+
+    def change_vault(self):
+        """Adds a personal and an organization item, changes Beta and removes Gamma in the vault served by the stand-in"""
+        alpha, beta, gamma = self.items
+        beta = dict(beta, login=dict(beta['login'], username='bert'), revisionDate='2024-02-01T00:00:00.000Z')
+        self.write_vault('items', [
+            alpha, beta,
+            make_item('00000000-0000-4000-8000-000000000014', 'Delta', organizationid=ORGANIZATION, collectionids=[COLLECTION], folderid=FOLDER),
+            make_item('00000000-0000-4000-8000-000000000015', 'Epsilon'),
+        ])
+
+    def names(self, delta):
+        """Names of the added, changed and removed items"""
+        return { key: sorted(item['name'] for item in items) for key, items in delta.items() }
+
+    def test_cache(self):
+        self.bw.get_items_asdictbyid()
+        self.change_vault()
+        result = self.bw.sync(refresh='incremental')
+        self.assertEqual(result.rc, 0)
+        self.assertEqual(self.names(result.data), { 'added': ['Delta', 'Epsilon'], 'changed': ['Beta'], 'removed': ['Gamma'] })
+        items = self.bw.get_items_asdictbyname()
+        self.assertEqual(sorted(items), ['Alpha', 'Beta', 'Delta', 'Epsilon'])
+        self.assertEqual(items['Beta']['login']['username'], 'bert')
+
+    def test_unchanged(self):
+        self.bw.get_items_asdictbyid()
+        result = self.bw.sync(refresh='incremental')
+        self.assertEqual(result.data, { 'added': [], 'changed': [], 'removed': [] })
+        self.assertEqual(len(self.bw.get_items_asdictbyid()), 3)
+
+    def test_vault(self):
+        self.assertEqual(self.bw.load_vault().rc, 0)
+        self.change_vault()
+        self.write_vault('collections', [ { 'object': 'collection', 'id': COLLECTION, 'organizationId': ORGANIZATION, 'name': 'Renamed', 'externalId': None } ])
+        result = self.bw.sync(refresh='incremental')
+        self.assertEqual(self.names(result.data), { 'added': ['Delta', 'Epsilon'], 'changed': ['Beta'], 'removed': ['Gamma'] })
+        self.assertEqual(sorted(self.bw.get_items_asdictbyname()), ['Alpha', 'Beta', 'Delta', 'Epsilon'])
+        self.assertEqual(sorted(self.bw.get_items_asdictbyname(organization='Org', collection='Renamed')), ['Beta', 'Delta'])
+        self.assertEqual(self.bw.get_item('Beta').data['login']['username'], 'bert')
+
+    def test_organization(self):
+        # Only items of the organization are listed again; the personal item Epsilon is outside the cached scopes
+        self.bw.get_items_asdictbyid(organization='Org')
+        self.bw.get_items_asdictbyid(organization='Org', folder='Folder')
+        self.change_vault()
+        result = self.bw.sync(refresh='incremental')
+        self.assertEqual(self.names(result.data), { 'added': ['Delta'], 'changed': ['Beta'], 'removed': ['Gamma'] })
+        self.assertEqual(sorted(self.bw.cached_items(organization='Org', byname=True)), ['Beta', 'Delta'])
+        self.assertEqual(sorted(self.bw.cached_items(organization='Org', folder='Folder', byname=True)), ['Delta'])
+
+    def test_streaming(self):
+        bw = self.create_interface(stream_items=True)
+        bw.get_items_asdictbyid(organization='Org')
+        self.change_vault()
+        self.assertEqual(self.names(bw.sync(refresh='incremental').data), { 'added': ['Delta'], 'changed': ['Beta'], 'removed': ['Gamma'] })
+
+
+if __name__ == '__main__':
+    unittest.main()
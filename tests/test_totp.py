@@ -0,0 +1,75 @@
+import base64
+import unittest
+
+from bwinterface import TOTP
+
+"""Tests of TOTP."""
+
+__author__ = "Dirk Henrici"
+__license__ = "MIT"
+__email__ = "towalink.bwinterface@henrici.name"
+
+
+# Seeds and expected codes of RFC 6238, Appendix B
+RFC6238_KEYS = {
+    'SHA1': b'12345678901234567890',
+    'SHA256': b'12345678901234567890123456789012',
+    'SHA512': b'1234567890123456789012345678901234567890123456789012345678901234',
+}
+RFC6238_VECTORS = [
+    (59, { 'SHA1': '94287082', 'SHA256': '46119246', 'SHA512': '90693936' }),
+    (1111111109, { 'SHA1': '07081804', 'SHA256': '68084774', 'SHA512': '25091201' }),
+    (1111111111, { 'SHA1': '14050471', 'SHA256': '67062674', 'SHA512': '99943326' }),
+    (1234567890, { 'SHA1': '89005924', 'SHA256': '91819424', 'SHA512': '93441116' }),
+    (2000000000, { 'SHA1': '69279037', 'SHA256': '90698825', 'SHA512': '38618901' }),
+    (20000000000, { 'SHA1': '65353130', 'SHA256': '77737706', 'SHA512': '47863826' }),
+]
+
+
+class CodeTest(unittest.TestCase):
+
+    def test_rfc6238(self):
+        for algorithm, key in RFC6238_KEYS.items():
+            totp = TOTP(key, digits=8, algorithm=algorithm)
+            for timestamp, codes in RFC6238_VECTORS:
+                with self.subTest(algorithm=algorithm, timestamp=timestamp):
+                    self.assertEqual(totp.code(timestamp), codes[algorithm])
+
+    def test_default_digits(self):
+        self.assertEqual(TOTP(RFC6238_KEYS['SHA1']).code(59), '287082')
+
+    def test_remaining(self):
+        totp = TOTP(RFC6238_KEYS['SHA1'])
+        self.assertEqual((totp.counter(59), totp.remaining(59)), (1, 1))
+        self.assertEqual((totp.counter(60), totp.remaining(60)), (2, 30))
+
+
+class FromStringTest(unittest.TestCase):
+
+    def test_secret(self):
+        secret = base64.b32encode(RFC6238_KEYS['SHA1']).decode().lower().rstrip('=')
+        totp = TOTP.from_string(' '.join(secret[i:i + 4] for i in range(0, len(secret), 4)))
+        self.assertEqual(totp.key, RFC6238_KEYS['SHA1'])
+
+    def test_uri(self):
+        secret = base64.b32encode(RFC6238_KEYS['SHA256']).decode().rstrip('=')
+        totp = TOTP.from_string(f'otpauth://totp/Example:alice@example.com?secret={secret}&issuer=Example&algorithm=SHA256&digits=8&period=60')
+        self.assertEqual((totp.algorithm, totp.digits, totp.period), ('SHA256', 8, 60))
+        # Time step 1 as in the first vector of RFC 6238 but with a period of 60 seconds
+        self.assertEqual(totp.code(118), '46119246')
+
+    def test_steam(self):
+        # Steam codes take the truncated HOTP value (1094287082 for this key and counter 1 according to RFC 4226, Appendix D) modulo 26 per character
+        secret = base64.b32encode(RFC6238_KEYS['SHA1']).decode()
+        self.assertEqual(TOTP.from_string('steam://' + secret).code(59), 'PV9M4')
+        self.assertEqual(TOTP.from_string(f'otpauth://totp/Steam:alice?secret={secret}&encoder=steam').code(59), 'PV9M4')
+
+    def test_invalid(self):
+        for totp in ['not base32!', 'otpauth://hotp/Example?secret=GEZDGNBV', 'otpauth://totp/Example', 'otpauth://totp/Example?secret=GEZDGNBV&algorithm=MD5', 'otpauth://totp/Example?secret=GEZDGNBV&digits=x']:
+            with self.subTest(totp=totp):
+                with self.assertRaises(ValueError):
+                    TOTP.from_string(totp)
+
+
+if __name__ == '__main__':
+    unittest.main()